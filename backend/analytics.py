@@ -0,0 +1,170 @@
+"""
+Sales analytics over the calculation history
+Works from calculation_histogram (one row per day, orange type and 10 g weight
+bucket, kept up to date on every insert/delete by stats.py), never from the raw
+price_calculations rows. Two grouped reads (per day and type, per type and weight
+bucket) are pulled in chunks into NumPy arrays and aggregated with vectorized
+operations; memory is bounded by the chunk size plus the per-day totals and one
+entry per distinct weight bucket (buckets are sorted, never used as indexes)
+"""
+
+import os
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import String, cast, func, select
+from sqlalchemy.orm import Session
+
+from database import CalculationHistogram, WEIGHT_BUCKETS_PER_KG
+
+# Summary rows per chunk read from the database
+ANALYTICS_CHUNK_ROWS = int(os.getenv("ANALYTICS_CHUNK_ROWS", "50000"))
+# Weight percentiles reported per type and overall
+PERCENTILES = (50, 90, 95, 99)
+
+
+def histogram_percentiles(buckets: np.ndarray, counts: np.ndarray,
+                          percentiles=PERCENTILES) -> Dict[str, Optional[float]]:
+    """
+    Nearest-rank percentiles (in kg) from sparse (weight bucket, count) pairs
+    Buckets are only sorted, never used as array indexes, so memory follows the
+    number of distinct buckets whatever weights they hold
+    """
+    total = counts.sum()
+    if total <= 0:
+        return {f"p{q}": None for q in percentiles}
+    order = np.argsort(buckets, kind="stable")
+    ranks = np.ceil(np.asarray(percentiles) / 100 * total)
+    positions = np.searchsorted(np.cumsum(counts[order]), ranks, side="left")
+    return {
+        f"p{q}": round(float(buckets[order][i]) / WEIGHT_BUCKETS_PER_KG, 2)
+        for q, i in zip(percentiles, positions)
+    }
+
+
+def _merge_buckets(buckets: np.ndarray, counts: np.ndarray):
+    """Sum the counts of equal buckets"""
+    merged, inverse = np.unique(buckets, return_inverse=True)
+    return merged, np.bincount(inverse, weights=counts, minlength=len(merged))
+
+
+def _day_number(day) -> int:
+    return int(np.datetime64(day, "D").astype(np.int64))
+
+
+def _chunks(db: Session, query, chunk_rows: int):
+    """Yield the query's result a chunk at a time, transposed into columns"""
+    result = db.execute(query, execution_options={"yield_per": chunk_rows})
+    for chunk in result.partitions():
+        yield list(zip(*chunk))
+
+
+def _type_codes(type_codes: Dict[str, int], types) -> np.ndarray:
+    """Small integer code per orange_type, assigned in order of first appearance"""
+    names, inverse = np.unique(np.array(types, dtype=object), return_inverse=True)
+    return np.array([type_codes.setdefault(name, len(type_codes)) for name in names])[inverse]
+
+
+def calculation_analytics(
+    db: Session,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    chunk_rows: int = ANALYTICS_CHUNK_ROWS,
+) -> dict:
+    """
+    Revenue and weight totals per orange type, weight percentiles, a daily
+    volume histogram and the average basket value (revenue per calculation)
+    over [date_from, date_to]; every day from the first to the last day with
+    sales in that range has a daily entry
+    """
+    h = CalculationHistogram
+    filters = []
+    if date_from:
+        filters.append(h.date >= date_from)
+    if date_to:
+        filters.append(h.date <= date_to)
+
+    # The daily histogram spans the data inside the requested range, never the
+    # requested range itself, so a wide range cannot allocate more days than exist
+    start, end = db.execute(select(func.min(h.date), func.max(h.date)).where(*filters)).one()
+    days = _day_number(end) - _day_number(start) + 1 if start and end else 0
+    daily = np.zeros((3, days))  # count, weight, revenue per day
+    type_codes: Dict[str, int] = {}
+    type_totals = np.zeros((3, 0))  # count, weight, revenue per type
+
+    # Per day and type; dates come back as ISO text, parsed by NumPy per chunk
+    by_day = select(
+        cast(h.date, String), h.orange_type, func.sum(h.calculation_count),
+        func.sum(h.total_weight_kg), func.sum(h.total_revenue),
+    ).where(*filters).group_by(h.date, h.orange_type)
+    for day_labels, types, *columns in _chunks(db, by_day, chunk_rows):
+        offsets = np.array(day_labels, dtype="datetime64[D]").astype(np.int64) - _day_number(start)
+        codes = _type_codes(type_codes, types)
+        values = np.array(columns, dtype=np.float64)
+        type_totals = np.pad(type_totals, ((0, 0), (0, len(type_codes) - type_totals.shape[1])))
+        for column in range(3):
+            daily[column] += np.bincount(offsets, values[column], minlength=days)
+            type_totals[column] += np.bincount(codes, values[column], minlength=len(type_codes))
+
+    # Sparse weight bucket counts per type (same transaction, so the same types);
+    # the grouped read yields each (type, bucket) once
+    bucket_parts: List[List[np.ndarray]] = [[] for _ in type_codes]
+    count_parts: List[List[np.ndarray]] = [[] for _ in type_codes]
+    by_bucket = select(
+        h.orange_type, h.weight_bucket, func.sum(h.calculation_count),
+    ).where(*filters).group_by(h.orange_type, h.weight_bucket)
+    for types, buckets, counts in _chunks(db, by_bucket, chunk_rows):
+        codes = _type_codes(type_codes, types)
+        buckets = np.array(buckets, dtype=np.int64)
+        counts = np.array(counts, dtype=np.float64)
+        for code in np.unique(codes):
+            mask = codes == code
+            while len(bucket_parts) <= code:
+                bucket_parts.append([])
+                count_parts.append([])
+            bucket_parts[code].append(buckets[mask])
+            count_parts[code].append(counts[mask])
+
+    def joined(parts: List[np.ndarray], dtype) -> np.ndarray:
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=dtype)
+
+    type_buckets = [
+        (joined(b, np.int64), joined(c, np.float64)) for b, c in zip(bucket_parts, count_parts)
+    ]
+    all_buckets = _merge_buckets(
+        joined([b for b, _ in type_buckets], np.int64),
+        joined([c for _, c in type_buckets], np.float64),
+    )
+
+    count, weight, revenue = type_totals.sum(axis=1)
+    by_type = sorted((
+        {
+            "orange_type": name,
+            "calculations": int(type_totals[0, code]),
+            "weight_kg": round(float(type_totals[1, code]), 2),
+            "revenue": round(float(type_totals[2, code]), 2),
+            "revenue_share": round(float(type_totals[2, code] / revenue), 4) if revenue else None,
+            "average_basket_value": round(float(type_totals[2, code] / type_totals[0, code]), 2)
+            if type_totals[0, code] else None,
+            "weight_percentiles_kg": histogram_percentiles(*type_buckets[code]),
+        }
+        for name, code in type_codes.items()
+    ), key=lambda t: t["revenue"], reverse=True)
+
+    labels = (np.arange(days) + _day_number(start)).astype("datetime64[D]").astype(str).tolist()
+    return {
+        "date_from": str(start) if start else None,
+        "date_to": str(end) if end else None,
+        "total_calculations": int(count),
+        "total_weight_kg": round(float(weight), 2),
+        "total_revenue": round(float(revenue), 2),
+        "average_basket_value": round(float(revenue / count), 2) if count else None,
+        "weight_percentiles_kg": histogram_percentiles(*all_buckets),
+        "by_type": by_type,
+        "daily": [
+            {"date": day, "calculations": int(c), "weight_kg": round(float(w), 2),
+             "revenue": round(float(r), 2)}
+            for day, c, w, r in zip(labels, *daily.tolist())
+        ],
+    }
@@ -0,0 +1,108 @@
+"""
+Benchmark: /api/analytics over a large calculation history
+Times calculation_analytics (grouped reads of calculation_histogram aggregated
+with NumPy) for the whole history and for the last 30 days, against a chunked
+NumPy scan of the raw price_calculations rows that computes the same totals
+
+Usage: python benchmarks/bench_analytics.py --calculations 10000000 --database bench.db
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def best_of(repeat: int, fn):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def raw_scan(engine, chunk_rows: int = 200_000) -> dict:
+    """Per-type count and revenue straight from price_calculations, chunk by chunk"""
+    import numpy as np
+
+    totals = {}
+    with engine.connect() as conn:
+        result = conn.exec_driver_sql(
+            "SELECT orange_type, total_price FROM price_calculations"
+        )
+        while True:
+            rows = result.fetchmany(chunk_rows)
+            if not rows:
+                break
+            types = np.array([r[0] for r in rows], dtype=object)
+            prices = np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows))
+            names, inverse = np.unique(types, return_inverse=True)
+            revenue = np.bincount(inverse, weights=prices)
+            counts = np.bincount(inverse)
+            for name, c, r in zip(names, counts, revenue):
+                total = totals.setdefault(name, [0, 0.0])
+                total[0] += int(c)
+                total[1] += float(r)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calculations", type=int, default=1_000_000,
+                        help="price_calculations rows to seed")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--database", help="SQLite file to seed/reuse (default: a temp file)")
+    parser.add_argument("--skip-raw", action="store_true", help="skip the raw-row scan")
+    args = parser.parse_args()
+
+    tmp = None
+    if args.database:
+        db_path = os.path.abspath(args.database)
+    else:
+        tmp = tempfile.TemporaryDirectory(prefix="orange-bench-")
+        db_path = os.path.join(tmp.name, "bench.db")
+    # Configure before database is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    from bench_endpoints import seed
+    from analytics import calculation_analytics
+    from database import SessionLocal, engine, init_db
+
+    try:
+        init_db()
+        seed(args.calculations)
+
+        db = SessionLocal()
+        try:
+            full_time, full = best_of(args.repeat, lambda: calculation_analytics(db))
+            print(f"{full['total_calculations']:,} calculations over {len(full['daily'])} days")
+            print(f"analytics, whole history     {full_time * 1000:9.1f} ms")
+
+            if full["date_to"]:
+                end = date.fromisoformat(full["date_to"])
+                month_time, _ = best_of(args.repeat, lambda: calculation_analytics(
+                    db, end - timedelta(days=29), end))
+                print(f"analytics, last 30 days      {month_time * 1000:9.1f} ms")
+        finally:
+            db.close()
+
+        if not args.skip_raw:
+            raw_time, totals = best_of(1, lambda: raw_scan(engine))
+            print(f"raw NumPy scan (totals only) {raw_time * 1000:9.1f} ms")
+            by_type = {t["orange_type"]: t for t in full["by_type"]}
+            for name, (count, revenue) in totals.items():
+                assert by_type[name]["calculations"] == count, name
+                assert abs(by_type[name]["revenue"] - revenue) <= 0.01 + 1e-9 * revenue, name
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
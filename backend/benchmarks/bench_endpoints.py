@@ -0,0 +1,241 @@
+"""
+Benchmark: end-to-end latency and throughput of the API endpoints
+Seeds a database of configurable size, then drives the app in-process through
+httpx's ASGI transport. /oranges scrapes a local stand-in for talaadthai.com
+Reports p50/p95/p99 latency and requests/s per endpoint and writes JSON so runs
+can be compared
+
+Usage: python benchmarks/bench_endpoints.py --calculations 1000000 --output before.json
+       python benchmarks/bench_endpoints.py --calculations 1000000 --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+FIXTURE_PATH = os.path.join(BACKEND_DIR, "tests", "fixtures", "fruit_prices.html")
+
+ORANGE_IDS = ["tangerine", "green-sweet", "mandarin"]
+
+
+def seed(rows: int):
+    """Seed the base catalog and top price_calculations up to `rows` with seed_db"""
+    import random
+
+    from sqlalchemy import func, select
+
+    import seed_db
+    from database import PriceCalculation, engine
+
+    seed_db.seed_data()
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count()).select_from(PriceCalculation)).scalar()
+    if existing >= rows:
+        print(f"📦 Reusing {existing:,} existing calculations")
+        return
+
+    missing = rows - existing
+    seed_db.bulk_insert(
+        PriceCalculation.__table__, seed_db.CALCULATION_COLUMNS,
+        seed_db.synthetic_calculations(missing, random.Random(42)), missing, "calculations",
+    )
+    seed_db.finish_bulk_load(calculations=True, measurements=False)
+
+
+def start_stand_in_server() -> ThreadingHTTPServer:
+    """Serve the saved fruit-price page on a local port"""
+    with open(FIXTURE_PATH, "rb") as f:
+        payload = f.read()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentile(sorted_values, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+async def drive(client, make_request, requests: int, concurrency: int, warmup: int) -> dict:
+    """Send `requests` requests with up to `concurrency` in flight"""
+    for i in range(warmup):
+        await make_request(client, i)
+
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            response = await make_request(client, i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "requests_per_sec": round(requests / elapsed, 1),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+    }
+
+
+def scenarios():
+    """Endpoint name -> coroutine sending one request"""
+    return {
+        "POST /api/calculate": lambda c, i: c.post(
+            "/api/calculate", params={"orange_id": ORANGE_IDS[i % 3], "weight": 1.0 + i % 5}
+        ),
+        "GET /api/calculations": lambda c, i: c.get("/api/calculations", params={"limit": 20}),
+        "GET /api/calculations?orange_type": lambda c, i: c.get(
+            "/api/calculations", params={"limit": 20, "orange_type": ORANGE_IDS[i % 3]}
+        ),
+        "GET /api/stats": lambda c, i: c.get("/api/stats"),
+        "GET /api/oranges": lambda c, i: c.get("/api/oranges"),
+        "GET /oranges (cached)": lambda c, i: c.get("/oranges"),
+        "GET /oranges (scrape)": lambda c, i: c.get("/oranges"),
+    }
+
+
+async def run(args) -> dict:
+    import httpx
+
+    import main
+    import scraper
+
+    server = start_stand_in_server()
+    scraper.SCRAPE_URL = f"http://127.0.0.1:{server.server_address[1]}/prices/fruit"
+
+    await main.startup_event()
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, make_request in scenarios().items():
+                if args.only and not any(word in name for word in args.only):
+                    continue
+                if name.endswith("(scrape)"):
+                    # TTL 0: every request goes upstream to the stand-in page
+                    main.price_cache.ttl = 0
+                    main.price_cache.stale_ttl = 0
+                result = await drive(client, make_request, args.requests, args.concurrency, args.warmup)
+                results[name] = result
+                print(f"{name:36s} {result['requests_per_sec']:9.1f} req/s  "
+                      f"p50={result['p50_ms']:8.2f}ms  p95={result['p95_ms']:8.2f}ms  "
+                      f"p99={result['p99_ms']:8.2f}ms  errors={result['errors']}")
+    finally:
+        await main.shutdown_event()
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def compare(baseline_path: str, results: dict):
+    """Print p50/p99 and throughput change against an earlier run"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    print(f"\nvs {baseline_path}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        print(f"{name:36s} req/s x{result['requests_per_sec'] / before['requests_per_sec']:5.2f}  "
+              f"p50 {before['p50_ms']:8.2f} -> {result['p50_ms']:8.2f}ms  "
+              f"p99 {before['p99_ms']:8.2f} -> {result['p99_ms']:8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calculations", type=int, default=100_000,
+                        help="price_calculations rows to seed")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--database", help="SQLite file to seed/reuse (default: a temp file)")
+    parser.add_argument("--only", nargs="*", help="run endpoints whose name contains any of these")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="earlier --output file to compare against")
+    args = parser.parse_args()
+
+    tmp = None
+    if args.database:
+        db_path = os.path.abspath(args.database)
+    else:
+        tmp = tempfile.TemporaryDirectory(prefix="orange-bench-")
+        db_path = os.path.join(tmp.name, "bench.db")
+    # Configure before database/main are imported; the benchmark drives refreshes itself
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("PRICE_REFRESH_INTERVAL", "0")
+
+    try:
+        seed(args.calculations)
+        results = asyncio.run(run(args))
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "calculations": args.calculations,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "calc_write_mode": os.getenv("CALC_WRITE_MODE", "sync"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Wrote {args.output}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark: price-table parsing time per HTML parser backend
+Scales the saved fruit-price fixture (tests/fixtures/fruit_prices.html) up to
+large pages and checks every backend returns identical rows
+
+Usage: python benchmarks/bench_html_parsers.py --rows 1000 10000 50000
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import html_parsers  # noqa: E402
+
+FIXTURE_PATH = os.path.join(BACKEND_DIR, "tests", "fixtures", "fruit_prices.html")
+
+
+def build_page(rows: int) -> str:
+    """Repeat the fixture's price rows until the table has `rows` data rows"""
+    with open(FIXTURE_PATH, encoding="utf-8") as f:
+        page = f.read()
+    body = re.search(r"<tbody>(.*)</tbody>", page, re.S)
+    row_html = re.findall(r"<tr>.*?</tr>", body.group(1), re.S)
+    repeated = [row_html[i % len(row_html)] for i in range(rows)]
+    return page[:body.start(1)] + "\n".join(repeated) + page[body.end(1):]
+
+
+def time_backend(backend: str, page: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        html_parsers.BACKENDS[backend](page)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    backends = sorted(html_parsers.BACKENDS)
+    print(f"{'rows':>8s} {'size':>9s} " + " ".join(f"{b:>14s}" for b in backends))
+    for rows in args.rows:
+        page = build_page(rows)
+        expected = html_parsers.parse_rows_html_parser(page)
+        for backend in backends:
+            assert html_parsers.BACKENDS[backend](page) == expected, backend
+        timings = [time_backend(b, page, args.repeat) for b in backends]
+        print(f"{rows:8d} {len(page.encode()) / 1024:7.0f}KB "
+              + " ".join(f"{t * 1000:12.1f}ms" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
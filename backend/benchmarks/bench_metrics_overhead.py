@@ -0,0 +1,94 @@
+"""
+Benchmark: per-request and per-query cost of the /metrics instrumentation
+Times a trivial ASGI app with and without MetricsMiddleware, and SQLite
+statements with and without the engine event hooks
+
+Best of --repeat runs is reported, since the per-call costs are small
+
+Usage: python benchmarks/bench_metrics_overhead.py --iterations 50000 --repeat 5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI  # noqa: E402
+from sqlalchemy import create_engine, text  # noqa: E402
+
+import metrics  # noqa: E402
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/oranges/{orange_id}")
+    async def orange(orange_id: str):
+        return {}
+
+    return app
+
+
+async def time_asgi(app, iterations: int) -> float:
+    """Mean microseconds to push one GET through `app`"""
+    scope = {
+        "type": "http", "method": "GET", "path": "/api/oranges/mandarin", "raw_path": b"/api/oranges/mandarin",
+        "query_string": b"", "headers": [], "root_path": "", "scheme": "http",
+        "server": ("bench", 80), "client": ("127.0.0.1", 1), "http_version": "1.1", "app": app,
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def time_queries(instrumented: bool, iterations: int) -> float:
+    """Mean microseconds per SELECT on an in-memory SQLite engine"""
+    engine = create_engine("sqlite://")
+    if instrumented:
+        metrics.instrument_engine(engine)
+    with engine.connect() as conn:
+        statement = text("SELECT 1")
+        started = time.perf_counter()
+        for _ in range(iterations):
+            conn.execute(statement).scalar()
+        elapsed = time.perf_counter() - started
+    engine.dispose()
+    return elapsed / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    bare = build_app()
+    wrapped = build_app()
+    wrapped.add_middleware(metrics.MetricsMiddleware, routes=wrapped.router.routes)
+
+    asgi_bare = asgi_metrics = query_bare = query_metrics = float("inf")
+    for _ in range(args.repeat):
+        asgi_bare = min(asgi_bare, asyncio.run(time_asgi(bare, args.iterations)))
+        asgi_metrics = min(asgi_metrics, asyncio.run(time_asgi(wrapped, args.iterations)))
+        query_bare = min(query_bare, time_queries(False, args.iterations))
+        query_metrics = min(query_metrics, time_queries(True, args.iterations))
+
+    print(f"request  bare={asgi_bare:7.1f}us  with metrics={asgi_metrics:7.1f}us  "
+          f"overhead={asgi_metrics - asgi_bare:5.1f}us")
+    print(f"query    bare={query_bare:7.1f}us  with metrics={query_metrics:7.1f}us  "
+          f"overhead={query_metrics - query_bare:5.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark: serialization cost of large list responses, before and after the
+orjson + typed response model path
+Each endpoint shape is served by in-process apps built from main.py's response
+models: the old path (plain dicts through jsonable_encoder, stdlib json) and the
+current one (response_model serialized by pydantic-core, ORJSONResponse).
+/oranges is also timed with the body rendered once per snapshot, as main.py does
+
+Usage: python benchmarks/bench_serialization.py --rows 10000 --repeat 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI, Response  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+
+from main import (  # noqa: E402
+    CalculationOut, MeasurementOut, OrangeOut, OrangePrice, orange_price_list
+)
+
+
+def sample_rows(rows: int) -> dict:
+    """Rows shaped like each endpoint's handler output"""
+    return {
+        "/api/calculations": (CalculationOut, [
+            {"id": i, "orange_type": "mandarin", "orange_name": "Mandarin Orange",
+             "weight_kg": 1.25 + i % 7, "price_per_kg": 55.0,
+             "total_price": round((1.25 + i % 7) * 55.0, 2), "date": "2025-06-01"}
+            for i in range(rows)
+        ]),
+        "/api/measurements": (MeasurementOut, [
+            {"id": i, "orange_id": "tangerine", "orange_name": "Tangerine",
+             "height_cm": 7.5, "radius_cm": 3.8, "diameter_cm": 7.6, "weight_avg_g": 120.0 + i % 9}
+            for i in range(rows)
+        ]),
+        "/api/oranges": (OrangeOut, [
+            {"id": f"sku-{i}", "name": f"ส้มแมนดาริน {i}", "pricePerKg": 55.0, "color": "Orange",
+             "grade": "A", "description": "คุณภาพ A", "height": 6.8, "radius": 3.5,
+             "diameter": 7.0, "weight_avg_g": 100.0}
+            for i in range(rows)
+        ]),
+        "/oranges": (OrangePrice, [
+            OrangePrice(name=f"ส้มเขียวหวาน {i}", grade="เกรด A", price_min=35.0,
+                        price_max=50.0, unit="กก.", orange_id="green-sweet")
+            for i in range(rows)
+        ]),
+    }
+
+
+def make_handler(rows):
+    async def handler():
+        return rows
+    return handler
+
+
+def build_apps(shapes: dict) -> dict:
+    legacy = FastAPI(default_response_class=JSONResponse)
+    typed = FastAPI(default_response_class=ORJSONResponse)
+    prerendered = FastAPI()
+
+    for path, (model, rows) in shapes.items():
+        handler = make_handler(rows)
+        # /oranges already had a response model; the others returned plain dicts
+        legacy.add_api_route(path, handler, response_model=List[model] if path == "/oranges" else None)
+        exclude_unset = model is OrangeOut
+        typed.add_api_route(path, handler, response_model=List[model],
+                            response_model_exclude_unset=exclude_unset)
+
+    oranges = shapes["/oranges"][1]
+    body = orange_price_list.dump_json(oranges)
+    prerendered.add_api_route("/oranges", lambda: Response(body, media_type="application/json"))
+    return {"before": legacy, "after": typed, "after (rendered once)": prerendered}
+
+
+async def time_get(app, path: str, repeat: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = await client.get(path)
+            best = min(best, time.perf_counter() - started)
+        return best, response
+
+
+async def run(rows: int, repeat: int):
+    shapes = sample_rows(rows)
+    apps = build_apps(shapes)
+    print(f"{rows:,} rows per response, best of {repeat}")
+    for path in shapes:
+        timings = {}
+        bodies = []
+        for label, app in apps.items():
+            if label == "after (rendered once)" and path != "/oranges":
+                continue
+            best, response = await time_get(app, path, repeat)
+            timings[label] = best
+            bodies.append(json.loads(response.content))
+        assert all(body == bodies[0] for body in bodies), f"{path}: outputs differ"
+        before = timings["before"]
+        line = "  ".join(f"{label}={seconds * 1000:7.1f}ms (x{before / seconds:4.1f})"
+                         for label, seconds in timings.items())
+        print(f"{path:20s} {line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: mixed read/write throughput with default vs tuned SQLite settings
+Readers page through recent calculations while one writer inserts and commits
+
+Usage: python benchmarks/bench_sqlite_profile.py --seconds 5 --readers 4
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, select  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from database import Base, PriceCalculation, create_db_engine  # noqa: E402
+
+
+def seed(engine, rows: int):
+    start = date(2025, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(PriceCalculation), [
+            {
+                "orange_type": ("tangerine", "green-sweet", "mandarin")[i % 3],
+                "weight_kg": 1.0 + i % 10,
+                "price_per_kg": 45.0,
+                "total_price": 45.0 * (1.0 + i % 10),
+                "date": start + timedelta(days=i % 365),
+            }
+            for i in range(rows)
+        ])
+
+
+def run_workload(engine, seconds: float, readers: int) -> dict:
+    stop = threading.Event()
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    query = select(PriceCalculation).order_by(PriceCalculation.date.desc()).limit(10)
+
+    def bump(key):
+        with lock:
+            counts[key] += 1
+
+    def reader():
+        while not stop.is_set():
+            try:
+                with engine.connect() as conn:
+                    conn.execute(query).all()
+                bump("reads")
+            except OperationalError:
+                bump("errors")
+
+    def writer():
+        while not stop.is_set():
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(PriceCalculation).values(
+                        orange_type="mandarin", weight_kg=1.0, price_per_kg=55.0,
+                        total_price=55.0, date=date.today(),
+                    ))
+                bump("writes")
+            except OperationalError:
+                bump("errors")
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    return {
+        "reads_per_sec": counts["reads"] / seconds,
+        "writes_per_sec": counts["writes"] / seconds,
+        "errors": counts["errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, tuned in (("default", False), ("tuned", True)):
+            url = f"sqlite:///{os.path.join(tmp, label + '.db')}"
+            engine = create_db_engine(url, tuned=tuned)
+            Base.metadata.create_all(bind=engine)
+            seed(engine, args.rows)
+            result = run_workload(engine, args.seconds, args.readers)
+            engine.dispose()
+            print(f"{label:8s} reads/s={result['reads_per_sec']:10.1f}  "
+                  f"writes/s={result['writes_per_sec']:8.1f}  errors={result['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: matching scraped product names to orange varieties
+Compares the old keyword loop + if/elif name-to-ID chain with the compiled
+single-regex VarietyMatcher, on pages with thousands of rows
+
+Usage: python benchmarks/bench_variety_matcher.py --rows 5000 50000 --extra-varieties 0 30
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from variety_matcher import DEFAULT_VARIETIES, VarietyMatcher  # noqa: E402
+
+OTHER_FRUIT = ["มะม่วงน้ำดอกไม้", "ทุเรียนหมอนทอง", "มังคุด", "เงาะโรงเรียน", "ลำไยอีดอ",
+               "สับปะรดภูแล", "กล้วยหอมทอง", "ฝรั่งกิมจู", "แตงโมจินตหรา", "ลิ้นจี่ฮงฮวย"]
+
+
+def legacy_match(names, varieties):
+    """Original approach: any(keyword in name), then an if/elif chain per keyword"""
+    keywords = list(varieties)
+    matched = []
+    for name in names:
+        if not any(keyword in name for keyword in keywords):
+            continue
+        orange_id = None
+        for keyword in keywords:  # the hardcoded if/elif chain, generalised
+            if keyword in name:
+                orange_id = varieties[keyword]
+                break
+        matched.append(orange_id)
+    return matched
+
+
+def compiled_match(names, matcher):
+    matched = []
+    for name in names:
+        variety = matcher.match(name)
+        if variety:
+            matched.append(variety.orange_id)
+    return matched
+
+
+def build_names(rows: int, varieties, rng):
+    keywords = list(varieties)
+    names = []
+    for _ in range(rows):
+        if rng.random() < 0.2:
+            names.append(f"ส้ม{rng.choice(keywords)} คัดพิเศษ")
+        else:
+            names.append(f"{rng.choice(OTHER_FRUIT)} คละไซส์")
+    return names
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[5_000, 50_000])
+    parser.add_argument("--extra-varieties", type=int, nargs="+", default=[0, 30])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    print(f"{'varieties':>9s} {'rows':>7s} {'legacy':>10s} {'compiled':>10s} {'speedup':>8s}")
+    for extra in args.extra_varieties:
+        varieties = dict(DEFAULT_VARIETIES)
+        varieties.update({f"ส้มพันธุ์{i:03d}": f"variety-{i}" for i in range(extra)})
+        matcher = VarietyMatcher(varieties)
+        for rows in args.rows:
+            names = build_names(rows, varieties, rng)
+            assert legacy_match(names, varieties) == compiled_match(names, matcher)
+            legacy = best_of(lambda: legacy_match(names, varieties), args.repeat)
+            compiled = best_of(lambda: compiled_match(names, matcher), args.repeat)
+            print(f"{len(varieties):9d} {rows:7d} {legacy * 1000:8.1f}ms "
+                  f"{compiled * 1000:8.1f}ms {legacy / compiled:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Write-behind buffer for price calculations
+Calculations get their IDs up front, are answered immediately, and are flushed
+to price_calculations in bulk when the buffer is big or old enough
+Enable with CALC_WRITE_MODE=write-behind (default is synchronous commits)
+"""
+
+import asyncio
+import os
+from typing import List, Optional
+
+from sqlalchemy import insert
+
+from database import PriceCalculation, reserve_calculation_ids
+from stats import apply_calculation_stats
+
+CALC_WRITE_MODE = os.getenv("CALC_WRITE_MODE", "sync")
+WRITE_BEHIND_ENABLED = CALC_WRITE_MODE == "write-behind"
+
+# Flush when this many rows are buffered...
+CALC_FLUSH_SIZE = int(os.getenv("CALC_FLUSH_SIZE", "200"))
+# ...or when the oldest buffered row is this many seconds old
+CALC_FLUSH_INTERVAL = float(os.getenv("CALC_FLUSH_INTERVAL", "0.5"))
+# Bounded queue; submitters wait up to CALC_ENQUEUE_TIMEOUT seconds when full
+CALC_QUEUE_SIZE = int(os.getenv("CALC_QUEUE_SIZE", "10000"))
+CALC_ENQUEUE_TIMEOUT = float(os.getenv("CALC_ENQUEUE_TIMEOUT", "2"))
+# Flush attempts before a batch is given up and logged
+CALC_FLUSH_RETRIES = int(os.getenv("CALC_FLUSH_RETRIES", "10"))
+# IDs reserved from the database per round trip
+CALC_ID_BLOCK_SIZE = int(os.getenv("CALC_ID_BLOCK_SIZE", "1000"))
+
+_STOP = object()
+
+
+class WriterBusyError(Exception):
+    """The buffer stayed full for longer than the enqueue timeout"""
+
+
+class CalculationWriter:
+    """Buffers PriceCalculation rows and inserts them in batches"""
+
+    def __init__(
+        self,
+        session_factory,
+        flush_size: int = CALC_FLUSH_SIZE,
+        flush_interval: float = CALC_FLUSH_INTERVAL,
+        queue_size: int = CALC_QUEUE_SIZE,
+        enqueue_timeout: float = CALC_ENQUEUE_TIMEOUT,
+        id_block_size: int = CALC_ID_BLOCK_SIZE,
+    ):
+        self.session_factory = session_factory
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.enqueue_timeout = enqueue_timeout
+        self.id_block_size = id_block_size
+        self.flushed_count = 0
+        self._queue: Optional[asyncio.Queue] = None
+        # Set whenever the flusher takes rows off the queue
+        self._room: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # IDs reserved from the database and not yet handed out
+        self._reserved: List[int] = []
+        self._id_lock = asyncio.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Calculations accepted but not yet flushed"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        """Start the background flusher"""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._room = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Drain everything still buffered, then stop (shutdown hook)"""
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def submit(self, row: dict) -> int:
+        """Queue one calculation row and return its assigned ID"""
+        return (await self.submit_many([row]))[0]
+
+    async def submit_many(self, rows: List[dict]) -> List[int]:
+        """
+        Queue calculation rows and return their assigned IDs
+        All or nothing: the rows are queued together once the buffer has room for
+        all of them, so a WriterBusyError never leaves part of a batch behind
+        """
+        if len(rows) > self.queue_size:
+            raise WriterBusyError(
+                f"Batch of {len(rows)} calculations is larger than the buffer ({self.queue_size})"
+            )
+        ids = await self._allocate_ids(len(rows))
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.enqueue_timeout
+        while self.queue_size - self._queue.qsize() < len(rows):
+            self._room.clear()
+            try:
+                await asyncio.wait_for(self._room.wait(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                raise WriterBusyError("Calculation buffer is full, try again later")
+        # No await between the room check and the puts, so no one else can take the room
+        for row, calculation_id in zip(rows, ids):
+            self._queue.put_nowait({**row, "id": calculation_id})
+        return ids
+
+    async def _allocate_ids(self, count: int) -> List[int]:
+        async with self._id_lock:
+            if len(self._reserved) < count:
+                block = max(self.id_block_size, count - len(self._reserved))
+                self._reserved += await asyncio.to_thread(self._reserve, block)
+            ids, self._reserved = self._reserved[:count], self._reserved[count:]
+            return ids
+
+    def _reserve(self, count: int) -> List[int]:
+        db = self.session_factory()
+        try:
+            ids = reserve_calculation_ids(db, count)
+            db.commit()
+            return ids
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._take()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.flush_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._take(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush_with_retry(batch)
+
+    async def _take(self):
+        """Next queued row; wakes submitters waiting for room"""
+        item = await self._queue.get()
+        self._room.set()
+        return item
+
+    async def _flush_with_retry(self, batch: List[dict]):
+        delay = 0.1
+        for attempt in range(1, CALC_FLUSH_RETRIES + 1):
+            try:
+                await asyncio.to_thread(self._flush, batch)
+                self.flushed_count += len(batch)
+                return
+            except Exception as e:
+                print(f"[WRITER] Flush of {len(batch)} calculations failed "
+                      f"(attempt {attempt}/{CALC_FLUSH_RETRIES}): {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 5.0)
+        print(f"[WRITER] Dropped calculations {batch[0]['id']}..{batch[-1]['id']}: {batch}")
+
+    def _flush(self, batch: List[dict]):
+        db = self.session_factory()
+        try:
+            db.execute(insert(PriceCalculation), batch)
+            apply_calculation_stats(db, batch)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
@@ -0,0 +1,133 @@
+"""
+In-process cache of orange types, prices, measurements, the variety matcher and
+the per-variety density fits used for weight estimation
+Revalidated against the catalog_version counter in the database, so writers in
+other processes (update_prices.py, other workers) stay coherent
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, aliased
+
+from database import OrangeMeasurement, OrangeType, OrangeVariety, get_catalog_version
+from estimation import DensityFit, calibrate_densities
+from variety_matcher import VarietyMatcher
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """Immutable copy of one orange type and its first measurement"""
+    orange_id: str
+    name: str
+    price_per_kg: float
+    color: Optional[str]
+    grade: Optional[str]
+    height_cm: Optional[float] = None
+    radius_cm: Optional[float] = None
+    diameter_cm: Optional[float] = None
+    weight_avg_g: Optional[float] = None
+
+    @property
+    def has_measurement(self) -> bool:
+        return self.weight_avg_g is not None
+
+
+class CatalogCache:
+    """Orange catalog keyed by orange_id"""
+
+    def __init__(self):
+        self._version: Optional[int] = None
+        self._entries: Dict[str, CatalogEntry] = {}
+        self._matcher: Optional[VarietyMatcher] = None
+        self._densities: Optional[Dict[str, DensityFit]] = None
+        self._lock = threading.Lock()
+        # Reads served from memory vs reads that reloaded the catalog
+        self.stats = {"hit": 0, "reload": 0}
+
+    @property
+    def version(self) -> Optional[int]:
+        return self._version
+
+    def entries(self, db: Session, version: Optional[int] = None) -> Dict[str, CatalogEntry]:
+        """
+        Return all entries, reloading only if the version counter moved
+        Pass a version already read in this transaction to skip the version query
+        """
+        if version is None:
+            version = get_catalog_version(db)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._entries = self._load(db)
+                    self._matcher = None
+                    self._densities = None
+                    self._version = version
+                    self.stats["reload"] += 1
+                    return self._entries
+        self.stats["hit"] += 1
+        return self._entries
+
+    def matcher(self, db: Session, version: Optional[int] = None) -> VarietyMatcher:
+        """Compiled variety matcher built from the orange_varieties table"""
+        self.entries(db, version)
+        matcher = self._matcher
+        if matcher is None:
+            matcher = VarietyMatcher.from_rows(
+                db.query(OrangeVariety.keyword, OrangeVariety.orange_id).all()
+            )
+            self._matcher = matcher
+        return matcher
+
+    def densities(self, db: Session, version: Optional[int] = None) -> Dict[str, DensityFit]:
+        """Density per orange_id, fitted to all of its measurement rows"""
+        self.entries(db, version)
+        densities = self._densities
+        if densities is None:
+            densities = calibrate_densities(db)
+            self._densities = densities
+        return densities
+
+    def get(
+        self, db: Session, orange_id: str, version: Optional[int] = None
+    ) -> Optional[CatalogEntry]:
+        """Look up one orange type"""
+        return self.entries(db, version).get(orange_id)
+
+    def invalidate(self):
+        """Force a reload on the next read"""
+        with self._lock:
+            self._version = None
+            self._entries = {}
+            self._matcher = None
+            self._densities = None
+
+    @staticmethod
+    def _load(db: Session) -> Dict[str, CatalogEntry]:
+        # Only each type's first measurement is joined, however many rows were bulk-loaded
+        first = aliased(OrangeMeasurement)
+        first_id = select(func.min(first.id)).where(
+            first.orange_id == OrangeType.orange_id
+        ).correlate(OrangeType).scalar_subquery()
+        rows = db.query(OrangeType, OrangeMeasurement).outerjoin(
+            OrangeMeasurement, OrangeMeasurement.id == first_id
+        ).order_by(OrangeType.id).all()
+
+        entries = {}
+        for orange, measurement in rows:
+            entries[orange.orange_id] = CatalogEntry(
+                orange_id=orange.orange_id,
+                name=orange.name,
+                price_per_kg=orange.price_per_kg,
+                color=orange.color,
+                grade=orange.grade,
+                height_cm=measurement.height_cm if measurement else None,
+                radius_cm=measurement.radius_cm if measurement else None,
+                diameter_cm=measurement.diameter_cm if measurement else None,
+                weight_avg_g=measurement.weight_avg_g if measurement else None,
+            )
+        return entries
+
+catalog = CatalogCache()
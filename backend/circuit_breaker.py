@@ -0,0 +1,78 @@
+"""
+Circuit breaker for upstream price sources
+- closed: calls go through; CIRCUIT_FAILURE_THRESHOLD failures in a row open it
+- open: calls fail at once with CircuitOpenError for CIRCUIT_RESET_TIMEOUT seconds
+- half-open: one probe call is let through; success closes the circuit again,
+  failure re-opens it for another CIRCUIT_RESET_TIMEOUT
+"""
+
+import os
+import time
+from typing import Callable
+
+# Consecutive failures that open the circuit
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+# Seconds the circuit stays open before a probe is allowed
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Tracks consecutive failures of one upstream"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        # How often the circuit opened and how many calls it turned away
+        self.stats = {"opened": 0, "rejected": 0}
+
+    def before_call(self):
+        """Raise CircuitOpenError unless the call may go upstream"""
+        if self.state == OPEN:
+            remaining = self.reset_timeout - (self.clock() - self.opened_at)
+            if remaining > 0:
+                self.stats["rejected"] += 1
+                raise CircuitOpenError(f"{self.name}: circuit open, next probe in {remaining:.0f}s")
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self._probing:
+                self.stats["rejected"] += 1
+                raise CircuitOpenError(f"{self.name}: circuit half-open, probe in progress")
+            self._probing = True
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.stats["opened"] += 1
+            self.state = OPEN
+            self.opened_at = self.clock()
+        self._probing = False
+
+    def release(self):
+        """The call was abandoned (cancelled) without an outcome"""
+        self._probing = False
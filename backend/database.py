@@ -1,20 +1,75 @@
 """
 Database models for Orange Calculator App
-Uses SQLAlchemy with SQLite
+Uses SQLAlchemy with SQLite by default; set DATABASE_URL for another database
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, Date, ForeignKey
+import os
+from typing import Dict, List
+
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, Date, DateTime, Text, ForeignKey, Index, insert, select, update, func, case, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 # Database setup
-SQLALCHEMY_DATABASE_URL = "sqlite:///./orange_calculator.db"
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./orange_calculator.db")
+
+# SQLite connection pragmas
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+
+# Connection pool settings (also used for server databases such as PostgreSQL)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune every new SQLite connection for concurrent readers and one writer"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL, tuned: bool = True, **kwargs) -> Engine:
+    """
+    Create the SQLAlchemy engine for a database URL
+    - SQLite: WAL, synchronous=NORMAL, busy_timeout, mmap and cache-size pragmas
+    - other databases: pool size, overflow, timeout and recycle settings
+    tuned=False gives the plain defaults (used by the benchmarks)
+    """
+    if url.startswith("sqlite"):
+        kwargs.setdefault("connect_args", {"check_same_thread": False})
+        if tuned and ":memory:" not in url and url != "sqlite://":
+            kwargs.setdefault("pool_size", DB_POOL_SIZE)
+            kwargs.setdefault("max_overflow", DB_MAX_OVERFLOW)
+            kwargs.setdefault("pool_timeout", DB_POOL_TIMEOUT)
+        new_engine = create_engine(url, **kwargs)
+        if tuned:
+            event.listen(new_engine, "connect", _apply_sqlite_pragmas)
+        return new_engine
+    
+    if tuned:
+        kwargs.setdefault("pool_size", DB_POOL_SIZE)
+        kwargs.setdefault("max_overflow", DB_MAX_OVERFLOW)
+        kwargs.setdefault("pool_timeout", DB_POOL_TIMEOUT)
+        kwargs.setdefault("pool_recycle", DB_POOL_RECYCLE)
+        kwargs.setdefault("pool_pre_ping", True)
+    return create_engine(url, **kwargs)
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}
-)
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -32,10 +87,21 @@ class OrangeType(Base):
     grade = Column(String)
     
     # Relationships
-    measurements = relationship("OrangeMeasurement", back_populates="orange_type")
+    measurements = relationship(
+        "OrangeMeasurement", back_populates="orange_type", order_by="OrangeMeasurement.id"
+    )
     calculations = relationship("PriceCalculation", back_populates="orange")
 
 
+class OrangeVariety(Base):
+    """ตาราง orange_varieties - คำค้นชื่อสินค้าจากตลาด -> ชนิดส้ม"""
+    __tablename__ = "orange_varieties"
+    
+    id = Column(Integer, primary_key=True)
+    keyword = Column(String, unique=True, nullable=False)
+    orange_id = Column(String, ForeignKey("orange_types.orange_id"), nullable=False)
+
+
 class OrangeMeasurement(Base):
     """ตาราง orange_measurements - ข้อมูลการวัด"""
     __tablename__ = "orange_measurements"
@@ -49,6 +115,11 @@ class OrangeMeasurement(Base):
     
     # Relationship
     orange_type = relationship("OrangeType", back_populates="measurements")
+    
+    # Measurements are read per variety (first row for the catalog)
+    __table_args__ = (
+        Index("ix_orange_measurements_orange_id_id", "orange_id", "id"),
+    )
 
 
 class PriceCalculation(Base):
@@ -64,6 +135,225 @@ class PriceCalculation(Base):
     
     # Relationship
     orange = relationship("OrangeType", back_populates="calculations")
+    
+    # History is read newest first, optionally filtered by orange type
+    __table_args__ = (
+        Index("ix_price_calculations_date_id", "date", "id"),
+        Index("ix_price_calculations_orange_type_date", "orange_type", "date"),
+    )
+
+
+class PriceHistory(Base):
+    """ตาราง price_history - ราคาตลาดทุกครั้งที่ดึงข้อมูล (append-only)"""
+    __tablename__ = "price_history"
+    
+    id = Column(Integer, primary_key=True)
+    scraped_at = Column(DateTime, nullable=False)
+    name = Column(String, nullable=False)
+    grade = Column(String, nullable=False)
+    price_min = Column(Float, nullable=False)
+    price_max = Column(Float, nullable=False)
+    unit = Column(String)
+    
+    __table_args__ = (
+        Index("ix_price_history_name_grade_scraped_at", "name", "grade", "scraped_at"),
+    )
+
+
+class PriceRollup(Base):
+    """ตาราง price_rollups - สรุปราคารายวัน/รายสัปดาห์ (open/high/low/close)"""
+    __tablename__ = "price_rollups"
+    
+    period = Column(String, primary_key=True)  # "day" or "week"
+    period_start = Column(Date, primary_key=True)
+    name = Column(String, primary_key=True)
+    grade = Column(String, primary_key=True)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    price_sum = Column(Float, nullable=False)
+    sample_count = Column(Integer, nullable=False)
+    first_at = Column(DateTime, nullable=False)
+    last_at = Column(DateTime, nullable=False)
+
+
+class LastGoodSnapshot(Base):
+    """ตาราง price_snapshots - ราคาล่าสุดที่ดึงสำเร็จ (ใช้แทนเมื่อดึงข้อมูลไม่ได้)"""
+    __tablename__ = "price_snapshots"
+    
+    id = Column(Integer, primary_key=True)  # always 1
+    fetched_at = Column(DateTime, nullable=False)  # UTC
+    sources = Column(String, nullable=False)  # comma-separated source names
+    content_hash = Column(String)
+    data = Column(Text, nullable=False)  # JSON list of OrangePrice
+
+
+class CalculationStats(Base):
+    """ตาราง calculation_stats - สรุปจำนวน/น้ำหนัก/ยอดขายต่อชนิดส้ม"""
+    __tablename__ = "calculation_stats"
+    
+    orange_type = Column(String, primary_key=True)
+    calculation_count = Column(Integer, nullable=False, default=0)
+    total_weight_kg = Column(Float, nullable=False, default=0.0)
+    total_revenue = Column(Float, nullable=False, default=0.0)
+
+
+# calculation_histogram buckets: weight_kg rounded to the nearest 10 g
+WEIGHT_BUCKETS_PER_KG = 100
+
+
+class CalculationHistogram(Base):
+    """ตาราง calculation_histogram - สรุปรายวันต่อชนิดส้มและช่วงน้ำหนัก (ช่วงละ 10 กรัม)"""
+    __tablename__ = "calculation_histogram"
+    
+    date = Column(Date, primary_key=True)
+    orange_type = Column(String, primary_key=True)
+    weight_bucket = Column(Integer, primary_key=True)  # round(weight_kg * WEIGHT_BUCKETS_PER_KG)
+    calculation_count = Column(Integer, nullable=False, default=0)
+    total_weight_kg = Column(Float, nullable=False, default=0.0)
+    total_revenue = Column(Float, nullable=False, default=0.0)
+
+
+class SchemaMigration(Base):
+    """ตาราง schema_migrations - migration ที่รันแล้ว"""
+    __tablename__ = "schema_migrations"
+    
+    version = Column(Integer, primary_key=True)
+    description = Column(String, nullable=False)
+    applied_at = Column(DateTime, default=datetime.now, nullable=False)
+
+
+class CatalogVersion(Base):
+    """ตาราง catalog_version - ตัวนับเวอร์ชันของข้อมูลชนิดส้มและราคา"""
+    __tablename__ = "catalog_version"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+def get_catalog_version(db) -> int:
+    """Read the catalog version counter (one tiny single-row query)"""
+    version = db.execute(
+        select(CatalogVersion.version).where(CatalogVersion.id == 1)
+    ).scalar()
+    return version or 0
+
+
+def bump_catalog_version(db):
+    """
+    Mark orange types / prices / varieties as changed
+    Call inside the writer's transaction, before commit (a Session or a Connection)
+    """
+    result = db.execute(
+        update(CatalogVersion).where(CatalogVersion.id == 1).values(
+            version=CatalogVersion.version + 1
+        )
+    )
+    if result.rowcount == 0:
+        db.execute(insert(CatalogVersion).values(id=1, version=1))
+
+
+def seed_orange_varieties(db, varieties: Dict[str, str]) -> int:
+    """
+    Add keyword -> orange_id rows whose orange type exists and keyword is new
+    Keywords for missing types are skipped, so the foreign key always holds;
+    bumps the catalog version when rows were added. Returns how many
+    """
+    known = set(db.execute(
+        select(OrangeType.orange_id).where(OrangeType.orange_id.in_(set(varieties.values())))
+    ).scalars())
+    existing = set(db.execute(
+        select(OrangeVariety.keyword).where(OrangeVariety.keyword.in_(list(varieties)))
+    ).scalars())
+    rows = [
+        {"keyword": keyword, "orange_id": orange_id}
+        for keyword, orange_id in varieties.items()
+        if orange_id in known and keyword not in existing
+    ]
+    if rows:
+        db.execute(insert(OrangeVariety), rows)
+        bump_catalog_version(db)
+    return len(rows)
+
+
+class IdSequence(Base):
+    """ตาราง id_sequences - ช่วง ID ที่จองไว้ล่วงหน้า (write-behind)"""
+    __tablename__ = "id_sequences"
+    
+    name = Column(String, primary_key=True)
+    next_id = Column(Integer, nullable=False)
+
+
+def reserve_calculation_ids(db, count: int) -> List[int]:
+    """
+    Reserve count price_calculations IDs
+    They never overlap existing rows or IDs handed to other processes. On
+    PostgreSQL they come from the table's own SERIAL sequence, so later plain
+    inserts (sync mode, seed_db.py) skip them; elsewhere a block above the
+    table's highest id is reserved in id_sequences
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        sequence = func.pg_get_serial_sequence(PriceCalculation.__tablename__, "id")
+        return list(db.execute(
+            select(func.nextval(sequence)).select_from(func.generate_series(1, count))
+        ).scalars())
+
+    table_next = select(func.coalesce(func.max(PriceCalculation.id), 0) + 1).scalar_subquery()
+    result = db.execute(
+        update(IdSequence).where(IdSequence.name == PriceCalculation.__tablename__).values(
+            next_id=case(
+                (IdSequence.next_id > table_next, IdSequence.next_id), else_=table_next
+            ) + count
+        )
+    )
+    if result.rowcount == 0:
+        first_id = db.execute(
+            select(func.coalesce(func.max(PriceCalculation.id), 0) + 1)
+        ).scalar()
+        db.add(IdSequence(name=PriceCalculation.__tablename__, next_id=first_id + count))
+        db.flush()
+        return list(range(first_id, first_id + count))
+    next_id = db.execute(
+        select(IdSequence.next_id).where(IdSequence.name == PriceCalculation.__tablename__)
+    ).scalar()
+    return list(range(next_id - count, next_id))
+
+
+class WorkerLease(Base):
+    """ตาราง worker_leases - สิทธิ์ทำงานเบื้องหลังของ worker เดียว (มีวันหมดอายุ)"""
+    __tablename__ = "worker_leases"
+    
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)  # UTC
+
+
+def acquire_lease(db, name: str, holder: str, ttl: float) -> bool:
+    """
+    Take or renew the named lease for holder; True when holder owns it now
+    A lease is taken over only once it has expired. Use a session of its own
+    and commit right after
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    expires_at = now + timedelta(seconds=ttl)
+    result = db.execute(
+        update(WorkerLease).where(
+            WorkerLease.name == name,
+            or_(WorkerLease.holder == holder, WorkerLease.expires_at < now),
+        ).values(holder=holder, expires_at=expires_at)
+    )
+    if result.rowcount:
+        return True
+    if db.get(WorkerLease, name) is not None:
+        return False
+    try:
+        db.add(WorkerLease(name=name, holder=holder, expires_at=expires_at))
+        db.flush()
+    except IntegrityError:
+        db.rollback()  # another worker created it first
+        return False
+    return True
 
 
 # Database dependency
@@ -77,6 +367,18 @@ def get_db():
 
 
 def init_db():
-    """Initialize database - create all tables"""
+    """Initialize database - create all tables and apply pending migrations"""
+    from migrations import run_migrations
+    
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    
+    # Ensure the catalog version row exists
+    db = SessionLocal()
+    try:
+        if db.get(CatalogVersion, 1) is None:
+            db.add(CatalogVersion(id=1, version=0))
+            db.commit()
+    finally:
+        db.close()
     print("[OK] Database tables created successfully!")
@@ -0,0 +1,149 @@
+"""
+Weight and price estimation from fruit dimensions
+A fruit is modelled as an ellipsoid of revolution: volume = pi/6 x height x
+diameter^2. Each variety's effective density (g per cm^3) is fitted to its
+orange_measurements rows by least squares through the origin, so the fit is
+weight = density x volume. The fit and its error need four sums per variety,
+which the database computes in one grouped query. Estimation is vectorized over the whole
+batch with NumPy
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Dict, Mapping, Sequence
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from database import OrangeMeasurement
+
+# Fraction of the enclosing cylinder an ellipsoid fills: pi/4 x 2/3
+ELLIPSOID_FACTOR = math.pi / 6
+
+NOT_FOUND = "Orange not found"
+NOT_CALIBRATED = "No measurements for this orange type"
+BAD_DIMENSIONS = "Height and diameter must be positive"
+
+
+@dataclass(frozen=True)
+class DensityFit:
+    """Calibrated density of one variety"""
+    density_g_cm3: float
+    samples: int
+    # Root mean square of the relative error over the calibration rows
+    relative_error: float
+
+
+def ellipsoid_volume_cm3(height_cm, diameter_cm):
+    """Volume of an ellipsoid with the given height and equatorial diameter"""
+    return ELLIPSOID_FACTOR * np.asarray(height_cm) * np.square(diameter_cm)
+
+
+def calibrate_densities(db: Session) -> Dict[str, DensityFit]:
+    """Fit density per orange_id to every measurement row of that variety"""
+    m = OrangeMeasurement
+    volume = ELLIPSOID_FACTOR * m.height_cm * m.diameter_cm * m.diameter_cm
+    rows = db.execute(
+        select(
+            m.orange_id, func.count(), func.sum(m.weight_avg_g * volume),
+            func.sum(volume * volume), func.sum(volume / m.weight_avg_g),
+            func.sum(volume * volume / (m.weight_avg_g * m.weight_avg_g)),
+        ).where(m.height_cm > 0, m.diameter_cm > 0, m.weight_avg_g > 0).group_by(m.orange_id)
+    ).all()
+
+    fits = {}
+    for orange_id, samples, wv, vv, v_w, vv_ww in rows:
+        if not vv:
+            continue
+        density = wv / vv
+        # mean of (density x V / W - 1)^2, expanded into the sums above
+        mse = (density * density * vv_ww - 2 * density * v_w + samples) / samples
+        fits[orange_id] = DensityFit(density, samples, math.sqrt(max(mse, 0.0)))
+    return fits
+
+
+def estimate_batch(
+    orange_ids: Sequence[str],
+    height_cm: Sequence[float],
+    diameter_cm: Sequence[float],
+    densities: Mapping[str, DensityFit],
+    prices: Mapping[str, float],
+) -> dict:
+    """
+    Estimate weight (g) and price of every fruit in one pass
+    Returns per-fruit arrays (NaN where no estimate is possible, with the reason
+    in errors) and batch totals over the estimated fruits
+    """
+    heights = np.asarray(height_cm, dtype=np.float64)
+    diameters = np.asarray(diameter_cm, dtype=np.float64)
+    count = len(orange_ids)
+    if heights.shape != (count,) or diameters.shape != (count,):
+        raise ValueError("orange_id, height_cm and diameter_cm must have the same length")
+
+    # One lookup per distinct variety, then gather by code
+    names, codes = np.unique(np.asarray(orange_ids, dtype=object), return_inverse=True)
+    fit_density = np.array([densities[n].density_g_cm3 if n in densities else np.nan for n in names])
+    price_per_kg = np.array([prices.get(n, np.nan) for n in names], dtype=np.float64)
+    known = np.array([n in prices for n in names], dtype=bool)
+
+    density = fit_density[codes]
+    price = price_per_kg[codes]
+    valid_size = np.isfinite(heights) & np.isfinite(diameters) & (heights > 0) & (diameters > 0)
+    weight_g = np.round(density * ellipsoid_volume_cm3(heights, diameters), 1)
+    weight_g[~valid_size] = np.nan
+    total_price = np.round(weight_g / 1000 * price, 2)
+
+    ok = np.isfinite(total_price)
+    errors: Dict[int, str] = {}
+    for index in np.flatnonzero(~ok).tolist():
+        if not known[codes[index]]:
+            errors[index] = NOT_FOUND
+        elif not valid_size[index]:
+            errors[index] = BAD_DIMENSIONS
+        else:
+            errors[index] = NOT_CALIBRATED
+
+    return {
+        "weight_g": weight_g,
+        "price_per_kg": price,
+        "total_price": total_price,
+        "errors": errors,
+        "estimated_count": int(ok.sum()),
+        "total_weight_kg": round(float(weight_g[ok].sum()) / 1000, 3),
+        "total_price_sum": round(float(total_price[ok].sum()), 2),
+    }
+
+
+def _nullable(values: np.ndarray) -> list:
+    """NumPy floats as a JSON list, NaN as null"""
+    return [None if math.isnan(v) else v for v in values.tolist()]
+
+
+def estimate_response(result: dict, densities: Mapping[str, DensityFit],
+                      orange_ids: Sequence[str]) -> dict:
+    """estimate_batch() output as a JSON-ready body"""
+    present = set(orange_ids)
+    return {
+        "count": len(orange_ids),
+        "estimated_count": result["estimated_count"],
+        "failed_count": len(result["errors"]),
+        "weight_g": _nullable(result["weight_g"]),
+        "total_price": _nullable(result["total_price"]),
+        "errors": [
+            {"index": index, "orange_id": orange_ids[index], "error": error}
+            for index, error in sorted(result["errors"].items())
+        ],
+        "total_weight_kg": result["total_weight_kg"],
+        "batch_total": result["total_price_sum"],
+        "models": {
+            orange_id: {
+                "density_g_cm3": round(fit.density_g_cm3, 4),
+                "samples": fit.samples,
+                "relative_error": round(fit.relative_error, 4),
+            }
+            for orange_id, fit in densities.items()
+            if orange_id in present
+        },
+    }
+
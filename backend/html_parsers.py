@@ -0,0 +1,106 @@
+"""
+Pluggable HTML parsing for the price table scraper
+Every backend returns the same thing: the price table's data rows (header row
+skipped) as lists of stripped cell texts, or None when the page has no table
+
+Backends, fastest first:
+- lxml: C-backed libxml2 parser (default when lxml is installed)
+- bs4-strainer: BeautifulSoup limited to <table> elements with a SoupStrainer
+- html.parser: BeautifulSoup with the pure-Python parser (original behaviour)
+Choose with HTML_PARSER_BACKEND=auto|lxml|bs4-strainer|html.parser
+"""
+
+import os
+import re
+from typing import Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.html
+    from lxml import etree
+    _PARSE_ERRORS = (ValueError, etree.ParserError)
+except ImportError:  # pragma: no cover - lxml is in requirements.txt
+    lxml = None
+    _PARSE_ERRORS = (ValueError,)
+
+HTML_PARSER_BACKEND = os.getenv("HTML_PARSER_BACKEND", "auto")
+
+# Preferred table: class contains "price" or "table"; otherwise the first table
+TABLE_CLASS_PATTERN = re.compile(r"price|table", re.I)
+
+Rows = List[List[str]]
+
+
+def _soup_rows(soup: BeautifulSoup) -> Optional[Rows]:
+    table = soup.find("table", class_=TABLE_CLASS_PATTERN)
+    if not table:
+        table = soup.find("table")
+    if not table:
+        return None
+    return [
+        [cell.get_text(strip=True) for cell in row.find_all(["td", "th"])]
+        for row in table.find_all("tr")[1:]  # Skip header row
+    ]
+
+
+def parse_rows_html_parser(html: str) -> Optional[Rows]:
+    """Pure-Python BeautifulSoup parse of the whole page"""
+    return _soup_rows(BeautifulSoup(html, "html.parser"))
+
+
+def parse_rows_bs4_strainer(html: str) -> Optional[Rows]:
+    """BeautifulSoup that only builds <table> subtrees"""
+    return _soup_rows(BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("table")))
+
+
+def _cell_text(element) -> str:
+    return "".join(text.strip() for text in element.itertext())
+
+
+def parse_rows_lxml(html: str) -> Optional[Rows]:
+    """libxml2 parse with the same table selection and text rules as BeautifulSoup"""
+    document = lxml.html.document_fromstring(html)
+    tables = list(document.iter("table"))
+    table = next(
+        (
+            t for t in tables
+            if any(TABLE_CLASS_PATTERN.search(c) for c in (t.get("class") or "").split())
+        ),
+        tables[0] if tables else None,
+    )
+    if table is None:
+        return None
+    return [
+        [_cell_text(cell) for cell in row.iter("td", "th")]
+        for row in list(table.iter("tr"))[1:]  # Skip header row
+    ]
+
+
+BACKENDS: Dict[str, Callable[[str], Optional[Rows]]] = {
+    "html.parser": parse_rows_html_parser,
+    "bs4-strainer": parse_rows_bs4_strainer,
+}
+if lxml is not None:
+    BACKENDS["lxml"] = parse_rows_lxml
+
+
+def resolve_backend(name: str = HTML_PARSER_BACKEND) -> str:
+    """Map "auto" (or an unavailable backend) to the fastest available one"""
+    if name in BACKENDS:
+        return name
+    return "lxml" if "lxml" in BACKENDS else "html.parser"
+
+
+def extract_price_rows(html: str, backend: Optional[str] = None) -> Optional[Rows]:
+    """
+    Return the price table's data rows as cell texts
+    Falls back to html.parser if the fast backend cannot handle the page
+    """
+    name = resolve_backend(backend or HTML_PARSER_BACKEND)
+    if name == "html.parser":
+        return parse_rows_html_parser(html)
+    try:
+        return BACKENDS[name](html)
+    except _PARSE_ERRORS:
+        return parse_rows_html_parser(html)
@@ -4,32 +4,79 @@ Filters for: แมนดาริน (Mandarin), เขียวหวาน (T
 With SQLite Database Integration
 """
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-import requests
-from bs4 import BeautifulSoup
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import insert, tuple_
+from sqlalchemy.orm import Session, joinedload
+import httpx
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, TypeAdapter
+import os
 import re
-from datetime import datetime
+import asyncio
+import base64
+import binascii
+import socket
+import time
+from datetime import date, datetime, timezone
 
 # Import database components
 from database import (
-    get_db, init_db, 
-    OrangeType as DBOrangeType,
+    get_db, init_db, acquire_lease, get_catalog_version, SessionLocal, engine,
     OrangeMeasurement as DBOrangeMeasurement,
-    PriceCalculation as DBPriceCalculation
+    PriceCalculation as DBPriceCalculation,
+    CalculationStats as DBCalculationStats
 )
+import scraper
+from circuit_breaker import CLOSED
+import market_sources
+from market_sources import (
+    MarketSource, RowExtractor, SourceResult, combined_hash, configured_sources,
+    scrape_sources, table_rows
+)
+from catalog import catalog
+from variety_matcher import VarietyMatcher, default_matcher
+from stats import apply_calculation_stats
+from analytics import calculation_analytics
+from estimation import estimate_batch, estimate_response
+from price_cache import PRICE_REFRESH_INTERVAL, PriceSnapshot, PriceSnapshotCache, ScrapeResult
+from price_history import (
+    PERIODS, get_price_rollups, load_last_good_snapshot, record_price_history,
+    save_last_good_snapshot
+)
+from price_updates import apply_bulk_prices, parse_price_list
+from calc_writer import CalculationWriter, WriterBusyError, WRITE_BEHIND_ENABLED
+import metrics
+
+# orjson for every response; list endpoints declare response models so FastAPI
+# serializes them with pydantic-core instead of walking them with jsonable_encoder
+app = FastAPI(title="Orange Price Scraper API", default_response_class=ORJSONResponse)
 
-app = FastAPI(title="Orange Price Scraper API")
+# Write-behind buffer for /api/calculate (None = synchronous commits)
+calc_writer = CalculationWriter(SessionLocal) if WRITE_BEHIND_ENABLED else None
 
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
     """Initialize database on application startup"""
-    init_db()
-    print("[DB] Database initialized")
+    # The multi-worker launcher initializes the schema once before forking
+    if os.getenv("DB_INIT_ON_STARTUP", "1") != "0":
+        init_db()
+        print("[DB] Database initialized")
+    await scraper.start_http_client()
+    price_cache.start()
+    if calc_writer:
+        await calc_writer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Drain buffered calculations, stop the refresher, release upstream connections"""
+    if calc_writer:
+        await calc_writer.stop()
+    await price_cache.stop()
+    await scraper.close_http_client()
 
 # Enable CORS for all origins (mobile simulator access)
 app.add_middleware(
@@ -40,6 +87,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Prometheus metrics: per-route latency, SQL statement timings (see /metrics)
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware, routes=app.router.routes)
+    metrics.instrument_engine(engine)
+
 
 class OrangePrice(BaseModel):
     """Model for orange price data"""
@@ -48,10 +100,89 @@ class OrangePrice(BaseModel):
     price_min: float
     price_max: float
     unit: str
+    orange_id: Optional[str] = None
+
+
+# Heaviest weighing (kg) /api/calculate accepts; anything above is a typo or a bad scale
+CALC_MAX_WEIGHT_KG = float(os.getenv("CALC_MAX_WEIGHT_KG", "1000"))
 
 
-# Keywords to filter
-ORANGE_KEYWORDS = ["แมนดาริน", "เขียวหวาน", "สายน้ำผึ้ง"]
+class CalculationItem(BaseModel):
+    """One weighed item in a batch calculation"""
+    orange_id: str
+    weight: float = Field(gt=0, le=CALC_MAX_WEIGHT_KG, allow_inf_nan=False)
+
+
+class FruitDimensions(BaseModel):
+    """Camera readings for a batch of fruits, one array entry per fruit"""
+    orange_id: List[str]
+    height_cm: List[float]
+    diameter_cm: List[float]
+
+
+class OrangeOut(BaseModel):
+    """Orange type as served to the Flutter app (measurement fields only when measured)"""
+    id: str
+    name: str
+    pricePerKg: float
+    color: Optional[str] = None
+    grade: Optional[str] = None
+    description: Optional[str] = None
+    height: Optional[float] = None
+    radius: Optional[float] = None
+    diameter: Optional[float] = None
+    weight_avg_g: Optional[float] = None
+
+
+class LivePrice(BaseModel):
+    """Catalog price for /api/prices"""
+    id: str
+    name: str
+    price: float
+    source: str
+    updated_at: str
+
+
+class PriceRollupOut(BaseModel):
+    """One daily/weekly market price rollup"""
+    period: str
+    period_start: str
+    name: str
+    grade: str
+    open: float
+    high: float
+    low: float
+    close: float
+    average: float
+    samples: int
+
+
+class CalculationOut(BaseModel):
+    """Saved price calculation"""
+    id: int
+    orange_type: str
+    orange_name: str
+    weight_kg: float
+    price_per_kg: float
+    total_price: float
+    date: str
+
+
+class MeasurementOut(BaseModel):
+    """Measured orange dimensions"""
+    id: int
+    orange_id: str
+    orange_name: str
+    height_cm: float
+    radius_cm: float
+    diameter_cm: float
+    weight_avg_g: float
+
+
+orange_price_list = TypeAdapter(List[OrangePrice])
+
+# talaadthai.com layout: [name, grade, price, unit]
+default_row_extractor = table_rows()
 
 
 def extract_price_range(price_str: str) -> tuple[Optional[float], Optional[float]]:
@@ -79,154 +210,171 @@ def extract_price_range(price_str: str) -> tuple[Optional[float], Optional[float
         return None, None
 
 
-def contains_orange_keyword(text: str) -> bool:
-    """Check if text contains any of the orange keywords"""
-    if not text:
-        return False
-    return any(keyword in text for keyword in ORANGE_KEYWORDS)
-
-
-def get_mock_data() -> List[OrangePrice]:
-    """Return mock data for testing"""
-    return [
-        OrangePrice(
-            name="ส้มแมนดาริน",
-            grade="เกรด A",
-            price_min=45.0,
-            price_max=60.0,
-            unit="กก."
-        ),
-        OrangePrice(
-            name="ส้มแมนดาริน",
-            grade="เกรด B",
-            price_min=35.0,
-            price_max=45.0,
-            unit="กก."
-        ),
-        OrangePrice(
-            name="ส้มเขียวหวาน",
-            grade="เกรด A",
-            price_min=35.0,
-            price_max=50.0,
-            unit="กก."
-        ),
-        OrangePrice(
-            name="ส้มเขียวหวาน",
-            grade="เกรด B",
-            price_min=25.0,
-            price_max=35.0,
-            unit="กก."
-        ),
-        OrangePrice(
-            name="ส้มสายน้ำผึ้ง",
-            grade="เกรด A",
-            price_min=40.0,
-            price_max=55.0,
-            unit="กก."
-        ),
-        OrangePrice(
-            name="ส้มสายน้ำผึ้ง",
-            grade="เกรด B",
-            price_min=30.0,
-            price_max=40.0,
-            unit="กก."
-        ),
-    ]
-
-
 @app.get("/")
 async def root():
     """API root endpoint"""
     return {
         "message": "Orange Price Scraper API",
         "endpoints": {
-            "/oranges": "Get filtered orange prices from talaadthai.com"
+            "/oranges": "Get filtered orange prices from talaadthai.com (cached snapshot)"
         }
     }
 
 
-@app.get("/oranges", response_model=List[OrangePrice])
-async def get_orange_prices():
+def load_variety_matcher() -> VarietyMatcher:
+    """Variety matcher from the catalog cache (built-in keywords if the DB is unavailable)"""
+    db = SessionLocal()
+    try:
+        return catalog.matcher(db)
+    except Exception as e:
+        print(f"[PRICES] Using built-in varieties: {e}")
+        return default_matcher
+    finally:
+        db.close()
+
+
+def parse_orange_prices(
+    html: str,
+    matcher: Optional[VarietyMatcher] = None,
+    extract_rows: RowExtractor = default_row_extractor,
+) -> Optional[List[OrangePrice]]:
     """
-    Scrape orange prices from talaadthai.com and filter for specific varieties
-    Returns mock data if website is unavailable
+    Pull orange rows out of a price page
+    Returns None when the page has no price table
     """
-    url = "https://talaadthai.com/prices/fruit"
+    rows = extract_rows(html)
+    if rows is None:
+        return None
     
-    try:
-        # Fetch the webpage
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        # If website not found, return mock data
-        if response.status_code == 404:
-            return get_mock_data()
-        
-        response.raise_for_status()
-        
-        # Parse HTML
-        soup = BeautifulSoup(response.content, "html.parser")
-        
-        # Find the price table
-        # Note: You may need to adjust selectors based on actual website structure
-        table = soup.find("table", class_=re.compile(r"price|table", re.I))
-        if not table:
-            # Try finding any table
-            table = soup.find("table")
+    matcher = matcher or load_variety_matcher()
+    orange_data = []
+    
+    for row in rows:
+        # One regex pass: is this an orange we track, and which one?
+        variety = matcher.match(row.name)
+        if not variety:
+            continue
         
-        if not table:
-            raise HTTPException(status_code=404, detail="Price table not found on webpage")
+        grade = row.grade or variety.grade or "ไม่ระบุ"
         
-        orange_data = []
+        # Extract price range
+        price_min, price_max = extract_price_range(row.price)
         
-        # Parse table rows
-        rows = table.find_all("tr")
+        if price_min is not None and price_max is not None:
+            orange_data.append(
+                OrangePrice(
+                    name=row.name,
+                    grade=grade,
+                    price_min=price_min,
+                    price_max=price_max,
+                    unit=row.unit,
+                    orange_id=variety.orange_id
+                )
+            )
+    
+    return orange_data
+
+
+def merge_prices(results: List[SourceResult]) -> List[OrangePrice]:
+    """
+    Merge the rows of every source, in source order
+    Rows for the same product (name, grade, unit) are combined into one whose
+    range spans all of them
+    """
+    merged = {}
+    for result in results:
+        for price in result.prices:
+            key = (price.name, price.grade, price.unit)
+            seen = merged.get(key)
+            if seen is None:
+                merged[key] = price
+            else:
+                merged[key] = seen.model_copy(update={
+                    "price_min": min(seen.price_min, price.price_min),
+                    "price_max": max(seen.price_max, price.price_max),
+                    "orange_id": seen.orange_id or price.orange_id,
+                })
+    return list(merged.values())
+
+
+async def scrape_source(source: MarketSource, matcher: VarietyMatcher) -> SourceResult:
+    """
+    Fetch and parse one source
+    Unchanged pages (304 or same body hash) reuse the previous parse
+    """
+    # Conditional fetch through the shared async connection pool
+    started = time.perf_counter()
+    try:
+        fetched = await scraper.fetch_page_conditional(source.url)
+    except httpx.HTTPError:
+        metrics.SCRAPE_FETCH_LATENCY.observe(time.perf_counter() - started, "error")
+        raise
+    response = fetched.response
+    metrics.SCRAPE_BYTES.inc(amount=len(response.content))
+    if not fetched.changed:
+        outcome = "not_modified" if response.status_code == 304 else "unchanged"
+        metrics.SCRAPE_FETCH_LATENCY.observe(time.perf_counter() - started, outcome)
+        return SourceResult(source, fetched.parsed, fetched.content_hash, changed=False)
+    metrics.SCRAPE_FETCH_LATENCY.observe(
+        time.perf_counter() - started, "changed" if response.is_success else "error"
+    )
+    
+    response.raise_for_status()
+    
+    # Parse HTML and match varieties off the event loop
+    started = time.perf_counter()
+    orange_data = await asyncio.to_thread(
+        parse_orange_prices, response.text, matcher, source.extract_rows
+    )
+    metrics.SCRAPE_PARSE_LATENCY.observe(time.perf_counter() - started)
+    
+    if orange_data is None:
+        raise ValueError(f"{source.name}: Price table not found on webpage")
+    
+    scraper.remember_parsed(source.url, fetched, orange_data)
+    return SourceResult(source, orange_data, fetched.content_hash)
+
+
+async def scrape_orange_prices() -> ScrapeResult:
+    """
+    Scrape every market source concurrently and merge their orange prices
+    Sources that fail, time out or have an open circuit are skipped; the scrape
+    fails when all of them do or when none has any orange rows
+    """
+    try:
+        matcher = await asyncio.to_thread(load_variety_matcher)
+        results = await scrape_sources(
+            configured_sources(), lambda source: scrape_source(source, matcher)
+        )
         
-        for row in rows[1:]:  # Skip header row
-            cells = row.find_all(["td", "th"])
-            
-            if len(cells) < 4:
-                continue
-            
-            # Extract data from cells
-            # Typical structure: [name, grade, price, unit]
-            name = cells[0].get_text(strip=True)
-            
-            # Check if this row contains our orange keywords
-            if not contains_orange_keyword(name):
-                continue
-            
-            grade = cells[1].get_text(strip=True) if len(cells) > 1 else "ไม่ระบุ"
-            price_str = cells[2].get_text(strip=True) if len(cells) > 2 else ""
-            unit = cells[3].get_text(strip=True) if len(cells) > 3 else "กก."
-            
-            # Extract price range
-            price_min, price_max = extract_price_range(price_str)
-            
-            if price_min is not None and price_max is not None:
-                orange_data.append(
-                    OrangePrice(
-                        name=name,
-                        grade=grade,
-                        price_min=price_min,
-                        price_max=price_max,
-                        unit=unit
-                    )
+        failed = [r for r in results if not r.ok]
+        for result in failed:
+            print(f"[PRICES] Source {result.source.name} failed: {result.error}")
+        if len(failed) == len(results):
+            errors = "; ".join(str(r.error) for r in failed)
+            if any(isinstance(r.error, (httpx.HTTPError, TimeoutError)) for r in failed):
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Failed to fetch data from talaadthai.com: {errors}"
                 )
+            raise HTTPException(
+                status_code=500,
+                detail=f"An error occurred while processing data: {errors}"
+            )
         
+        orange_data = merge_prices(results)
         if not orange_data:
-            # Return mock data for testing if no data found
-            return get_mock_data()
-        
-        return orange_data
+            raise HTTPException(status_code=502, detail="No orange prices found on any source")
         
-    except requests.RequestException as e:
-        raise HTTPException(
-            status_code=503,
-            detail=f"Failed to fetch data from talaadthai.com: {str(e)}"
+        return ScrapeResult(
+            orange_data,
+            combined_hash(results),
+            changed=any(r.changed for r in results if r.ok),
+            sources=[r.source.name for r in results if r.ok],
         )
+        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -234,27 +382,260 @@ async def get_orange_prices():
         )
 
 
+def save_price_history(snapshot: PriceSnapshot):
+    """
+    Append a scraped snapshot to the price history and rollups, and keep it as
+    the last-known-good snapshot
+    """
+    db = SessionLocal()
+    try:
+        scraped_at = snapshot.fetched_at.astimezone().replace(tzinfo=None)
+        record_price_history(db, snapshot.data, scraped_at)
+        save_last_good_snapshot(
+            db, orange_price_list.dump_json(snapshot.data).decode("utf-8"),
+            snapshot.fetched_at.astimezone(timezone.utc).replace(tzinfo=None),
+            snapshot.sources, snapshot.content_hash,
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def record_snapshot_history(snapshot: PriceSnapshot):
+    """Every successful scrape of the refresh leader is kept in the price history"""
+    if refresh_leader["held"]:
+        await asyncio.to_thread(save_price_history, snapshot)
+
+
+def read_last_good_prices() -> Optional[ScrapeResult]:
+    db = SessionLocal()
+    try:
+        row = load_last_good_snapshot(db)
+        if row is None:
+            return None
+        return ScrapeResult(
+            orange_price_list.validate_json(row.data),
+            row.content_hash,
+            changed=False,
+            sources=row.sources.split(",") if row.sources else [],
+            fetched_at=row.fetched_at.replace(tzinfo=timezone.utc),
+            last_good=True,
+        )
+    finally:
+        db.close()
+
+
+async def last_good_prices() -> Optional[ScrapeResult]:
+    """Stored snapshot of the last successful scrape, or None when there is none"""
+    try:
+        return await asyncio.to_thread(read_last_good_prices)
+    except Exception as e:
+        print(f"[PRICES] Cannot load last known good prices: {e}")
+        return None
+
+
+# With several workers only the holder of this lease scrapes upstream and records
+# price history; the others serve the snapshot it stores (see fetch_prices)
+PRICE_REFRESH_LEASE = "price-refresher"
+# Seconds the lease outlives its holder's last refresh before another worker takes over
+PRICE_REFRESH_LEASE_TTL = float(os.getenv(
+    "PRICE_REFRESH_LEASE_TTL", str(max(3 * PRICE_REFRESH_INTERVAL, 60))
+))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+refresh_leader = {"held": False}
+
+
+def acquire_refresh_lease() -> bool:
+    db = SessionLocal()
+    try:
+        held = acquire_lease(db, PRICE_REFRESH_LEASE, WORKER_ID, PRICE_REFRESH_LEASE_TTL)
+        db.commit()
+        return held
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def is_refresh_leader() -> bool:
+    """Take or renew the refresh lease; scrape anyway if the database is unreachable"""
+    try:
+        held = await asyncio.to_thread(acquire_refresh_lease)
+    except Exception as e:
+        print(f"[PRICES] Cannot check the refresh lease, scraping anyway: {e}")
+        held = True
+    refresh_leader["held"] = held
+    return held
+
+
+async def fetch_prices() -> ScrapeResult:
+    """
+    The refresh leader scrapes upstream. Other workers take the snapshot the
+    leader stored while it is fresh, and only scrape themselves when it is not
+    """
+    if await is_refresh_leader():
+        return await scrape_orange_prices()
+    
+    stored = await last_good_prices()
+    if stored is not None and (
+        datetime.now(timezone.utc) - stored.fetched_at
+    ).total_seconds() <= price_cache.ttl:
+        current = price_cache.snapshot
+        stored.last_good = False
+        stored.changed = current is None or current.content_hash != stored.content_hash
+        return stored
+    return await scrape_orange_prices()
+
+
+price_cache = PriceSnapshotCache(
+    fetch_prices, on_refresh=record_snapshot_history, fallback=last_good_prices
+)
+
+# Page last written by /api/update-prices and the catalog version right after it;
+# any later price write (from any worker or process) moves the version on
+applied_prices = {"content_hash": None, "catalog_version": None}
+
+
+@app.get("/oranges", response_model=List[OrangePrice])
+async def get_orange_prices():
+    """
+    Serve the latest scraped price snapshot
+    Age header tells the client how old the prices are (in seconds); while
+    upstream is failing the last-known-good prices are served with
+    X-Snapshot-Source: last-known-good
+    """
+    snapshot = await price_cache.get()
+    # The snapshot is immutable, so its JSON is rendered once and reused
+    if snapshot.rendered is None:
+        snapshot.rendered = orange_price_list.dump_json(snapshot.data)
+    return Response(
+        content=snapshot.rendered,
+        media_type="application/json",
+        headers={
+            "Age": str(max(0, int(snapshot.data_age))),
+            "X-Snapshot-Fetched-At": snapshot.fetched_at.isoformat(),
+            "X-Snapshot-Stale": "false" if price_cache.is_fresh(snapshot) else "true",
+            "X-Snapshot-Source": "last-known-good" if snapshot.last_good else "live",
+            "X-Snapshot-Sources": ",".join(snapshot.sources),
+        },
+    )
+
+
+@app.get("/api/scrape-stats")
+async def get_scrape_stats():
+    """How often upstream fetches were skipped by the conditional-fetch shortcuts"""
+    return dict(scraper.SCRAPE_COUNTERS)
+
+
+def collect_cache_metrics():
+    """Scrape-time view of the cache and scrape counters kept by other modules"""
+    snapshot_stats = price_cache.stats
+    catalog_stats = catalog.stats
+    snapshot_total = sum(snapshot_stats.values())
+    catalog_total = sum(catalog_stats.values())
+    yield metrics.counters_from_dict(
+        "scrape_events_total", "Conditional-fetch shortcuts and skipped price updates",
+        "event", scraper.SCRAPE_COUNTERS)
+    yield metrics.counters_from_dict(
+        "price_snapshot_requests_total", "/oranges snapshot reads by cache result",
+        "result", snapshot_stats)
+    yield metrics.gauge(
+        "price_snapshot_hit_ratio", "Share of snapshot reads answered without waiting on upstream",
+        metrics.ratio(snapshot_stats["fresh"] + snapshot_stats["stale"], snapshot_total))
+    yield metrics.counters_from_dict(
+        "price_refreshes_total", "Snapshot refreshes that fetched upstream vs joined one in flight",
+        "result", price_cache.refresh_stats)
+    yield metrics.gauge(
+        "price_refresh_leader", "1 while this worker holds the refresh lease (scrapes upstream)",
+        1 if refresh_leader["held"] else 0)
+    fallbacks = metrics.Counter(
+        "price_snapshot_fallbacks_total", "Failed scrapes answered with the last-known-good snapshot")
+    fallbacks.inc(amount=price_cache.fallback_count)
+    yield fallbacks
+    circuit_states = metrics.Gauge(
+        "scrape_circuit_open", "1 while a source's circuit is open or half-open", ("source",))
+    circuit_events = metrics.Counter(
+        "scrape_circuit_events_total", "Circuit openings and calls rejected while open",
+        ("source", "event"))
+    for breaker in market_sources.breakers().values():
+        circuit_states.set(breaker.name, value=0 if breaker.state == CLOSED else 1)
+        for event, count in breaker.stats.items():
+            circuit_events.inc(breaker.name, event, amount=count)
+    yield circuit_states
+    yield circuit_events
+    yield metrics.counters_from_dict(
+        "catalog_cache_requests_total", "Catalog reads served from memory vs reloaded",
+        "result", catalog_stats)
+    yield metrics.gauge(
+        "catalog_cache_hit_ratio", "Share of catalog reads served from memory",
+        metrics.ratio(catalog_stats["hit"], catalog_total))
+    if calc_writer:
+        yield metrics.gauge(
+            "calc_writer_pending", "Calculations accepted but not yet written", calc_writer.pending)
+
+
+metrics.registry.add_collector(collect_cache_metrics)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of request, database, scrape and cache metrics"""
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "Orange Price Scraper"}
 
 
+# HTTP caching for catalog endpoints: clients may keep a copy but must revalidate
+CATALOG_CACHE_CONTROL = os.getenv("CATALOG_CACHE_CONTROL", "no-cache")
+
+
+def catalog_etag(version: int) -> str:
+    """Strong ETag for catalog responses; changes on every price/type write"""
+    return f'"catalog-v{version}"'
+
+
+def catalog_not_modified(request: Request, response: Response, version: int) -> Optional[Response]:
+    """
+    Set ETag / Cache-Control on the response
+    Returns a 304 response when If-None-Match already holds the current ETag
+    """
+    etag = catalog_etag(version)
+    headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in candidates or "*" in candidates:
+        return Response(status_code=304, headers=headers)
+    
+    response.headers.update(headers)
+    return None
+
+
 # Additional endpoints for Flutter app compatibility
-@app.get("/api/oranges")
-async def get_oranges_for_flutter(db: Session = Depends(get_db)):
+@app.get("/api/oranges", response_model=List[OrangeOut], response_model_exclude_unset=True)
+async def get_oranges_for_flutter(request: Request, response: Response, db: Session = Depends(get_db)):
     """Get orange data from database in Flutter-compatible format"""
     try:
-        # Query all orange types with their measurements
-        oranges = db.query(DBOrangeType).all()
+        version = get_catalog_version(db)
+        not_modified = catalog_not_modified(request, response, version)
+        if not_modified:
+            return not_modified
+        
+        # Orange types with their measurements, served from the catalog cache
+        oranges = catalog.entries(db, version).values()
         
         result = []
         for orange in oranges:
-            # Get measurement data
-            measurement = db.query(DBOrangeMeasurement).filter(
-                DBOrangeMeasurement.orange_id == orange.orange_id
-            ).first()
-            
             orange_data = {
                 "id": orange.orange_id,
                 "name": orange.name,
@@ -265,12 +646,12 @@ async def get_oranges_for_flutter(db: Session = Depends(get_db)):
             }
             
             # Add measurements if available
-            if measurement:
+            if orange.has_measurement:
                 orange_data.update({
-                    "height": measurement.height_cm,
-                    "radius": measurement.radius_cm,
-                    "diameter": measurement.diameter_cm,
-                    "weight_avg_g": measurement.weight_avg_g
+                    "height": orange.height_cm,
+                    "radius": orange.radius_cm,
+                    "diameter": orange.diameter_cm,
+                    "weight_avg_g": orange.weight_avg_g
                 })
             
             result.append(orange_data)
@@ -284,20 +665,20 @@ async def get_oranges_for_flutter(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
-@app.get("/api/oranges/{orange_id}")
-async def get_orange_by_id(orange_id: str, db: Session = Depends(get_db)):
+@app.get("/api/oranges/{orange_id}", response_model=OrangeOut, response_model_exclude_unset=True)
+async def get_orange_by_id(orange_id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """Get single orange by ID from database"""
     try:
-        orange = db.query(DBOrangeType).filter(
-            DBOrangeType.orange_id == orange_id
-        ).first()
+        version = get_catalog_version(db)
+        # The ETag is catalog-wide, so check the ID exists before answering 304
+        orange = catalog.get(db, orange_id, version)
         
         if not orange:
             raise HTTPException(status_code=404, detail="Orange not found")
         
-        measurement = db.query(DBOrangeMeasurement).filter(
-            DBOrangeMeasurement.orange_id == orange_id
-        ).first()
+        not_modified = catalog_not_modified(request, response, version)
+        if not_modified:
+            return not_modified
         
         result = {
             "id": orange.orange_id,
@@ -307,12 +688,12 @@ async def get_orange_by_id(orange_id: str, db: Session = Depends(get_db)):
             "grade": orange.grade
         }
         
-        if measurement:
+        if orange.has_measurement:
             result.update({
-                "height": measurement.height_cm,
-                "radius": measurement.radius_cm,
-                "diameter": measurement.diameter_cm,
-                "weight_avg_g": measurement.weight_avg_g
+                "height": orange.height_cm,
+                "radius": orange.radius_cm,
+                "diameter": orange.diameter_cm,
+                "weight_avg_g": orange.weight_avg_g
             })
         
         return result
@@ -324,13 +705,15 @@ async def get_orange_by_id(orange_id: str, db: Session = Depends(get_db)):
 
 
 @app.post("/api/calculate")
-async def calculate_price(orange_id: str, weight: float, db: Session = Depends(get_db)):
+async def calculate_price(
+    orange_id: str,
+    weight: float = Query(gt=0, le=CALC_MAX_WEIGHT_KG, allow_inf_nan=False),
+    db: Session = Depends(get_db)
+):
     """Calculate price and save to database"""
     try:
-        # Get orange from database
-        orange = db.query(DBOrangeType).filter(
-            DBOrangeType.orange_id == orange_id
-        ).first()
+        # Get orange price from the catalog cache
+        orange = catalog.get(db, orange_id)
         
         if not orange:
             raise HTTPException(status_code=404, detail="Orange not found")
@@ -338,17 +721,25 @@ async def calculate_price(orange_id: str, weight: float, db: Session = Depends(g
         # Calculate total price
         total_price = weight * orange.price_per_kg
         
-        # Save calculation to database
-        calculation = DBPriceCalculation(
-            orange_type=orange_id,
-            weight_kg=weight,
-            price_per_kg=orange.price_per_kg,
-            total_price=round(total_price, 2),
-            date=datetime.now().date()
-        )
-        db.add(calculation)
-        db.commit()
-        db.refresh(calculation)
+        row = {
+            "orange_type": orange_id,
+            "weight_kg": weight,
+            "price_per_kg": orange.price_per_kg,
+            "total_price": round(total_price, 2),
+            "date": datetime.now().date()
+        }
+        
+        if calc_writer:
+            # Write-behind: answer now, insert with the next bulk flush
+            calculation_id = await calc_writer.submit(row)
+        else:
+            # Save calculation to database
+            calculation = DBPriceCalculation(**row)
+            db.add(calculation)
+            apply_calculation_stats(db, [row])
+            db.commit()
+            db.refresh(calculation)
+            calculation_id = calculation.id
         
         return {
             "orange_id": orange_id,
@@ -356,21 +747,138 @@ async def calculate_price(orange_id: str, weight: float, db: Session = Depends(g
             "weight": weight,
             "price_per_kg": orange.price_per_kg,
             "total_price": round(total_price, 2),
-            "calculation_id": calculation.id
+            "calculation_id": calculation_id
         }
         
     except HTTPException:
         raise
+    except WriterBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
+
+
+def insert_calculations(db: Session, rows: List[dict]) -> List[int]:
+    """
+    Insert rows with one multi-row INSERT ... RETURNING; ids come back in rows order
+    SQLite gives the rows of one INSERT increasing rowids in VALUES order, and
+    its single writer means no other insert interleaves, so sorting RETURNING
+    lines the ids up. Elsewhere SQLAlchemy orders RETURNING by parameter (one
+    statement on PostgreSQL; on SQLite that option would split the insert per row)
+    """
+    stmt = insert(DBPriceCalculation)
+    if db.get_bind().dialect.name == "sqlite":
+        return sorted(db.scalars(stmt.returning(DBPriceCalculation.id), rows).all())
+    return db.scalars(
+        stmt.returning(DBPriceCalculation.id, sort_by_parameter_order=True), rows
+    ).all()
+
+
+@app.post("/api/calculate/batch")
+async def calculate_price_batch(items: List[CalculationItem], db: Session = Depends(get_db)):
+    """
+    Calculate prices for a whole basket and save them in one transaction
+    Unknown orange IDs are reported per item instead of failing the batch
+    """
+    try:
+        # Resolve every price from the catalog cache in one lookup
+        oranges = catalog.entries(db)
+        today = datetime.now().date()
+        
+        results = []
+        rows = []
+        for item in items:
+            orange = oranges.get(item.orange_id)
+            if not orange:
+                results.append({
+                    "orange_id": item.orange_id,
+                    "weight": item.weight,
+                    "error": "Orange not found"
+                })
+                continue
+            
+            total_price = round(item.weight * orange.price_per_kg, 2)
+            result = {
+                "orange_id": item.orange_id,
+                "orange_name": orange.name,
+                "weight": item.weight,
+                "price_per_kg": orange.price_per_kg,
+                "total_price": total_price,
+                "calculation_id": None
+            }
+            results.append(result)
+            rows.append({
+                "orange_type": item.orange_id,
+                "weight_kg": item.weight,
+                "price_per_kg": orange.price_per_kg,
+                "total_price": total_price,
+                "date": today
+            })
+        
+        if rows and calc_writer:
+            # Write-behind: IDs are assigned now, rows are flushed in bulk later
+            ids = await calc_writer.submit_many(rows)
+        # Insert every calculation with one bulk statement
+        elif rows:
+            ids = insert_calculations(db, rows)
+            apply_calculation_stats(db, rows)
+            db.commit()
+        
+        if rows:
+            saved = (r for r in results if "error" not in r)
+            for result, calculation_id in zip(saved, ids):
+                result["calculation_id"] = calculation_id
+        
+        return {
+            "items": results,
+            "calculated_count": len(rows),
+            "failed_count": len(results) - len(rows),
+            "basket_total": round(sum(row["total_price"] for row in rows), 2)
+        }
+        
+    except WriterBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
 
 
-@app.get("/api/prices")
-async def get_live_prices(db: Session = Depends(get_db)):
+@app.post("/api/estimate/batch")
+async def estimate_price_batch(readings: FruitDimensions, db: Session = Depends(get_db)):
+    """
+    Estimate weight and price of every fruit from its height and diameter
+    Weights come from each variety's density fitted to its measurements; fruits
+    that cannot be estimated are reported in errors instead of failing the batch
+    """
+    if not len(readings.orange_id) == len(readings.height_cm) == len(readings.diameter_cm):
+        raise HTTPException(
+            status_code=400,
+            detail="orange_id, height_cm and diameter_cm must have the same length"
+        )
+    try:
+        version = get_catalog_version(db)
+        prices = {o.orange_id: o.price_per_kg for o in catalog.entries(db, version).values()}
+        densities = catalog.densities(db, version)
+        
+        result = estimate_batch(
+            readings.orange_id, readings.height_cm, readings.diameter_cm, densities, prices
+        )
+        return estimate_response(result, densities, readings.orange_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Estimation error: {str(e)}")
+
+
+@app.get("/api/prices", response_model=List[LivePrice])
+async def get_live_prices(request: Request, response: Response, db: Session = Depends(get_db)):
     """Get live prices from database for Flutter app"""
     try:
-        oranges = db.query(DBOrangeType).all()
+        version = get_catalog_version(db)
+        not_modified = catalog_not_modified(request, response, version)
+        if not_modified:
+            return not_modified
+        
+        oranges = catalog.entries(db, version).values()
         return [
             {
                 "id": o.orange_id,
@@ -385,20 +893,139 @@ async def get_live_prices(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
+@app.put("/api/prices/bulk")
+async def update_prices_bulk(request: Request, dry_run: bool = False, db: Session = Depends(get_db)):
+    """
+    Replace prices for many SKUs at once from a JSON or CSV price list
+    (Content-Type: application/json or text/csv); returns old/new prices of
+    every changed SKU. dry_run=true reports the diff without writing
+    """
+    try:
+        content_type = request.headers.get("content-type", "application/json")
+        fmt = "csv" if "csv" in content_type else "json"
+        try:
+            prices = parse_price_list(await request.body(), fmt)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        result = apply_bulk_prices(db, prices)
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+        
+        return {
+            "success": True,
+            "dry_run": dry_run,
+            "updated_count": len(result.changed),
+            "unchanged_count": len(result.matched) - len(result.changed),
+            "unknown": result.unknown,
+            "updates": [change.as_dict() for change in result.changed]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Update error: {str(e)}")
+
+
+@app.get("/api/prices/history", response_model=List[PriceRollupOut])
+async def get_price_history(
+    period: str = "day",
+    name: Optional[str] = None,
+    grade: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Market price history from the daily/weekly rollups, oldest first"""
+    if period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of {', '.join(PERIODS)}")
+    try:
+        rollups = get_price_rollups(db, period, name, grade, date_from, date_to)
+        return [
+            {
+                "period": r.period,
+                "period_start": r.period_start.isoformat(),
+                "name": r.name,
+                "grade": r.grade,
+                "open": r.open,
+                "high": r.high,
+                "low": r.low,
+                "close": r.close,
+                "average": round(r.price_sum / r.sample_count, 2),
+                "samples": r.sample_count
+            }
+            for r in rollups
+        ]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
 # New endpoints for database operations
-@app.get("/api/calculations")
-async def get_calculations(limit: int = 10, db: Session = Depends(get_db)):
-    """Get recent price calculations"""
+def encode_cursor(calc_date: date, calc_id: int) -> str:
+    """Opaque keyset cursor for the last row of a page"""
+    raw = f"{calc_date.isoformat()}|{calc_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+# Largest page /api/calculations serves
+CALCULATIONS_MAX_LIMIT = int(os.getenv("CALCULATIONS_MAX_LIMIT", "1000"))
+
+
+def decode_cursor(cursor: str) -> tuple[date, int]:
+    """Inverse of encode_cursor; raises ValueError on malformed input"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        calc_date, calc_id = raw.split("|")
+        return date.fromisoformat(calc_date), int(calc_id)
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(str(e))
+
+
+@app.get("/api/calculations", response_model=List[CalculationOut])
+async def get_calculations(
+    response: Response,
+    limit: int = Query(10, ge=1, le=CALCULATIONS_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    orange_type: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get recent price calculations, newest first
+    Pass the X-Next-Cursor response header back as ?cursor= to get the next page
+    """
     try:
-        calculations = db.query(DBPriceCalculation).order_by(
-            DBPriceCalculation.date.desc()
+        query = db.query(DBPriceCalculation).options(
+            joinedload(DBPriceCalculation.orange)
+        )
+        
+        if orange_type:
+            query = query.filter(DBPriceCalculation.orange_type == orange_type)
+        if date_from:
+            query = query.filter(DBPriceCalculation.date >= date_from)
+        if date_to:
+            query = query.filter(DBPriceCalculation.date <= date_to)
+        if cursor:
+            try:
+                after_date, after_id = decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            # Keyset: rows strictly older than the last row of the previous page
+            query = query.filter(
+                tuple_(DBPriceCalculation.date, DBPriceCalculation.id) < (after_date, after_id)
+            )
+        
+        calculations = query.order_by(
+            DBPriceCalculation.date.desc(),
+            DBPriceCalculation.id.desc()
         ).limit(limit).all()
         
         result = []
         for calc in calculations:
-            orange = db.query(DBOrangeType).filter(
-                DBOrangeType.orange_id == calc.orange_type
-            ).first()
+            orange = calc.orange
             
             result.append({
                 "id": calc.id,
@@ -410,22 +1037,28 @@ async def get_calculations(limit: int = 10, db: Session = Depends(get_db)):
                 "date": calc.date.isoformat()
             })
         
+        if calculations and len(calculations) == limit:
+            last = calculations[-1]
+            response.headers["X-Next-Cursor"] = encode_cursor(last.date, last.id)
+        
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
-@app.get("/api/measurements")
+@app.get("/api/measurements", response_model=List[MeasurementOut])
 async def get_all_measurements(db: Session = Depends(get_db)):
     """Get all orange measurements"""
     try:
-        measurements = db.query(DBOrangeMeasurement).all()
+        measurements = db.query(DBOrangeMeasurement).options(
+            joinedload(DBOrangeMeasurement.orange_type)
+        ).all()
         
         result = []
         for m in measurements:
-            orange = db.query(DBOrangeType).filter(
-                DBOrangeType.orange_id == m.orange_id
-            ).first()
+            orange = m.orange_type
             
             result.append({
                 "id": m.id,
@@ -446,17 +1079,17 @@ async def get_all_measurements(db: Session = Depends(get_db)):
 async def get_statistics(db: Session = Depends(get_db)):
     """Get statistics from database"""
     try:
-        total_oranges = db.query(DBOrangeType).count()
-        total_calculations = db.query(DBPriceCalculation).count()
+        total_oranges = len(catalog.entries(db))
+        
+        # Per-type totals are maintained on every insert/delete
+        stats = db.query(DBCalculationStats).filter(
+            DBCalculationStats.calculation_count > 0
+        ).all()
+        total_calculations = sum(s.calculation_count for s in stats)
         
         # Get most popular orange type
-        from sqlalchemy import func
-        popular = db.query(
-            DBPriceCalculation.orange_type,
-            func.count(DBPriceCalculation.id).label('count')
-        ).group_by(DBPriceCalculation.orange_type).order_by(
-            func.count(DBPriceCalculation.id).desc()
-        ).first()
+        top = max(stats, key=lambda s: s.calculation_count, default=None)
+        popular = (top.orange_type, top.calculation_count) if top else None
         
         return {
             "total_orange_types": total_oranges,
@@ -468,6 +1101,25 @@ async def get_statistics(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
+@app.get("/api/analytics")
+async def get_analytics(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Sales report over the calculation history: revenue and weight per orange
+    type, weight percentiles, daily volume and average basket value
+    """
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must not be after date_to")
+    try:
+        # NumPy aggregation runs off the event loop
+        return await asyncio.to_thread(calculation_analytics, db, date_from, date_to)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
 @app.delete("/api/calculations/{calculation_id}")
 async def delete_calculation(calculation_id: int, db: Session = Depends(get_db)):
     """Delete a price calculation from database"""
@@ -481,6 +1133,12 @@ async def delete_calculation(calculation_id: int, db: Session = Depends(get_db))
             raise HTTPException(status_code=404, detail="Calculation not found")
         
         # Delete the calculation
+        apply_calculation_stats(db, [{
+            "orange_type": calculation.orange_type,
+            "weight_kg": calculation.weight_kg,
+            "total_price": calculation.total_price,
+            "date": calculation.date
+        }], sign=-1)
         db.delete(calculation)
         db.commit()
         
@@ -497,61 +1155,73 @@ async def delete_calculation(calculation_id: int, db: Session = Depends(get_db))
         raise HTTPException(status_code=500, detail=f"Delete error: {str(e)}")
 
 
+def summarize_scraped_prices(prices: List[OrangePrice]) -> List[dict]:
+    """Scraped prices with their average, as reported by /api/update-prices"""
+    return [
+        {
+            "name": p.name,
+            "grade": p.grade,
+            "price_min": p.price_min,
+            "price_max": p.price_max,
+            "avg": round((p.price_min + p.price_max) / 2, 2)
+        }
+        for p in prices
+    ]
+
+
 @app.post("/api/update-prices")
-async def update_prices_from_web(db: Session = Depends(get_db)):
-    """Scrape and update prices in database"""
+async def update_prices_from_web(force: bool = False, db: Session = Depends(get_db)):
+    """
+    Scrape and update prices in database
+    Skipped when the page is the one already applied (pass force=true to re-apply)
+    """
     try:
-        # Scrape prices from web
-        scraped_prices = await get_orange_prices()
+        # Scrape prices from web (also refreshes the /oranges snapshot)
+        snapshot = await price_cache.refresh()
+        scraped_prices = snapshot.data
         
-        updated_count = 0
-        price_updates = []
+        # Stored prices are served to readers but never written back as new prices
+        if snapshot.last_good:
+            raise HTTPException(
+                status_code=503,
+                detail="Market prices are unavailable; not updating from the last known "
+                       f"good prices of {snapshot.fetched_at.isoformat()}"
+            )
         
-        for price in scraped_prices:
-            avg_price = round((price.price_min + price.price_max) / 2, 2)
-            orange_id = None
-            
-            # Map scraped names to database IDs
-            if "สายน้ำผึ้ง" in price.name:
-                orange_id = "tangerine"
-            elif "เขียวหวาน" in price.name:
-                orange_id = "green-sweet"
-            elif "แมนดาริน" in price.name:
-                orange_id = "mandarin"
-            
-            if orange_id:
-                # Update in database
-                orange = db.query(DBOrangeType).filter(
-                    DBOrangeType.orange_id == orange_id
-                ).first()
-                
-                if orange:
-                    old_price = orange.price_per_kg
-                    orange.price_per_kg = avg_price
-                    updated_count += 1
-                    price_updates.append({
-                        "id": orange_id,
-                        "name": orange.name,
-                        "old_price": old_price,
-                        "new_price": avg_price
-                    })
+        if (
+            not force
+            and snapshot.content_hash
+            and snapshot.content_hash == applied_prices["content_hash"]
+            and get_catalog_version(db) == applied_prices["catalog_version"]
+        ):
+            scraper.SCRAPE_COUNTERS["db_update_skipped"] += 1
+            return {
+                "success": True,
+                "skipped": True,
+                "reason": "Prices unchanged since the last update",
+                "updated_count": 0,
+                "updates": [],
+                "scraped_data": summarize_scraped_prices(scraped_prices)
+            }
         
+        # Database IDs resolved by the variety matcher while scraping; one
+        # set-based update for all of them
+        scraped_avg = {
+            price.orange_id: round((price.price_min + price.price_max) / 2, 2)
+            for price in scraped_prices
+            if price.orange_id
+        }
+        result = apply_bulk_prices(db, scraped_avg)
         db.commit()
+        applied_prices["content_hash"] = snapshot.content_hash
+        applied_prices["catalog_version"] = get_catalog_version(db)
         
         return {
             "success": True,
-            "updated_count": updated_count,
-            "updates": price_updates,
-            "scraped_data": [
-                {
-                    "name": p.name,
-                    "grade": p.grade,
-                    "price_min": p.price_min,
-                    "price_max": p.price_max,
-                    "avg": round((p.price_min + p.price_max) / 2, 2)
-                }
-                for p in scraped_prices
-            ]
+            "skipped": False,
+            "updated_count": len(result.matched),
+            "updates": [change.as_dict() for change in result.matched],
+            "scraped_data": summarize_scraped_prices(scraped_prices)
         }
         
     except HTTPException:
@@ -561,7 +1231,38 @@ async def update_prices_from_web(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Update error: {str(e)}")
 
 
-if __name__ == "__main__":
+def run_server(argv: Optional[List[str]] = None):
+    """
+    Start uvicorn; with --workers > 1 the schema is created and migrated once
+    here, before the worker processes start, so they never race on DDL
+    """
+    import argparse
     import uvicorn
+    
+    parser = argparse.ArgumentParser(description="Orange Price Scraper API server")
     # Listen on 0.0.0.0 to allow mobile device connections
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8001")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")),
+                        help="worker processes (default: WEB_CONCURRENCY or 1)")
+    parser.add_argument("--graceful-timeout", type=int,
+                        default=int(os.getenv("SHUTDOWN_TIMEOUT", "30")),
+                        help="seconds to finish in-flight requests on shutdown")
+    args = parser.parse_args(argv)
+    
+    init_db()
+    os.environ["DB_INIT_ON_STARTUP"] = "0"  # inherited by the workers
+    
+    if args.workers > 1:
+        print(f"[SERVER] Starting {args.workers} workers on {args.host}:{args.port}")
+        uvicorn.run(
+            "main:app", host=args.host, port=args.port, workers=args.workers,
+            timeout_graceful_shutdown=args.graceful_timeout,
+        )
+    else:
+        uvicorn.run(app, host=args.host, port=args.port,
+                    timeout_graceful_shutdown=args.graceful_timeout)
+
+
+if __name__ == "__main__":
+    run_server()
@@ -0,0 +1,165 @@
+"""
+Market price sources for the scraper
+Each source declares its page URL and a row extractor that turns the page into
+(name, grade, price, unit) rows. scrape_sources() fetches every source at once
+on the event loop, each under its own timeout, so a scrape takes as long as the
+slowest source instead of the sum of all of them. Every source URL has its own
+circuit breaker, so a source that keeps failing is skipped without waiting on it
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+import html_parsers
+import metrics
+import scraper
+
+# Seconds one source may take (fetch and parse) before the scrape goes on without it
+SCRAPE_SOURCE_TIMEOUT = float(os.getenv("SCRAPE_SOURCE_TIMEOUT", "15"))
+# Extra pages with the same table layout: "name=url" pairs separated by commas
+SCRAPE_EXTRA_SOURCES = os.getenv("SCRAPE_EXTRA_SOURCES", "")
+
+
+class PriceRow(NamedTuple):
+    """One product row of a price page, as text"""
+    name: str
+    grade: str
+    price: str
+    unit: str
+
+
+RowExtractor = Callable[[str], Optional[List[PriceRow]]]
+
+
+def table_rows(name: int = 0, grade: int = 1, price: int = 2, unit: int = 3) -> RowExtractor:
+    """
+    Extractor for a plain price table, picking each field by column position
+    The default layout is talaadthai.com's: [name, grade, price, unit]
+    """
+    width = max(name, grade, price, unit) + 1
+
+    def extract(html: str) -> Optional[List[PriceRow]]:
+        rows = html_parsers.extract_price_rows(html)
+        if rows is None:
+            return None
+        return [
+            PriceRow(cells[name], cells[grade], cells[price], cells[unit])
+            for cells in rows
+            if len(cells) >= width
+        ]
+
+    return extract
+
+
+@dataclass(frozen=True)
+class MarketSource:
+    """A price page and how to read its rows"""
+    name: str
+    url: str
+    extract_rows: RowExtractor = field(default_factory=table_rows)
+    timeout: float = SCRAPE_SOURCE_TIMEOUT
+
+
+@dataclass
+class SourceResult:
+    """What one source contributed to a scrape"""
+    source: MarketSource
+    prices: List = field(default_factory=list)
+    content_hash: Optional[str] = None
+    changed: bool = True  # False when the page was answered 304 or had the same body
+    error: Optional[Exception] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def parse_sources(spec: str) -> List[MarketSource]:
+    """Parse "name=url,name=url" into sources with the default table layout"""
+    sources = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, sep, url = item.partition("=")
+        if not sep or not name.strip() or not url.strip():
+            raise ValueError(f"SCRAPE_EXTRA_SOURCES: expected name=url, got {item!r}")
+        sources.append(MarketSource(name.strip(), url.strip()))
+    return sources
+
+
+EXTRA_SOURCES: List[MarketSource] = parse_sources(SCRAPE_EXTRA_SOURCES)
+
+
+def configured_sources() -> List[MarketSource]:
+    """talaadthai.com's fruit page (SCRAPE_URL) followed by SCRAPE_EXTRA_SOURCES"""
+    return [MarketSource("talaadthai", scraper.SCRAPE_URL), *EXTRA_SOURCES]
+
+
+# Circuit breaker per source URL
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def breaker_for(source: MarketSource) -> CircuitBreaker:
+    breaker = _breakers.get(source.url)
+    if breaker is None:
+        breaker = _breakers[source.url] = CircuitBreaker(source.name)
+    return breaker
+
+
+def breakers() -> Dict[str, CircuitBreaker]:
+    """Circuit breakers of every source scraped so far, by URL"""
+    return dict(_breakers)
+
+
+def reset_breakers():
+    """Close every circuit (forget past failures)"""
+    _breakers.clear()
+
+
+async def scrape_sources(
+    sources: List[MarketSource],
+    scrape_one: Callable[[MarketSource], Awaitable[SourceResult]],
+) -> List[SourceResult]:
+    """
+    Run scrape_one for every source concurrently, each under its own timeout
+    A source that fails, times out or has an open circuit comes back with .error
+    set instead of failing the others; results keep the order of sources
+    """
+    async def run(source: MarketSource) -> SourceResult:
+        breaker = breaker_for(source)
+        try:
+            breaker.before_call()
+        except CircuitOpenError as e:
+            return SourceResult(source, error=e)
+
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(scrape_one(source), source.timeout)
+            breaker.record_success()
+        except asyncio.TimeoutError:
+            metrics.SCRAPE_FETCH_LATENCY.observe(time.perf_counter() - started, "timeout")
+            breaker.record_failure()
+            result = SourceResult(source, error=TimeoutError(
+                f"{source.name}: no answer within {source.timeout:g}s"))
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception as e:
+            breaker.record_failure()
+            result = SourceResult(source, error=e)
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    return list(await asyncio.gather(*(run(source) for source in sources)))
+
+
+def combined_hash(results: List[SourceResult]) -> Optional[str]:
+    """Hash of every contributing page; changes when any of them changes"""
+    hashes = [f"{r.source.name}:{r.content_hash}" for r in results if r.ok]
+    if not hashes or any(r.ok and r.content_hash is None for r in results):
+        return None
+    return hashlib.sha256("\n".join(hashes).encode("utf-8")).hexdigest()
@@ -0,0 +1,104 @@
+"""
+Repeatable schema migrations
+create_all only creates missing tables; changes to existing tables (such as new
+indexes) are listed here and applied once per database, tracked in schema_migrations
+A step is a SQL string, or a function of the connection for dialect-dependent SQL
+
+Run manually: python migrations.py
+"""
+
+from typing import Callable, List, Tuple, Union
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Connection, Engine
+
+from database import SchemaMigration, seed_orange_varieties
+from stats import rebuild_calculation_histogram
+from variety_matcher import DEFAULT_VARIETIES
+
+Step = Union[str, Callable[[Connection], None]]
+
+
+def seed_default_varieties(conn: Connection):
+    """Built-in keywords for orange types that exist; seed_db.py adds the rest after the types"""
+    seed_orange_varieties(conn, DEFAULT_VARIETIES)
+
+
+# (version, description, statements) - append only, never edit applied entries
+MIGRATIONS: List[Tuple[int, str, List[Step]]] = [
+    (
+        1,
+        "Index price_calculations by (date, id) and (orange_type, date)",
+        [
+            "CREATE INDEX IF NOT EXISTS ix_price_calculations_date_id "
+            "ON price_calculations (date, id)",
+            "CREATE INDEX IF NOT EXISTS ix_price_calculations_orange_type_date "
+            "ON price_calculations (orange_type, date)",
+        ],
+    ),
+    (
+        2,
+        "Backfill calculation_stats from price_calculations",
+        [
+            "DELETE FROM calculation_stats",
+            "INSERT INTO calculation_stats "
+            "(orange_type, calculation_count, total_weight_kg, total_revenue) "
+            "SELECT orange_type, COUNT(id), COALESCE(SUM(weight_kg), 0), "
+            "COALESCE(SUM(total_price), 0) FROM price_calculations GROUP BY orange_type",
+        ],
+    ),
+    (
+        3,
+        "Seed orange_varieties with the built-in market keywords",
+        # Must not insert keywords before their orange types (foreign key on PostgreSQL)
+        [seed_default_varieties],
+    ),
+    (
+        4,
+        "Index orange_measurements by (orange_id, id)",
+        [
+            "CREATE INDEX IF NOT EXISTS ix_orange_measurements_orange_id_id "
+            "ON orange_measurements (orange_id, id)",
+        ],
+    ),
+    (
+        5,
+        "Backfill calculation_histogram from price_calculations",
+        [rebuild_calculation_histogram],
+    ),
+]
+
+
+def run_migrations(engine: Engine) -> int:
+    """Apply every migration not yet recorded; returns how many ran"""
+    SchemaMigration.__table__.create(bind=engine, checkfirst=True)
+
+    with engine.connect() as conn:
+        applied = set(conn.execute(select(SchemaMigration.version)).scalars())
+
+    count = 0
+    for version, description, statements in MIGRATIONS:
+        if version in applied:
+            continue
+        with engine.begin() as conn:
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(text(statement))
+            conn.execute(
+                SchemaMigration.__table__.insert().values(
+                    version=version, description=description
+                )
+            )
+        print(f"[DB] Applied migration {version}: {description}")
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    from database import engine, Base
+
+    Base.metadata.create_all(bind=engine)
+    applied_count = run_migrations(engine)
+    print(f"✅ {applied_count} migration(s) applied")
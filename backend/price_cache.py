@@ -0,0 +1,208 @@
+"""
+In-memory snapshot of scraped orange prices
+Refreshed by a background task; serves fresh data within the TTL and stale data
+while revalidating in the background (stale-while-revalidate). Concurrent
+refreshes are coalesced into one upstream fetch (single-flight). When a scrape
+fails, the last-known-good snapshot from the fallback is served instead
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional
+
+# Seconds a snapshot is considered fresh
+PRICE_CACHE_TTL = float(os.getenv("PRICE_CACHE_TTL", "300"))
+# Extra seconds a stale snapshot may still be served while a refresh runs
+PRICE_CACHE_STALE_TTL = float(os.getenv("PRICE_CACHE_STALE_TTL", "3600"))
+# Background refresh period in seconds (0 disables the refresher task)
+PRICE_REFRESH_INTERVAL = float(os.getenv("PRICE_REFRESH_INTERVAL", str(PRICE_CACHE_TTL)))
+# Seconds a last-known-good fallback is served before upstream is tried again
+PRICE_FALLBACK_TTL = float(os.getenv("PRICE_FALLBACK_TTL", "30"))
+
+
+@dataclass
+class ScrapeResult:
+    """What a fetch function returns to the cache"""
+    prices: List
+    content_hash: Optional[str] = None
+    changed: bool = True  # False when upstream answered 304 or the same body
+    sources: List[str] = field(default_factory=list)  # names of the sources that answered
+    fetched_at: Optional[datetime] = None  # when the prices were scraped (default: now)
+    last_good: bool = False  # a stored snapshot served because the scrape failed
+
+
+@dataclass
+class PriceSnapshot:
+    """Scraped prices plus the time they were fetched"""
+    data: List
+    content_hash: Optional[str] = None
+    changed: bool = True
+    fetched_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    fetched_monotonic: float = field(default_factory=time.monotonic)
+    rendered: Optional[bytes] = None  # response body, filled in on first use
+    sources: List[str] = field(default_factory=list)
+    last_good: bool = False
+
+    @property
+    def age(self) -> float:
+        """Seconds since the snapshot was put in the cache"""
+        return time.monotonic() - self.fetched_monotonic
+
+    @property
+    def data_age(self) -> float:
+        """Seconds since the prices were scraped (older than age for a fallback)"""
+        return (datetime.now(timezone.utc) - self.fetched_at).total_seconds()
+
+
+class PriceSnapshotCache:
+    """Holds the latest price snapshot and keeps it fresh"""
+
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[ScrapeResult]],
+        ttl: float = PRICE_CACHE_TTL,
+        stale_ttl: float = PRICE_CACHE_STALE_TTL,
+        refresh_interval: float = PRICE_REFRESH_INTERVAL,
+        on_refresh: Optional[Callable[[PriceSnapshot], Awaitable[None]]] = None,
+        fallback: Optional[Callable[[], Awaitable[Optional[ScrapeResult]]]] = None,
+        fallback_ttl: float = PRICE_FALLBACK_TTL,
+    ):
+        self.fetch = fetch
+        self.on_refresh = on_refresh
+        self.fallback = fallback
+        self.fallback_ttl = fallback_ttl
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.refresh_interval = refresh_interval
+        self._snapshot: Optional[PriceSnapshot] = None
+        self._revalidate_task: Optional[asyncio.Task] = None
+        self._refresher_task: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Task] = None
+        # How get() was answered: fresh hit, stale hit (revalidating) or miss (waited)
+        self.stats = {"fresh": 0, "stale": 0, "miss": 0}
+        # refresh() calls that started a fetch vs joined the one already running
+        self.refresh_stats = {"started": 0, "joined": 0}
+        # Failed scrapes answered with the last-known-good snapshot
+        self.fallback_count = 0
+
+    @property
+    def snapshot(self) -> Optional[PriceSnapshot]:
+        return self._snapshot
+
+    def ttl_for(self, snapshot: PriceSnapshot) -> float:
+        """A fallback is kept only briefly so upstream is retried soon"""
+        return self.fallback_ttl if snapshot.last_good else self.ttl
+
+    def is_fresh(self, snapshot: PriceSnapshot) -> bool:
+        return snapshot.age <= self.ttl_for(snapshot)
+
+    async def refresh(self) -> PriceSnapshot:
+        """
+        Scrape now and replace the snapshot
+        Callers arriving while a scrape is running await that one instead and
+        share its snapshot or its error. The scrape runs in its own task, so a
+        caller that disconnects does not cancel it for the others
+        """
+        task = self._inflight
+        if task is None or task.done():
+            self.refresh_stats["started"] += 1
+            task = asyncio.create_task(self._fetch_snapshot())
+            # Keeps an error nobody is left to await from being logged as unretrieved
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight = task
+        else:
+            self.refresh_stats["joined"] += 1
+        return await asyncio.shield(task)
+
+    async def _fetch_snapshot(self) -> PriceSnapshot:
+        try:
+            result = await self.fetch()
+        except Exception as e:
+            result = await self.fallback() if self.fallback else None
+            if result is None:
+                raise
+            self.fallback_count += 1
+            print(f"[PRICES] Scrape failed, serving last known good prices: {e}")
+        snapshot = PriceSnapshot(
+            data=result.prices, content_hash=result.content_hash, changed=result.changed,
+            sources=result.sources, last_good=result.last_good,
+        )
+        if result.fetched_at is not None:
+            snapshot.fetched_at = result.fetched_at
+        self._snapshot = snapshot
+        # Only live scrapes are recorded; a fallback is already stored
+        if self.on_refresh and not snapshot.last_good:
+            try:
+                await self.on_refresh(snapshot)
+            except Exception as e:
+                print(f"[PRICES] Snapshot hook failed: {e}")
+        return snapshot
+
+    async def get(self) -> PriceSnapshot:
+        """
+        Return a snapshot without waiting on upstream when possible
+        - fresh: served as is
+        - stale but within the stale window: served, refresh runs in background
+        - missing or too old: scrape and wait for the result
+        A last-known-good fallback is fresh for fallback_ttl instead of ttl
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.stats["miss"] += 1
+            return await self.refresh()
+
+        age = snapshot.age
+        ttl = self.ttl_for(snapshot)
+        if age <= ttl:
+            self.stats["fresh"] += 1
+            return snapshot
+        if age <= ttl + self.stale_ttl:
+            self.stats["stale"] += 1
+            self._revalidate()
+            return snapshot
+        self.stats["miss"] += 1
+        return await self.refresh()
+
+    def _revalidate(self):
+        """Start a background refresh unless one is already running"""
+        if self._revalidate_task is None or self._revalidate_task.done():
+            self._revalidate_task = asyncio.create_task(self._refresh_quietly())
+
+    async def _refresh_quietly(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            print(f"[PRICES] Background refresh failed: {e}")
+
+    async def _run_refresher(self):
+        while True:
+            await self._refresh_quietly()
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        """Start the scheduled background refresher"""
+        if self.refresh_interval <= 0:
+            return
+        if self._refresher_task is None or self._refresher_task.done():
+            self._refresher_task = asyncio.create_task(self._run_refresher())
+
+    async def stop(self):
+        """Cancel background tasks"""
+        for task in (self._refresher_task, self._revalidate_task, self._inflight):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._refresher_task = None
+        self._revalidate_task = None
+        self._inflight = None
+
+    def clear(self):
+        """Drop the current snapshot"""
+        self._snapshot = None
+        self._inflight = None
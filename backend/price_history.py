@@ -0,0 +1,162 @@
+"""
+Append-only market price history with daily and weekly rollups
+Rollups (open/high/low/close, average) are updated at ingest time, so history
+queries read one row per period instead of scanning every scrape. The latest
+successful scrape is also kept whole as the last-known-good snapshot
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import case, insert, literal, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from database import LastGoodSnapshot, PriceHistory, PriceRollup
+
+PERIODS = ("day", "week")
+
+# Dialects whose INSERT supports ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def period_start(period: str, moment: datetime) -> date:
+    """First day of the period containing moment (weeks start on Monday)"""
+    day = moment.date()
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def record_price_history(db: Session, prices: Iterable, scraped_at: datetime) -> int:
+    """
+    Append scraped prices and fold them into the rollups; call before commit
+    Each sample's price is the midpoint of its min/max range; high and low use
+    the range bounds themselves
+    """
+    prices = list(prices)
+    if not prices:
+        return 0
+
+    db.execute(insert(PriceHistory), [
+        {
+            "scraped_at": scraped_at,
+            "name": p.name,
+            "grade": p.grade,
+            "price_min": p.price_min,
+            "price_max": p.price_max,
+            "unit": p.unit,
+        }
+        for p in prices
+    ])
+
+    # One delta per rollup row; samples of one scrape share scraped_at, so the
+    # first of them opens a new period and the last one closes it
+    deltas = {}
+    for p in prices:
+        mid = (p.price_min + p.price_max) / 2
+        for period in PERIODS:
+            key = (period, period_start(period, scraped_at), p.name, p.grade)
+            delta = deltas.get(key)
+            if delta is None:
+                deltas[key] = {
+                    "period": key[0], "period_start": key[1], "name": key[2], "grade": key[3],
+                    "open": mid, "high": p.price_max, "low": p.price_min, "close": mid,
+                    "price_sum": mid, "sample_count": 1,
+                    "first_at": scraped_at, "last_at": scraped_at,
+                }
+                continue
+            delta["high"] = max(delta["high"], p.price_max)
+            delta["low"] = min(delta["low"], p.price_min)
+            delta["price_sum"] += mid
+            delta["sample_count"] += 1
+            delta["close"] = mid
+
+    _apply_rollups(db, list(deltas.values()))
+    return len(prices)
+
+
+def _merged_rollup(table, new) -> dict:
+    """SET clause folding new (excluded row or delta values) into a rollup row"""
+    c = table.c
+    return {
+        "high": case((new["high"] > c.high, new["high"]), else_=c.high),
+        "low": case((new["low"] < c.low, new["low"]), else_=c.low),
+        "open": case((new["first_at"] < c.first_at, new["open"]), else_=c.open),
+        "first_at": case((new["first_at"] < c.first_at, new["first_at"]), else_=c.first_at),
+        "close": case((new["last_at"] >= c.last_at, new["close"]), else_=c.close),
+        "last_at": case((new["last_at"] >= c.last_at, new["last_at"]), else_=c.last_at),
+        "price_sum": c.price_sum + new["price_sum"],
+        "sample_count": c.sample_count + new["sample_count"],
+    }
+
+
+def _apply_rollups(db: Session, deltas: List[dict]):
+    """
+    Fold deltas into price_rollups with one upsert executemany where the dialect
+    has ON CONFLICT, so concurrent writers never race on a new period's row
+    """
+    table = PriceRollup.__table__
+    dialect_insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(table)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.period, table.c.period_start, table.c.name, table.c.grade],
+            set_=_merged_rollup(table, stmt.excluded),
+        ), deltas)
+        return
+
+    for delta in deltas:
+        result = db.execute(
+            update(table).where(
+                table.c.period == delta["period"],
+                table.c.period_start == delta["period_start"],
+                table.c.name == delta["name"],
+                table.c.grade == delta["grade"],
+            ).values(_merged_rollup(table, {
+                k: literal(v, table.c[k].type) for k, v in delta.items()
+            }))
+        )
+        if result.rowcount == 0:
+            db.execute(insert(table).values(**delta))
+
+
+def get_price_rollups(
+    db: Session,
+    period: str = "day",
+    name: Optional[str] = None,
+    grade: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> List[PriceRollup]:
+    """Rollup rows for a period, oldest first"""
+    query = db.query(PriceRollup).filter(PriceRollup.period == period)
+    if name:
+        query = query.filter(PriceRollup.name == name)
+    if grade:
+        query = query.filter(PriceRollup.grade == grade)
+    if date_from:
+        query = query.filter(PriceRollup.period_start >= period_start(
+            period, datetime.combine(date_from, datetime.min.time())))
+    if date_to:
+        query = query.filter(PriceRollup.period_start <= date_to)
+    return query.order_by(
+        PriceRollup.period_start, PriceRollup.name, PriceRollup.grade
+    ).all()
+
+
+def save_last_good_snapshot(db: Session, data: str, fetched_at: datetime,
+                            sources: Iterable[str], content_hash: Optional[str] = None):
+    """Replace the stored last-known-good snapshot (data is its JSON); call before commit"""
+    row = db.get(LastGoodSnapshot, 1)
+    if row is None:
+        row = LastGoodSnapshot(id=1)
+        db.add(row)
+    row.fetched_at = fetched_at
+    row.sources = ",".join(sources)
+    row.content_hash = content_hash
+    row.data = data
+
+
+def load_last_good_snapshot(db: Session) -> Optional[LastGoodSnapshot]:
+    return db.get(LastGoodSnapshot, 1)
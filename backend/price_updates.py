@@ -0,0 +1,160 @@
+"""
+Set-based price updates for orange types
+Every orange_types row is one SKU (variety x grade) keyed by orange_id. A price
+list is loaded into a temporary table in one executemany, then the diff is read
+with one join and all changed prices are written with one UPDATE ... FROM, inside
+the caller's transaction - no per-SKU round trips however long the list is
+"""
+
+import csv
+import io
+import json
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from sqlalchemy import Column, Float, MetaData, String, Table, select, update
+from sqlalchemy.orm import Session
+
+from database import OrangeType, bump_catalog_version
+
+_staging_metadata = MetaData()
+bulk_prices = Table(
+    "bulk_prices", _staging_metadata,
+    Column("orange_id", String, primary_key=True),
+    Column("price_per_kg", Float, nullable=False),
+    prefixes=["TEMPORARY"],
+)
+
+
+@dataclass
+class PriceChange:
+    """Old and new price of one SKU"""
+    orange_id: str
+    name: str
+    old_price: float
+    new_price: float
+
+    @property
+    def changed(self) -> bool:
+        return self.old_price != self.new_price
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.orange_id,
+            "name": self.name,
+            "old_price": self.old_price,
+            "new_price": self.new_price,
+        }
+
+
+@dataclass
+class BulkPriceResult:
+    """Every matched SKU plus the orange_ids that matched nothing"""
+    matched: List[PriceChange] = field(default_factory=list)
+    unknown: List[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> List[PriceChange]:
+        return [c for c in self.matched if c.changed]
+
+
+def _validate(prices: Dict[str, float]) -> Dict[str, float]:
+    for orange_id, price in prices.items():
+        if not orange_id:
+            raise ValueError("orange_id must not be empty")
+        if not isinstance(price, (int, float)) or isinstance(price, bool) \
+                or not math.isfinite(price) or price <= 0:
+            raise ValueError(f"{orange_id}: price_per_kg must be a positive number, got {price!r}")
+    return prices
+
+
+def parse_price_list(content, fmt: str) -> Dict[str, float]:
+    """
+    Parse a CSV (header orange_id,price_per_kg) or JSON price list into
+    {orange_id: price}. JSON may be a list of {"orange_id", "price_per_kg"}
+    objects or a plain {"orange_id": price} mapping. Later rows win
+    """
+    if isinstance(content, bytes):
+        content = content.decode("utf-8-sig")
+    prices: Dict[str, float] = {}
+
+    if fmt == "json":
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}") from None
+        if isinstance(data, dict):
+            items = data.items()
+        elif isinstance(data, list):
+            try:
+                items = [(item["orange_id"], item["price_per_kg"]) for item in data]
+            except (KeyError, TypeError):
+                raise ValueError("Each item needs orange_id and price_per_kg") from None
+        else:
+            raise ValueError("Expected a JSON list or object")
+        for orange_id, price in items:
+            prices[str(orange_id).strip()] = price
+    elif fmt == "csv":
+        reader = csv.DictReader(io.StringIO(content.lstrip("\ufeff")))
+        if not reader.fieldnames or not {"orange_id", "price_per_kg"} <= set(reader.fieldnames):
+            raise ValueError("CSV header must include orange_id and price_per_kg")
+        for line, row in enumerate(reader, start=2):
+            if not (row["orange_id"] or "").strip():
+                raise ValueError(f"line {line}: missing orange_id")
+            try:
+                prices[row["orange_id"].strip()] = float(row["price_per_kg"])
+            except (TypeError, ValueError):
+                raise ValueError(f"line {line}: invalid price {row['price_per_kg']!r}") from None
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    return _validate(prices)
+
+
+def apply_bulk_prices(db: Session, prices: Dict[str, float]) -> BulkPriceResult:
+    """
+    Stage prices, diff them against orange_types and write the changed ones
+    Bumps the catalog version when anything changed; the caller commits
+    """
+    result = BulkPriceResult()
+    if not prices:
+        return result
+    _validate(prices)
+
+    conn = db.connection()
+    bulk_prices.drop(conn, checkfirst=True)
+    bulk_prices.create(conn)
+    try:
+        conn.execute(
+            bulk_prices.insert(),
+            [{"orange_id": k, "price_per_kg": float(v)} for k, v in prices.items()],
+        )
+
+        rows = conn.execute(
+            select(
+                bulk_prices.c.orange_id,
+                OrangeType.name,
+                OrangeType.price_per_kg,
+                bulk_prices.c.price_per_kg,
+            ).select_from(
+                bulk_prices.outerjoin(OrangeType, OrangeType.orange_id == bulk_prices.c.orange_id)
+            ).order_by(bulk_prices.c.orange_id)
+        ).all()
+        for orange_id, name, old_price, new_price in rows:
+            if name is None:
+                result.unknown.append(orange_id)
+            else:
+                result.matched.append(PriceChange(orange_id, name, old_price, new_price))
+
+        if result.changed:
+            conn.execute(
+                update(OrangeType.__table__).where(
+                    OrangeType.orange_id == bulk_prices.c.orange_id,
+                    OrangeType.price_per_kg != bulk_prices.c.price_per_kg,
+                ).values(price_per_kg=bulk_prices.c.price_per_kg)
+            )
+            bump_catalog_version(db)
+    finally:
+        bulk_prices.drop(conn, checkfirst=True)
+    return result
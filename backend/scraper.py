@@ -0,0 +1,152 @@
+"""
+Shared async HTTP client for scraping talaadthai.com
+One connection pool lives for the whole app so scrapes never block the event loop
+"""
+
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import httpx
+
+SCRAPE_URL = os.getenv("SCRAPE_URL", "https://talaadthai.com/prices/fruit")
+
+# Timeouts in seconds (connect / read), overridable from the environment
+SCRAPE_CONNECT_TIMEOUT = float(os.getenv("SCRAPE_CONNECT_TIMEOUT", "5"))
+SCRAPE_READ_TIMEOUT = float(os.getenv("SCRAPE_READ_TIMEOUT", "10"))
+
+# Connection pool limits
+SCRAPE_MAX_CONNECTIONS = int(os.getenv("SCRAPE_MAX_CONNECTIONS", "10"))
+SCRAPE_KEEPALIVE_CONNECTIONS = int(os.getenv("SCRAPE_KEEPALIVE_CONNECTIONS", "5"))
+SCRAPE_KEEPALIVE_EXPIRY = float(os.getenv("SCRAPE_KEEPALIVE_EXPIRY", "30"))
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+_client: Optional[httpx.AsyncClient] = None
+
+# How often each conditional-fetch shortcut fired
+SCRAPE_COUNTERS = {
+    "requests": 0,          # upstream requests sent
+    "not_modified": 0,      # answered 304 via ETag / Last-Modified
+    "unchanged_body": 0,    # 200 but the body hash matched the previous fetch
+    "parsed": 0,            # bodies that actually had to be parsed
+    "db_update_skipped": 0,  # /api/update-prices runs skipped for unchanged prices
+}
+
+
+@dataclass
+class UpstreamState:
+    """Validators, body hash and parsed result of the last good fetch of a URL"""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    parsed: Any = None
+
+
+@dataclass
+class FetchResult:
+    """Outcome of a conditional fetch"""
+    response: httpx.Response
+    content_hash: Optional[str]
+    changed: bool
+    parsed: Any = None  # previous parse result when the content is unchanged
+
+
+_upstream_state: Dict[str, UpstreamState] = {}
+
+
+def _build_client() -> httpx.AsyncClient:
+    """Create the pooled keep-alive client"""
+    timeout = httpx.Timeout(
+        connect=SCRAPE_CONNECT_TIMEOUT,
+        read=SCRAPE_READ_TIMEOUT,
+        write=SCRAPE_READ_TIMEOUT,
+        pool=SCRAPE_CONNECT_TIMEOUT,
+    )
+    limits = httpx.Limits(
+        max_connections=SCRAPE_MAX_CONNECTIONS,
+        max_keepalive_connections=SCRAPE_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=SCRAPE_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(
+        headers=HEADERS,
+        timeout=timeout,
+        limits=limits,
+        follow_redirects=True,
+    )
+
+
+async def start_http_client() -> httpx.AsyncClient:
+    """Open the shared client (called from the startup hook)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_http_client():
+    """Close the shared client and release pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it lazily outside the app lifecycle"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def fetch_page_conditional(url: str) -> FetchResult:
+    """
+    Fetch a page with If-None-Match / If-Modified-Since from the last good fetch
+    A 304 or a body identical to the last one comes back with changed=False and
+    the previously parsed result, so the caller can skip parsing
+    """
+    state = _upstream_state.get(url)
+    headers = {}
+    if state and state.etag:
+        headers["If-None-Match"] = state.etag
+    if state and state.last_modified:
+        headers["If-Modified-Since"] = state.last_modified
+
+    response = await get_http_client().get(url, headers=headers)
+    SCRAPE_COUNTERS["requests"] += 1
+
+    if response.status_code == 304 and state and state.content_hash:
+        SCRAPE_COUNTERS["not_modified"] += 1
+        return FetchResult(response, state.content_hash, changed=False, parsed=state.parsed)
+
+    if not response.is_success:
+        return FetchResult(response, None, changed=True)
+
+    content_hash = hashlib.sha256(response.content).hexdigest()
+    if state and state.content_hash == content_hash:
+        state.etag = response.headers.get("ETag") or state.etag
+        state.last_modified = response.headers.get("Last-Modified") or state.last_modified
+        SCRAPE_COUNTERS["unchanged_body"] += 1
+        return FetchResult(response, content_hash, changed=False, parsed=state.parsed)
+
+    return FetchResult(response, content_hash, changed=True)
+
+
+def remember_parsed(url: str, result: FetchResult, parsed: Any):
+    """Store validators and the parse result of a successful fetch"""
+    SCRAPE_COUNTERS["parsed"] += 1
+    _upstream_state[url] = UpstreamState(
+        etag=result.response.headers.get("ETag"),
+        last_modified=result.response.headers.get("Last-Modified"),
+        content_hash=result.content_hash,
+        parsed=parsed,
+    )
+
+
+def reset_upstream_state():
+    """Forget validators and cached parses (next fetch is unconditional)"""
+    _upstream_state.clear()
@@ -1,110 +1,366 @@
 """
 Seed database with initial data
-Run this script to populate the database with orange types and measurements
+Run this script to populate the database with orange types and measurements,
+and optionally bulk-load synthetic or imported history for load tests
+
+  python seed_db.py                    # base data, skipped if already seeded
+  python seed_db.py --force            # delete and re-seed the base data
+  python seed_db.py --calculations 1000000 --measurements 100000 --seed 42
+  python seed_db.py --import-calculations history.csv --import-measurements sizes.csv
+
+CSV columns (header row required):
+  calculations: orange_type, weight_kg, price_per_kg, date (YYYY-MM-DD), [total_price]
+  measurements: orange_id, height_cm, diameter_cm, weight_avg_g, [radius_cm]
 """
 
-from database import SessionLocal, OrangeType, OrangeMeasurement, init_db
+import argparse
+import csv
+import random
+import sys
+import time
+from datetime import date, timedelta
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from database import (
+    SessionLocal, OrangeType, OrangeMeasurement, PriceCalculation, engine, init_db,
+    bump_catalog_version, OrangeVariety, seed_orange_varieties
+)
+from stats import rebuild_calculation_stats
+from variety_matcher import DEFAULT_VARIETIES
+
+ORANGE_TYPES_DATA = [
+    {
+        "orange_id": "tangerine",
+        "name": "Tangerine",
+        "price_per_kg": 45.0,
+        "color": "Orange",
+        "grade": "A+"
+    },
+    {
+        "orange_id": "green-sweet",
+        "name": "Green Sweet Orange",
+        "price_per_kg": 35.0,
+        "color": "Green",
+        "grade": "A"
+    },
+    {
+        "orange_id": "mandarin",
+        "name": "Mandarin Orange",
+        "price_per_kg": 55.0,
+        "color": "Light Orange",
+        "grade": "A+"
+    }
+]
+
+MEASUREMENTS_DATA = [
+    {
+        "orange_id": "tangerine",
+        "height_cm": 7.5,
+        "radius_cm": 3.8,
+        "diameter_cm": 7.6,
+        "weight_avg_g": 120.0
+    },
+    {
+        "orange_id": "green-sweet",
+        "height_cm": 8.2,
+        "radius_cm": 4.1,
+        "diameter_cm": 8.2,
+        "weight_avg_g": 150.0
+    },
+    {
+        "orange_id": "mandarin",
+        "height_cm": 6.8,
+        "radius_cm": 3.5,
+        "diameter_cm": 7.0,
+        "weight_avg_g": 100.0
+    }
+]
+
+CALCULATION_COLUMNS = ("orange_type", "weight_kg", "price_per_kg", "total_price", "date")
+MEASUREMENT_COLUMNS = ("orange_id", "height_cm", "radius_cm", "diameter_cm", "weight_avg_g")
+
+# Synthetic calculations: share of sales per type and weighed amounts (0.20-5.00 kg)
+TYPE_WEIGHTS = {"tangerine": 5, "green-sweet": 3, "mandarin": 2}
+WEIGHT_STEPS = [round(0.2 + step * 0.01, 2) for step in range(481)]
 
+DEFAULT_BATCH_SIZE = 100_000
+
+Row = Tuple
+
+
+def seed_data(force: bool = False) -> bool:
+    """
+    Insert the base orange types and measurements
+    Skips an already seeded database unless force=True; returns True if seeded
+    """
 
-def seed_data():
-    """Insert initial data into database"""
-    
     # Initialize database (create tables)
     init_db()
-    
+
     db = SessionLocal()
-    
+
     try:
         # Check if data already exists
         existing = db.query(OrangeType).first()
         if existing:
-            print("⚠️  Database already has data.")
-            print(f"   Found: {existing.name} @ {existing.price_per_kg} THB/kg")
-            user_input = input("   Do you want to re-seed? (y/n): ")
-            if user_input.lower() != 'y':
-                return
-            # Delete existing data
+            if not force:
+                print("ℹ️  Database already has data, skipping base seed (use --force to re-seed)")
+                print(f"   Found: {existing.name} @ {existing.price_per_kg} THB/kg")
+                return False
+            # Delete existing data (varieties reference the types being deleted)
+            db.query(OrangeVariety).delete()
             db.query(OrangeMeasurement).delete()
             db.query(OrangeType).delete()
+            bump_catalog_version(db)
             db.commit()
             print("   ✅ Deleted existing data")
-        
-        # Seed orange types
-        orange_types_data = [
-            {
-                "orange_id": "tangerine",
-                "name": "Tangerine",
-                "price_per_kg": 45.0,
-                "color": "Orange",
-                "grade": "A+"
-            },
-            {
-                "orange_id": "green-sweet",
-                "name": "Green Sweet Orange",
-                "price_per_kg": 35.0,
-                "color": "Green",
-                "grade": "A"
-            },
-            {
-                "orange_id": "mandarin",
-                "name": "Mandarin Orange",
-                "price_per_kg": 55.0,
-                "color": "Light Orange",
-                "grade": "A+"
-            }
-        ]
-        
-        # Insert orange types
-        for data in orange_types_data:
-            orange_type = OrangeType(**data)
-            db.add(orange_type)
-        
-        db.commit()
-        print("✅ Inserted orange types")
-        
-        # Seed measurements
-        measurements_data = [
-            {
-                "orange_id": "tangerine",
-                "height_cm": 7.5,
-                "radius_cm": 3.8,
-                "diameter_cm": 7.6,
-                "weight_avg_g": 120.0
-            },
-            {
-                "orange_id": "green-sweet",
-                "height_cm": 8.2,
-                "radius_cm": 4.1,
-                "diameter_cm": 8.2,
-                "weight_avg_g": 150.0
-            },
-            {
-                "orange_id": "mandarin",
-                "height_cm": 6.8,
-                "radius_cm": 3.5,
-                "diameter_cm": 7.0,
-                "weight_avg_g": 100.0
-            }
-        ]
-        
-        # Insert measurements
-        for data in measurements_data:
-            measurement = OrangeMeasurement(**data)
-            db.add(measurement)
-        
+
+        # Insert orange types and measurements in one bulk statement each
+        db.execute(OrangeType.__table__.insert(), ORANGE_TYPES_DATA)
+        db.execute(OrangeMeasurement.__table__.insert(), MEASUREMENTS_DATA)
+        # Market keywords once their orange types exist
+        varieties = seed_orange_varieties(db, DEFAULT_VARIETIES)
+        bump_catalog_version(db)
         db.commit()
-        print("✅ Inserted measurements")
-        
+
         print("\n🎉 Database seeded successfully!")
-        print(f"   - {len(orange_types_data)} orange types")
-        print(f"   - {len(measurements_data)} measurements")
-        
+        print(f"   - {len(ORANGE_TYPES_DATA)} orange types")
+        print(f"   - {len(MEASUREMENTS_DATA)} measurements")
+        print(f"   - {varieties} variety keywords")
+        return True
+
     except Exception as e:
         print(f"❌ Error seeding database: {e}")
         db.rollback()
+        return False
+    finally:
+        db.close()
+
+
+def synthetic_calculations(
+    count: int, rng: random.Random, days: int = 365, batch_size: int = DEFAULT_BATCH_SIZE,
+    end: Optional[date] = None
+) -> Iterator[List[Row]]:
+    """
+    Yield batches of calculation rows spread evenly over the last `days` days,
+    oldest first (so ids follow dates, like real history)
+    """
+    prices = {o["orange_id"]: o["price_per_kg"] for o in ORANGE_TYPES_DATA}
+    combos = [
+        (orange_type, weight, prices[orange_type], round(weight * prices[orange_type], 2))
+        for orange_type in TYPE_WEIGHTS for weight in WEIGHT_STEPS
+    ]
+    combo_weights = [TYPE_WEIGHTS[orange_type] for orange_type, *_ in combos]
+    end = end or date.today()
+    day_strings = [(end - timedelta(days=days - 1 - d)).isoformat() for d in range(days)]
+    rows_per_day = count / days
+
+    for offset in range(0, count, batch_size):
+        size = min(batch_size, count - offset)
+        picked = rng.choices(combos, weights=combo_weights, k=size)
+        yield [
+            (*combo, day_strings[int((offset + i) / rows_per_day)])
+            for i, combo in enumerate(picked)
+        ]
+
+
+def synthetic_measurements(
+    count: int, rng: random.Random, batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[List[Row]]:
+    """
+    Yield batches of measurement rows scattered around each type's base size
+    Weight scales with height x diameter^2 (the fruit's volume) plus 5% noise
+    """
+    bases = MEASUREMENTS_DATA
+    gauss = rng.gauss
+    for offset in range(0, count, batch_size):
+        batch = []
+        for i in range(min(batch_size, count - offset)):
+            base = bases[(offset + i) % len(bases)]
+            height = round(max(3.0, gauss(base["height_cm"], 0.5)), 2)
+            diameter = round(max(3.0, gauss(base["diameter_cm"], 0.5)), 2)
+            volume_ratio = (height * diameter ** 2) / (base["height_cm"] * base["diameter_cm"] ** 2)
+            weight = round(base["weight_avg_g"] * volume_ratio * gauss(1.0, 0.05), 1)
+            batch.append((base["orange_id"], height, round(diameter / 2, 2), diameter, weight))
+        yield batch
+
+
+def _read_csv(path: str, batch_size: int, convert) -> Iterator[List[Row]]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        batch = []
+        for line, record in enumerate(csv.DictReader(f), start=2):
+            try:
+                batch.append(convert(record))
+            except (KeyError, ValueError, TypeError) as e:
+                raise ValueError(f"{path}:{line}: {e!r}") from None
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def _convert_calculation(record: dict) -> Row:
+    weight = float(record["weight_kg"])
+    price = float(record["price_per_kg"])
+    total = record.get("total_price")
+    return (
+        record["orange_type"].strip(),
+        weight,
+        price,
+        float(total) if total else round(weight * price, 2),
+        date.fromisoformat(record["date"].strip()).isoformat(),
+    )
+
+
+def _convert_measurement(record: dict) -> Row:
+    diameter = float(record["diameter_cm"])
+    radius = record.get("radius_cm")
+    return (
+        record["orange_id"].strip(),
+        float(record["height_cm"]),
+        float(radius) if radius else diameter / 2,
+        diameter,
+        float(record["weight_avg_g"]),
+    )
+
+
+def read_calculations_csv(path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Row]]:
+    """Yield batches of calculation rows from a CSV file"""
+    return _read_csv(path, batch_size, _convert_calculation)
+
+
+def read_measurements_csv(path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Row]]:
+    """Yield batches of measurement rows from a CSV file"""
+    return _read_csv(path, batch_size, _convert_measurement)
+
+
+def count_csv_rows(path: str) -> int:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return max(0, sum(1 for _ in csv.reader(f)) - 1)
+
+
+def bulk_insert(
+    table, columns: Sequence[str], batches: Iterable[List[Row]], total: int, label: str,
+    bind=None
+) -> int:
+    """
+    Insert row tuples with one executemany per batch, one transaction per batch
+    When the load is at least as big as the table, secondary indexes are dropped
+    first and rebuilt once at the end, which is much faster than updating them row
+    by row. Returns the number of rows inserted
+    """
+    bind = bind or engine
+    placeholder = "?" if bind.dialect.paramstyle == "qmark" else "%s"
+    statement = (
+        f"INSERT INTO {table.name} ({', '.join(columns)}) "
+        f"VALUES ({', '.join([placeholder] * len(columns))})"
+    )
+
+    with bind.connect() as conn:
+        existing = conn.exec_driver_sql(f"SELECT COUNT(*) FROM {table.name}").scalar()
+    rebuild_indexes = total >= existing and total > 0
+    indexes = list(table.indexes) if rebuild_indexes else []
+
+    inserted = 0
+    started = time.perf_counter()
+    try:
+        with bind.begin() as conn:
+            for index in indexes:
+                index.drop(bind=conn, checkfirst=True)
+        for batch in batches:
+            with bind.begin() as conn:
+                conn.exec_driver_sql(statement, batch)
+            inserted += len(batch)
+            rate = inserted / max(time.perf_counter() - started, 1e-9)
+            print(f"   {label}: {inserted:,}/{total:,} rows ({rate:,.0f} rows/s)", end="\r", flush=True)
+    finally:
+        if indexes:
+            print(f"\n   {label}: rebuilding {len(indexes)} indexes...", end="", flush=True)
+            with bind.begin() as conn:
+                for index in indexes:
+                    index.create(bind=conn, checkfirst=True)
+
+    elapsed = time.perf_counter() - started
+    print(f"\n✅ Inserted {inserted:,} {label} in {elapsed:.1f}s "
+          f"({inserted / max(elapsed, 1e-9):,.0f} rows/s)")
+    return inserted
+
+
+def finish_bulk_load(calculations: bool, measurements: bool):
+    """Refresh derived data after a bulk load"""
+    db = SessionLocal()
+    try:
+        if calculations:
+            types = rebuild_calculation_stats(db)
+            print(f"✅ Rebuilt statistics for {types} orange types")
+        if measurements:
+            # The catalog serves each type's first measurement
+            bump_catalog_version(db)
+        db.commit()
     finally:
         db.close()
 
 
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Seed the database (non-interactive)")
+    parser.add_argument("--force", action="store_true",
+                        help="delete and re-seed orange types and base measurements")
+    parser.add_argument("--calculations", type=int, default=0,
+                        help="synthetic price_calculations rows to generate")
+    parser.add_argument("--measurements", type=int, default=0,
+                        help="synthetic orange_measurements rows to generate")
+    parser.add_argument("--days", type=int, default=365,
+                        help="spread synthetic calculations over this many days up to today")
+    parser.add_argument("--seed", type=int, default=42, help="random seed (same seed, same data)")
+    parser.add_argument("--import-calculations", metavar="CSV", help="load calculations from CSV")
+    parser.add_argument("--import-measurements", metavar="CSV", help="load measurements from CSV")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="rows per insert transaction")
+    args = parser.parse_args(argv)
+
+    seed_data(force=args.force)
+    rng = random.Random(args.seed)
+    loaded_calculations = loaded_measurements = False
+
+    try:
+        if args.calculations > 0:
+            loaded_calculations = True
+            bulk_insert(
+                PriceCalculation.__table__, CALCULATION_COLUMNS,
+                synthetic_calculations(args.calculations, rng, args.days, args.batch_size),
+                args.calculations, "calculations",
+            )
+        if args.import_calculations:
+            loaded_calculations = True
+            bulk_insert(
+                PriceCalculation.__table__, CALCULATION_COLUMNS,
+                read_calculations_csv(args.import_calculations, args.batch_size),
+                count_csv_rows(args.import_calculations), "calculations",
+            )
+        if args.measurements > 0:
+            loaded_measurements = True
+            bulk_insert(
+                OrangeMeasurement.__table__, MEASUREMENT_COLUMNS,
+                synthetic_measurements(args.measurements, rng, args.batch_size),
+                args.measurements, "measurements",
+            )
+        if args.import_measurements:
+            loaded_measurements = True
+            bulk_insert(
+                OrangeMeasurement.__table__, MEASUREMENT_COLUMNS,
+                read_measurements_csv(args.import_measurements, args.batch_size),
+                count_csv_rows(args.import_measurements), "measurements",
+            )
+    except (OSError, ValueError) as e:
+        print(f"\n❌ Error loading data: {e}")
+        return 1
+    finally:
+        # Rows from committed batches stay, so derived data is refreshed even after an error
+        if loaded_calculations or loaded_measurements:
+            finish_bulk_load(loaded_calculations, loaded_measurements)
+    return 0
+
+
 if __name__ == "__main__":
-    seed_data()
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Incrementally maintained per-type calculation statistics
+Every insert/delete on price_calculations updates calculation_stats and the
+per-day weight histogram (calculation_histogram) in the same transaction, so
+/api/stats and /api/analytics never scan the history table
+
+Repair the summary from the raw history: python stats.py --rebuild
+"""
+
+import argparse
+from collections import defaultdict
+from typing import Dict, Iterable, List, Union
+
+from sqlalchemy import Integer, cast, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from database import (
+    CalculationHistogram, CalculationStats, PriceCalculation, WEIGHT_BUCKETS_PER_KG
+)
+
+# Dialects whose INSERT supports ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def weight_bucket(weight_kg: float) -> int:
+    """Histogram bucket of a weight (same rounding as the SQL in rebuild)"""
+    return int(weight_kg * WEIGHT_BUCKETS_PER_KG + 0.5)
+
+
+def apply_calculation_stats(db: Session, rows: Iterable[dict], sign: int = 1):
+    """
+    Add (sign=1) or remove (sign=-1) calculation rows from the summaries
+    Rows are dicts with orange_type, weight_kg, total_price and date; call before commit
+    """
+    totals: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+    buckets: Dict[tuple, List[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+    for row in rows:
+        for total in (
+            totals[row["orange_type"]],
+            buckets[(row["date"], row["orange_type"], weight_bucket(row["weight_kg"]))],
+        ):
+            total[0] += 1
+            total[1] += row["weight_kg"]
+            total[2] += row["total_price"]
+
+    for orange_type, (count, weight, revenue) in totals.items():
+        result = db.execute(
+            update(CalculationStats).where(
+                CalculationStats.orange_type == orange_type
+            ).values(
+                calculation_count=CalculationStats.calculation_count + sign * count,
+                total_weight_kg=CalculationStats.total_weight_kg + sign * weight,
+                total_revenue=CalculationStats.total_revenue + sign * revenue,
+            )
+        )
+        if result.rowcount == 0:
+            db.execute(insert(CalculationStats).values(
+                orange_type=orange_type,
+                calculation_count=sign * count,
+                total_weight_kg=sign * weight,
+                total_revenue=sign * revenue,
+            ))
+
+    if buckets:
+        _apply_histogram(db, [
+            {
+                "date": day, "orange_type": orange_type, "weight_bucket": bucket,
+                "calculation_count": sign * count,
+                "total_weight_kg": sign * weight,
+                "total_revenue": sign * revenue,
+            }
+            for (day, orange_type, bucket), (count, weight, revenue) in buckets.items()
+        ])
+
+
+def _apply_histogram(db: Session, deltas: List[dict]):
+    """Add per-bucket deltas; one upsert executemany where the dialect has ON CONFLICT"""
+    table = CalculationHistogram.__table__
+    dialect_insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(table)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.date, table.c.orange_type, table.c.weight_bucket],
+            set_={
+                "calculation_count": table.c.calculation_count + stmt.excluded.calculation_count,
+                "total_weight_kg": table.c.total_weight_kg + stmt.excluded.total_weight_kg,
+                "total_revenue": table.c.total_revenue + stmt.excluded.total_revenue,
+            },
+        ), deltas)
+        return
+
+    for delta in deltas:
+        result = db.execute(
+            update(table).where(
+                table.c.date == delta["date"],
+                table.c.orange_type == delta["orange_type"],
+                table.c.weight_bucket == delta["weight_bucket"],
+            ).values(
+                calculation_count=table.c.calculation_count + delta["calculation_count"],
+                total_weight_kg=table.c.total_weight_kg + delta["total_weight_kg"],
+                total_revenue=table.c.total_revenue + delta["total_revenue"],
+            )
+        )
+        if result.rowcount == 0:
+            db.execute(insert(table).values(**delta))
+
+
+def _weight_bucket_sql(dialect_name: str):
+    scaled = PriceCalculation.weight_kg * WEIGHT_BUCKETS_PER_KG + 0.5
+    # SQLite's CAST truncates (weights are positive); PostgreSQL's rounds, so floor first
+    return cast(scaled if dialect_name == "sqlite" else func.floor(scaled), Integer)
+
+
+def rebuild_calculation_histogram(conn: Union[Session, Connection]):
+    """Recompute calculation_histogram from price_calculations"""
+    bind = conn.get_bind() if isinstance(conn, Session) else conn
+    bucket = _weight_bucket_sql(bind.dialect.name)
+    conn.execute(delete(CalculationHistogram))
+    conn.execute(
+        insert(CalculationHistogram).from_select(
+            ["date", "orange_type", "weight_bucket",
+             "calculation_count", "total_weight_kg", "total_revenue"],
+            select(
+                PriceCalculation.date,
+                PriceCalculation.orange_type,
+                bucket,
+                func.count(PriceCalculation.id),
+                func.sum(PriceCalculation.weight_kg),
+                func.sum(PriceCalculation.total_price),
+            ).group_by(PriceCalculation.date, PriceCalculation.orange_type, bucket)
+        )
+    )
+
+
+def rebuild_calculation_stats(db: Session) -> int:
+    """Recompute the summaries from price_calculations; returns the number of types"""
+    rebuild_calculation_histogram(db)
+    db.execute(delete(CalculationStats))
+    result = db.execute(
+        insert(CalculationStats).from_select(
+            ["orange_type", "calculation_count", "total_weight_kg", "total_revenue"],
+            select(
+                PriceCalculation.orange_type,
+                func.count(PriceCalculation.id),
+                func.coalesce(func.sum(PriceCalculation.weight_kg), 0.0),
+                func.coalesce(func.sum(PriceCalculation.total_price), 0.0),
+            ).group_by(PriceCalculation.orange_type)
+        )
+    )
+    return result.rowcount
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calculation statistics maintenance")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="recompute calculation_stats and calculation_histogram from price_calculations")
+    args = parser.parse_args()
+
+    if not args.rebuild:
+        parser.print_help()
+        return
+
+    from database import SessionLocal, init_db
+
+    init_db()
+    db = SessionLocal()
+    try:
+        types = rebuild_calculation_stats(db)
+        db.commit()
+        print(f"✅ Rebuilt statistics for {types} orange types")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
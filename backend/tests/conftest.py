@@ -0,0 +1,167 @@
+"""
+Shared pytest fixtures for the backend
+Run from the backend folder: python -m pytest -q
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Never touch the real orange_calculator.db from tests
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(
+    tempfile.mkdtemp(prefix="orange-tests-"), "session.db"
+))
+
+import market_sources  # noqa: E402
+import scraper  # noqa: E402
+from catalog import catalog  # noqa: E402
+from database import (  # noqa: E402
+    Base, LastGoodSnapshot, SessionLocal, WorkerLease, create_db_engine, get_db,
+)
+import main  # noqa: E402
+from database import engine as session_engine  # noqa: E402
+from main import app  # noqa: E402
+
+Base.metadata.create_all(bind=session_engine)
+
+
+SAMPLE_ROWS = [
+    ("ส้มสายน้ำผึ้ง", "เกรด A", "40-55", "กก."),
+    ("ส้มเขียวหวาน", "เกรด A", "35-50", "กก."),
+    ("ส้มแมนดาริน", "เกรด A", "45-60", "กก."),
+    ("มะม่วง", "เกรด A", "30-40", "กก."),
+]
+
+
+def price_page_html(rows=SAMPLE_ROWS) -> str:
+    """Build a talaadthai-like fruit price page"""
+    body = "".join(
+        "<tr>" + "".join(f"<td>{cell}</td>" for cell in row) + "</tr>"
+        for row in rows
+    )
+    return (
+        "<html><body><table class='price-table'>"
+        "<tr><th>สินค้า</th><th>เกรด</th><th>ราคา</th><th>หน่วย</th></tr>"
+        f"{body}</table></body></html>"
+    )
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def forget_last_good_snapshot():
+    with SessionLocal() as db:
+        db.query(LastGoodSnapshot).delete()
+        db.query(WorkerLease).delete()
+        db.commit()
+
+
+@pytest.fixture(autouse=True)
+def reset_price_cache():
+    """
+    Every test starts without a cached /oranges snapshot, upstream validators,
+    open circuits, a stored last-known-good snapshot or a refresh lease
+    """
+    main.price_cache.clear()
+    scraper.reset_upstream_state()
+    market_sources.reset_breakers()
+    forget_last_good_snapshot()
+    main.applied_prices.update(content_hash=None, catalog_version=None)
+    yield
+    main.price_cache.clear()
+    scraper.reset_upstream_state()
+    market_sources.reset_breakers()
+
+
+@pytest.fixture(autouse=True)
+def reset_catalog():
+    """Every test starts with an empty catalog cache"""
+    catalog.invalidate()
+    yield
+    catalog.invalidate()
+
+
+@pytest.fixture
+async def http_pool():
+    """Fresh shared scraper client bound to the test's event loop"""
+    await scraper.start_http_client()
+    yield
+    await scraper.close_http_client()
+
+
+@pytest.fixture
+def db_engine(tmp_path):
+    """Isolated SQLite database wired into get_db and SessionLocal"""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = TestingSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    default_bind = SessionLocal.kw["bind"]
+    SessionLocal.configure(bind=engine)
+    yield engine
+    SessionLocal.configure(bind=default_bind)
+    app.dependency_overrides.pop(get_db, None)
+    engine.dispose()
+
+
+@pytest.fixture
+def stand_in_server(monkeypatch):
+    """Local stand-in for talaadthai.com; returns (set scrape URL, hit counter)"""
+    servers = []
+
+    def start(html: str = None, delay: float = 0.0, status: int = 200, etag: str = None):
+        payload = (html if html is not None else price_page_html()).encode("utf-8")
+        hits = {"count": 0}
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                hits["count"] += 1
+                if delay:
+                    time.sleep(delay)
+                if etag and self.headers.get("If-None-Match") == etag:
+                    hits["not_modified"] = hits.get("not_modified", 0) + 1
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(status)
+                if etag:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+
+        url = f"http://127.0.0.1:{server.server_address[1]}/prices/fruit"
+        monkeypatch.setattr(scraper, "SCRAPE_URL", url)
+        return url, hits
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
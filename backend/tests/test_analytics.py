@@ -0,0 +1,161 @@
+"""
+Tests for the vectorized sales analytics (GET /api/analytics)
+"""
+
+import math
+import random
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from analytics import calculation_analytics
+from database import CalculationHistogram, OrangeType, PriceCalculation
+from main import app
+from stats import rebuild_calculation_stats, weight_bucket
+
+
+def seed_types(engine):
+    with Session(engine) as db:
+        db.add_all([
+            OrangeType(orange_id="tangerine", name="Tangerine", price_per_kg=45.0),
+            OrangeType(orange_id="mandarin", name="Mandarin Orange", price_per_kg=55.0),
+        ])
+        db.commit()
+
+
+def histogram(engine):
+    with Session(engine) as db:
+        return {
+            (h.date, h.orange_type, h.weight_bucket):
+                (h.calculation_count, round(h.total_weight_kg, 6), round(h.total_revenue, 6))
+            for h in db.query(CalculationHistogram) if h.calculation_count
+        }
+
+
+def nearest_rank(values, q):
+    ordered = sorted(weight_bucket(v) / 100 for v in values)
+    return ordered[math.ceil(q / 100 * len(ordered)) - 1]
+
+
+def test_analytics_follow_inserts_and_deletes(db_engine):
+    seed_types(db_engine)
+    client = TestClient(app)
+
+    client.post("/api/calculate/batch", json=[
+        {"orange_id": "tangerine", "weight": 2.0},
+        {"orange_id": "mandarin", "weight": 0.5},
+        {"orange_id": "mandarin", "weight": 1.234},
+    ])
+    client.post("/api/calculate?orange_id=tangerine&weight=3")
+    deleted = client.post("/api/calculate?orange_id=mandarin&weight=9").json()["calculation_id"]
+    assert client.delete(f"/api/calculations/{deleted}").status_code == 200
+
+    body = client.get("/api/analytics").json()
+
+    today = date.today().isoformat()
+    assert body["date_from"] == body["date_to"] == today
+    assert body["total_calculations"] == 4
+    assert body["total_weight_kg"] == 6.73
+    assert body["total_revenue"] == round(225.0 + 27.5 + 67.87, 2)
+    assert body["average_basket_value"] == round((225.0 + 27.5 + 67.87) / 4, 2)
+    assert [(t["orange_type"], t["calculations"], t["revenue"]) for t in body["by_type"]] == [
+        ("tangerine", 2, 225.0), ("mandarin", 2, 95.37),
+    ]
+    assert body["by_type"][1]["weight_percentiles_kg"]["p50"] == 0.5
+    assert body["by_type"][1]["weight_percentiles_kg"]["p99"] == 1.23
+    assert body["daily"] == [
+        {"date": today, "calculations": 4, "weight_kg": 6.73, "revenue": 320.37}
+    ]
+
+    # The incrementally maintained histogram matches a rebuild from the raw rows
+    incremental = histogram(db_engine)
+    with Session(db_engine) as db:
+        rebuild_calculation_stats(db)
+        db.commit()
+    assert histogram(db_engine) == incremental
+
+
+def test_analytics_match_raw_rows_over_a_date_range(db_engine):
+    seed_types(db_engine)
+    rng = random.Random(3)
+    start = date(2025, 3, 1)
+    rows = []
+    for _ in range(2000):
+        orange_type = rng.choice(["tangerine", "mandarin"])
+        weight = round(rng.uniform(0.2, 6.0), 3)
+        price = 45.0 if orange_type == "tangerine" else 55.0
+        rows.append({
+            "orange_type": orange_type, "weight_kg": weight, "price_per_kg": price,
+            "total_price": round(weight * price, 2),
+            "date": start + timedelta(days=rng.randrange(0, 60, 2)),  # every other day
+        })
+    with Session(db_engine) as db:
+        db.execute(insert(PriceCalculation), rows)
+        rebuild_calculation_stats(db)
+        db.commit()
+
+    client = TestClient(app)
+    date_from, date_to = start + timedelta(days=10), start + timedelta(days=30)
+    body = client.get(f"/api/analytics?date_from={date_from}&date_to={date_to}").json()
+    # Small chunks add up to the same report
+    with Session(db_engine) as db:
+        assert calculation_analytics(db, chunk_rows=7) == calculation_analytics(db)
+
+    picked = [r for r in rows if date_from <= r["date"] <= date_to]
+    weights = [r["weight_kg"] for r in picked]
+    assert body["total_calculations"] == len(picked)
+    assert body["total_revenue"] == round(sum(r["total_price"] for r in picked), 2)
+    assert body["weight_percentiles_kg"] == {
+        f"p{q}": nearest_rank(weights, q) for q in (50, 90, 95, 99)
+    }
+    mandarin = [r["weight_kg"] for r in picked if r["orange_type"] == "mandarin"]
+    by_type = {t["orange_type"]: t for t in body["by_type"]}
+    assert by_type["mandarin"]["weight_percentiles_kg"]["p90"] == nearest_rank(mandarin, 90)
+
+    # One entry per day of the range, empty days included
+    assert [d["date"] for d in body["daily"]] == [
+        (date_from + timedelta(days=i)).isoformat() for i in range(21)
+    ]
+    assert body["daily"][1]["calculations"] == 0
+    assert sum(d["calculations"] for d in body["daily"]) == len(picked)
+
+    # A huge range is clipped to the days that have sales
+    wide = client.get("/api/analytics?date_from=0001-01-01&date_to=9999-12-31").json()
+    days = sorted({r["date"] for r in rows})
+    assert (wide["date_from"], wide["date_to"]) == (str(days[0]), str(days[-1]))
+    assert len(wide["daily"]) == (days[-1] - days[0]).days + 1
+    assert wide["total_calculations"] == len(rows)
+
+    bad = client.get(f"/api/analytics?date_from={date_to}&date_to={date_from}")
+    assert bad.status_code == 400
+
+
+def test_extreme_weights_neither_break_analytics_nor_get_in(db_engine):
+    seed_types(db_engine)
+    # Bad rows straight in the table (bulk imports do not go through the API)
+    rows = [
+        {"orange_type": "tangerine", "weight_kg": w, "price_per_kg": 45.0,
+         "total_price": round(w * 45.0, 2), "date": date(2025, 3, 1)}
+        for w in (1e8, -1.0, 2.0, 2.0)
+    ]
+    with Session(db_engine) as db:
+        db.execute(insert(PriceCalculation), rows)
+        rebuild_calculation_stats(db)
+        db.commit()
+
+    client = TestClient(app)
+    body = client.get("/api/analytics").json()
+    assert body["total_calculations"] == 4
+    assert body["weight_percentiles_kg"] == {"p50": 2.0, "p90": 1e8, "p95": 1e8, "p99": 1e8}
+    assert body["by_type"][0]["weight_percentiles_kg"]["p50"] == 2.0
+
+    # The endpoints no longer accept such weights
+    for weight in (0, -1, 1e8, "nan"):
+        assert client.post(f"/api/calculate?orange_id=tangerine&weight={weight}").status_code == 422
+        batch = client.post("/api/calculate/batch", json=[{"orange_id": "tangerine", "weight": 1.0},
+                                                          {"orange_id": "tangerine", "weight": weight}])
+        assert batch.status_code == 422
+    with Session(db_engine) as db:
+        assert db.query(PriceCalculation).count() == 4
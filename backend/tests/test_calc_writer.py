@@ -0,0 +1,133 @@
+"""
+Tests for write-behind calculation logging
+"""
+
+import threading
+from datetime import date
+
+import anyio
+import httpx
+import pytest
+from sqlalchemy.orm import Session, sessionmaker
+
+import main
+from calc_writer import CalculationWriter, WriterBusyError
+from database import OrangeType, PriceCalculation
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_write_behind_returns_ids_and_drains_on_shutdown(db_engine, monkeypatch):
+    with Session(db_engine) as db:
+        db.add(OrangeType(orange_id="mandarin", name="Mandarin Orange", price_per_kg=55.0))
+        db.add(PriceCalculation(orange_type="mandarin", weight_kg=1.0, price_per_kg=55.0,
+                                total_price=55.0))
+        db.commit()
+
+    writer = CalculationWriter(sessionmaker(bind=db_engine), flush_size=3,
+                               flush_interval=60, id_block_size=2)
+    monkeypatch.setattr(main, "calc_writer", writer)
+    await writer.start()
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        single = await client.post("/api/calculate?orange_id=mandarin&weight=1")
+        batch = await client.post("/api/calculate/batch", json=[
+            {"orange_id": "mandarin", "weight": 2.0} for _ in range(4)
+        ])
+
+    ids = [single.json()["calculation_id"]]
+    ids += [item["calculation_id"] for item in batch.json()["items"]]
+    assert ids == [2, 3, 4, 5, 6]
+
+    await writer.stop()
+
+    with Session(db_engine) as db:
+        saved = {c.id: c.weight_kg for c in db.query(PriceCalculation)}
+    assert saved == {1: 1.0, 2: 1.0, 3: 2.0, 4: 2.0, 5: 2.0, 6: 2.0}
+    assert writer.flushed_count == 5
+
+
+async def test_full_buffer_rejects_the_whole_batch(db_engine, monkeypatch):
+    with Session(db_engine) as db:
+        db.add(OrangeType(orange_id="mandarin", name="Mandarin Orange", price_per_kg=55.0))
+        db.commit()
+
+    writer = CalculationWriter(sessionmaker(bind=db_engine), flush_size=1, flush_interval=60,
+                               queue_size=3, enqueue_timeout=0.05)
+    # The first flush blocks, so everything queued after it stays in the buffer
+    flushing, release = threading.Event(), threading.Event()
+    flush = writer._flush
+
+    def blocked_flush(batch):
+        flushing.set()
+        release.wait()
+        flush(batch)
+
+    monkeypatch.setattr(writer, "_flush", blocked_flush)
+    monkeypatch.setattr(main, "calc_writer", writer)
+    await writer.start()
+
+    row = {"orange_type": "mandarin", "weight_kg": 1.0, "price_per_kg": 55.0,
+           "total_price": 55.0, "date": date.today()}
+    try:
+        await writer.submit(row)
+        await anyio.to_thread.run_sync(flushing.wait)
+        await writer.submit_many([row, row])
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            busy = await client.post("/api/calculate/batch", json=[
+                {"orange_id": "mandarin", "weight": 2.0} for _ in range(2)
+            ])
+        assert busy.status_code == 503
+        assert writer.pending == 2  # nothing of the rejected batch was queued
+
+        with pytest.raises(WriterBusyError):
+            await writer.submit_many([row] * 4)  # can never fit
+
+        # A batch that waits for room goes in whole once the flusher catches up
+        writer.enqueue_timeout = 5
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(writer.submit_many, [row, row])
+            await anyio.sleep(0)
+            release.set()
+    finally:
+        release.set()
+        await writer.stop()
+
+    with Session(db_engine) as db:
+        assert db.query(PriceCalculation).count() == 5
+    assert writer.flushed_count == 5
+
+
+async def test_sync_mode_after_write_behind_does_not_reuse_ids(db_engine, monkeypatch):
+    with Session(db_engine) as db:
+        db.add(OrangeType(orange_id="mandarin", name="Mandarin Orange", price_per_kg=55.0))
+        db.commit()
+
+    # Write-behind reserves a block of 10 but only uses 2 of them
+    writer = CalculationWriter(sessionmaker(bind=db_engine), flush_interval=60,
+                               id_block_size=10)
+    monkeypatch.setattr(main, "calc_writer", writer)
+    await writer.start()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        buffered = await client.post("/api/calculate/batch", json=[
+            {"orange_id": "mandarin", "weight": 1.0} for _ in range(2)
+        ])
+        await writer.stop()
+
+        # Restarted in sync mode: plain inserts continue after the flushed rows
+        monkeypatch.setattr(main, "calc_writer", None)
+        synced = await client.post("/api/calculate/batch", json=[
+            {"orange_id": "mandarin", "weight": 2.0} for _ in range(2)
+        ])
+
+    assert synced.status_code == 200
+    ids = [item["calculation_id"] for item in buffered.json()["items"]]
+    ids += [item["calculation_id"] for item in synced.json()["items"]]
+    assert len(set(ids)) == 4
+    with Session(db_engine) as db:
+        saved = {c.id: c.weight_kg for c in db.query(PriceCalculation)}
+    assert saved == dict(zip(ids, [1.0, 1.0, 2.0, 2.0]))
@@ -0,0 +1,46 @@
+"""
+Tests for the batch price calculation endpoint
+"""
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database import OrangeType, PriceCalculation
+from main import app
+
+
+def test_batch_inserts_valid_items_and_reports_invalid_ones(db_engine):
+    with Session(db_engine) as db:
+        db.add_all([
+            OrangeType(orange_id="tangerine", name="Tangerine", price_per_kg=45.0),
+            OrangeType(orange_id="mandarin", name="Mandarin Orange", price_per_kg=55.0),
+        ])
+        db.commit()
+
+    inserts = []
+    event.listen(db_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args:
+                 statement.startswith("INSERT INTO price_calculations")
+                 and inserts.append(statement))
+
+    response = TestClient(app).post("/api/calculate/batch", json=[
+        {"orange_id": "tangerine", "weight": 2.0},
+        {"orange_id": "lemon", "weight": 1.0},
+        {"orange_id": "mandarin", "weight": 0.5},
+    ])
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["calculated_count"] == 2
+    assert body["failed_count"] == 1
+    assert body["basket_total"] == 117.5
+    assert body["items"][1] == {"orange_id": "lemon", "weight": 1.0, "error": "Orange not found"}
+    assert len(inserts) == 1
+
+    with Session(db_engine) as db:
+        saved = {c.id: (c.orange_type, c.total_price) for c in db.query(PriceCalculation)}
+    assert saved == {
+        body["items"][0]["calculation_id"]: ("tangerine", 90.0),
+        body["items"][2]["calculation_id"]: ("mandarin", 27.5),
+    }
@@ -0,0 +1,78 @@
+"""
+Tests for keyset pagination on /api/calculations and the index migration
+"""
+
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from database import PriceCalculation
+from main import app
+from migrations import MIGRATIONS, run_migrations
+
+
+def seed(engine, rows: int):
+    with Session(engine) as db:
+        for i in range(rows):
+            db.add(PriceCalculation(
+                orange_type=("tangerine", "mandarin")[i % 2], weight_kg=1.0,
+                price_per_kg=10.0, total_price=10.0,
+                date=date(2026, 1, 1) + timedelta(days=i // 3),  # three rows per day
+            ))
+        db.commit()
+
+
+def test_cursor_pages_through_history_without_gaps_or_duplicates(db_engine):
+    seed(db_engine, 25)
+    client = TestClient(app)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 10, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/calculations", params=params)
+        assert response.status_code == 200
+        seen += [(row["date"], row["id"]) for row in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert len(seen) == 25
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_filters_and_invalid_cursor(db_engine):
+    seed(db_engine, 25)
+    client = TestClient(app)
+
+    rows = client.get("/api/calculations", params={
+        "limit": 100, "orange_type": "mandarin",
+        "date_from": "2026-01-02", "date_to": "2026-01-04",
+    }).json()
+    assert {r["orange_type"] for r in rows} == {"mandarin"}
+    assert {r["date"] for r in rows} == {"2026-01-02", "2026-01-03", "2026-01-04"}
+
+    assert client.get("/api/calculations", params={"cursor": "not-a-cursor"}).status_code == 400
+    for limit in (-1, 0, 1001):
+        assert client.get("/api/calculations", params={"limit": limit}).status_code == 422
+
+
+def test_migration_adds_indexes_to_existing_database_once(db_engine):
+    with db_engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_price_calculations_date_id"))
+        conn.execute(text("DROP INDEX ix_price_calculations_orange_type_date"))
+
+    assert run_migrations(db_engine) == len(MIGRATIONS)
+    assert run_migrations(db_engine) == 0
+
+    names = {ix["name"] for ix in inspect(db_engine).get_indexes("price_calculations")}
+    assert {"ix_price_calculations_date_id", "ix_price_calculations_orange_type_date"} <= names
+
+    with db_engine.connect() as conn:
+        plan = " ".join(str(row) for row in conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM price_calculations "
+            "ORDER BY date DESC, id DESC LIMIT 10"
+        )))
+    assert "ix_price_calculations_date_id" in plan
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,38 @@
+"""
+Tests for the versioned catalog cache
+"""
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database import OrangeType, bump_catalog_version
+from main import app
+
+
+def test_calculate_uses_cache_until_an_external_writer_bumps_the_version(db_engine):
+    with Session(db_engine) as db:
+        db.add(OrangeType(orange_id="mandarin", name="Mandarin Orange", price_per_kg=55.0))
+        bump_catalog_version(db)
+        db.commit()
+
+    client = TestClient(app)
+    assert client.post("/api/calculate?orange_id=mandarin&weight=2").json()["total_price"] == 110.0
+
+    statements = []
+    event.listen(db_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    client.post("/api/calculate?orange_id=mandarin&weight=2")
+    assert not any("FROM orange_types" in s for s in statements)
+
+    # Another process (e.g. update_prices.py) changes the price
+    with Session(db_engine) as db:
+        db.query(OrangeType).filter(OrangeType.orange_id == "mandarin").update(
+            {OrangeType.price_per_kg: 60.0}
+        )
+        bump_catalog_version(db)
+        db.commit()
+
+    response = client.post("/api/calculate?orange_id=mandarin&weight=2").json()
+    assert response["price_per_kg"] == 60.0
+    assert response["total_price"] == 120.0
@@ -0,0 +1,103 @@
+"""
+Tests for the upstream circuit breaker and the last-known-good price snapshot
+"""
+
+import httpx
+import pytest
+from sqlalchemy.orm import Session
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from database import OrangeType
+import main
+import market_sources
+from main import app
+from conftest import price_page_html
+
+pytestmark = pytest.mark.anyio
+
+
+def app_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://testserver"
+    )
+
+
+def test_breaker_opens_fails_fast_and_probes_when_half_open():
+    now = [0.0]
+    breaker = CircuitBreaker("market", failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # After the reset timeout one probe goes through; a second caller is turned away
+    now[0] = 10.0
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.opened_at == 10.0
+
+    now[0] = 20.0
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+    assert breaker.stats == {"opened": 2, "rejected": 2}
+
+
+async def test_outage_serves_last_known_good_snapshot(stand_in_server, http_pool, db_engine,
+                                                      monkeypatch):
+    with Session(db_engine) as db:
+        db.add(OrangeType(orange_id="mandarin", name="Mandarin Orange", price_per_kg=55.0))
+        db.commit()
+    stand_in_server()
+
+    async with app_client() as client:
+        live = await client.get("/oranges")
+        assert live.headers["X-Snapshot-Source"] == "live"
+        assert live.headers["X-Snapshot-Sources"] == "talaadthai"
+
+        # Upstream goes down; a restarted process has only the stored snapshot
+        main.price_cache.clear()
+        _, hits = stand_in_server(status=503)
+        fallback = await client.get("/oranges")
+        assert fallback.status_code == 200
+        assert fallback.content == live.content
+        assert fallback.headers["X-Snapshot-Source"] == "last-known-good"
+        assert fallback.headers["X-Snapshot-Fetched-At"] == live.headers["X-Snapshot-Fetched-At"]
+        assert fallback.headers["X-Snapshot-Sources"] == "talaadthai"
+
+        # Stored prices are never written back as new prices
+        update = await client.post("/api/update-prices")
+        assert update.status_code == 503
+
+        # Third failure opens the circuit: no more upstream requests
+        for _ in range(3):
+            await main.price_cache.refresh()
+        assert hits["count"] == 3
+        assert main.price_cache.snapshot.last_good
+
+        # Half-open: one probe after the reset timeout
+        breaker = market_sources.breakers()[market_sources.configured_sources()[0].url]
+        monkeypatch.setattr(breaker, "reset_timeout", 0)
+        await main.price_cache.refresh()
+        assert hits["count"] == 4 and breaker.state == OPEN
+
+    with Session(db_engine) as db:
+        assert db.query(OrangeType.price_per_kg).scalar() == 55.0
+
+
+async def test_missing_or_empty_page_is_an_error_not_mock_prices(stand_in_server, http_pool):
+    stand_in_server(status=404)
+    async with app_client() as client:
+        assert (await client.get("/oranges")).status_code == 503
+
+        stand_in_server(html=price_page_html([("มะม่วง", "เกรด A", "30-40", "กก.")]))
+        main.price_cache.clear()
+        response = await client.get("/oranges")
+        assert response.status_code == 502
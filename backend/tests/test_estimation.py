@@ -0,0 +1,104 @@
+"""
+Tests for weight and price estimation from fruit dimensions (POST /api/estimate/batch)
+"""
+
+import math
+import random
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from database import OrangeMeasurement, OrangeType, bump_catalog_version
+from estimation import calibrate_densities
+from main import app
+
+
+def ellipsoid(height, diameter):
+    return math.pi / 6 * height * diameter ** 2
+
+
+def seed(engine, measurements):
+    with Session(engine) as db:
+        db.add_all([
+            OrangeType(orange_id="tangerine", name="Tangerine", price_per_kg=45.0),
+            OrangeType(orange_id="mandarin", name="Mandarin Orange", price_per_kg=55.0),
+            OrangeType(orange_id="green-sweet", name="Green Sweet Orange", price_per_kg=35.0),
+        ])
+        db.flush()
+        db.add_all(OrangeMeasurement(orange_id=orange_id, height_cm=h, radius_cm=d / 2,
+                                     diameter_cm=d, weight_avg_g=w)
+                   for orange_id, h, d, w in measurements)
+        bump_catalog_version(db)
+        db.commit()
+
+
+def test_density_fit_matches_least_squares_over_all_rows(db_engine):
+    rng = random.Random(7)
+    rows = []
+    for _ in range(500):
+        h, d = rng.uniform(6, 9), rng.uniform(6, 9)
+        rows.append(("tangerine", h, d, 0.9 * ellipsoid(h, d) * rng.gauss(1.0, 0.05)))
+    seed(db_engine, rows)
+
+    volumes = [ellipsoid(h, d) for _, h, d, _ in rows]
+    weights = [w for *_, w in rows]
+    density = sum(w * v for w, v in zip(weights, volumes)) / sum(v * v for v in volumes)
+    errors = [(density * v - w) / w for w, v in zip(weights, volumes)]
+
+    with Session(db_engine) as db:
+        fit = calibrate_densities(db)["tangerine"]
+    assert fit.samples == 500
+    assert math.isclose(fit.density_g_cm3, density, rel_tol=1e-9)
+    assert math.isclose(fit.relative_error, math.sqrt(sum(e * e for e in errors) / 500),
+                        rel_tol=1e-6)
+    assert 0.04 < fit.relative_error < 0.06
+
+
+def test_batch_estimates_each_fruit_and_reports_the_rest(db_engine):
+    seed(db_engine, [
+        ("tangerine", 7.5, 7.6, 0.8 * ellipsoid(7.5, 7.6)),
+        ("tangerine", 8.0, 8.0, 0.8 * ellipsoid(8.0, 8.0)),
+        ("mandarin", 6.8, 7.0, 0.75 * ellipsoid(6.8, 7.0)),
+    ])
+    client = TestClient(app)
+
+    response = client.post("/api/estimate/batch", json={
+        "orange_id": ["tangerine", "mandarin", "lemon", "green-sweet", "tangerine"],
+        "height_cm": [7.0, 6.5, 7.0, 8.0, 0],
+        "diameter_cm": [7.2, 6.9, 7.0, 8.0, 7.0],
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    tangerine = round(0.8 * ellipsoid(7.0, 7.2), 1)
+    mandarin = round(0.75 * ellipsoid(6.5, 6.9), 1)
+    assert body["weight_g"] == [tangerine, mandarin, None, None, None]
+    assert body["total_price"] == [
+        round(tangerine / 1000 * 45.0, 2), round(mandarin / 1000 * 55.0, 2), None, None, None,
+    ]
+    assert body["errors"] == [
+        {"index": 2, "orange_id": "lemon", "error": "Orange not found"},
+        {"index": 3, "orange_id": "green-sweet", "error": "No measurements for this orange type"},
+        {"index": 4, "orange_id": "tangerine", "error": "Height and diameter must be positive"},
+    ]
+    assert (body["count"], body["estimated_count"], body["failed_count"]) == (5, 2, 3)
+    assert body["total_weight_kg"] == round((tangerine + mandarin) / 1000, 3)
+    assert body["batch_total"] == round(sum(body["total_price"][:2]), 2)
+    assert set(body["models"]) == {"tangerine", "mandarin"}
+    assert body["models"]["tangerine"]["samples"] == 2
+
+    # New measurements from another process recalibrate after the version bump
+    with Session(db_engine) as db:
+        db.add(OrangeMeasurement(orange_id="green-sweet", height_cm=8.0, radius_cm=4.0,
+                                 diameter_cm=8.0, weight_avg_g=0.7 * ellipsoid(8.0, 8.0)))
+        bump_catalog_version(db)
+        db.commit()
+    body = client.post("/api/estimate/batch", json={
+        "orange_id": ["green-sweet"], "height_cm": [8.0], "diameter_cm": [8.0],
+    }).json()
+    assert body["weight_g"] == [round(0.7 * ellipsoid(8.0, 8.0), 1)]
+
+    mismatched = client.post("/api/estimate/batch", json={
+        "orange_id": ["tangerine"], "height_cm": [7.0, 7.5], "diameter_cm": [7.0],
+    })
+    assert mismatched.status_code == 400
@@ -0,0 +1,25 @@
+"""
+Every HTML parser backend must produce the same rows as the original parser
+"""
+
+from pathlib import Path
+
+import pytest
+
+import html_parsers
+
+FIXTURE = (Path(__file__).parent / "fixtures" / "fruit_prices.html").read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("backend", sorted(html_parsers.BACKENDS))
+def test_backends_match_html_parser(backend):
+    expected = html_parsers.parse_rows_html_parser(FIXTURE)
+    assert html_parsers.extract_price_rows(FIXTURE, backend) == expected
+    assert len(expected) == 10
+
+
+@pytest.mark.parametrize("backend", sorted(html_parsers.BACKENDS))
+def test_backends_agree_on_missing_table(backend):
+    assert html_parsers.extract_price_rows("<html><body><p>ปิดปรับปรุง</p></body></html>",
+                                           backend) is None
+    assert html_parsers.extract_price_rows("", backend) is None
@@ -0,0 +1,57 @@
+"""
+Tests for ETag / 304 / Cache-Control on catalog endpoints
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database import OrangeType, bump_catalog_version
+from main import app
+
+
+@pytest.mark.parametrize("url", ["/api/oranges", "/api/oranges/mandarin", "/api/prices"])
+def test_catalog_endpoints_revalidate_with_etags(db_engine, url):
+    with Session(db_engine) as db:
+        db.add(OrangeType(orange_id="mandarin", name="Mandarin Orange", price_per_kg=55.0))
+        bump_catalog_version(db)
+        db.commit()
+    client = TestClient(app)
+
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    statements = []
+    event.listen(db_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    cached = client.get(url, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+    assert len(statements) == 1 and "catalog_version" in statements[0]
+
+    # A price write changes the ETag
+    with Session(db_engine) as db:
+        db.query(OrangeType).update({OrangeType.price_per_kg: 60.0})
+        bump_catalog_version(db)
+        db.commit()
+
+    fresh = client.get(url, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["ETag"] != etag
+    assert "60.0" in fresh.text
+
+
+def test_unknown_orange_is_404_even_with_a_current_etag(db_engine):
+    with Session(db_engine) as db:
+        db.add(OrangeType(orange_id="mandarin", name="Mandarin Orange", price_per_kg=55.0))
+        bump_catalog_version(db)
+        db.commit()
+    client = TestClient(app)
+
+    etag = client.get("/api/oranges/mandarin").headers["ETag"]
+    missing = client.get("/api/oranges/does-not-exist", headers={"If-None-Match": etag})
+    assert missing.status_code == 404
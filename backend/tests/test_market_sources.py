@@ -0,0 +1,94 @@
+"""
+Tests for concurrent multi-source scraping
+"""
+
+import time
+
+import httpx
+import pytest
+
+import market_sources
+from main import app
+from market_sources import MarketSource, table_rows
+from conftest import price_page_html
+
+pytestmark = pytest.mark.anyio
+
+
+def app_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://testserver"
+    )
+
+
+async def test_sources_are_fetched_concurrently_and_merged(stand_in_server, http_pool,
+                                                           monkeypatch):
+    # Second market lists the price first: [price, name, unit, grade]
+    other_url, other_hits = stand_in_server(delay=0.5, html=price_page_html([
+        ("42-58", "ส้มสายน้ำผึ้ง", "กก.", "เกรด A"),
+        ("70-80", "ส้มแมนดาริน", "กก.", "เกรด พรีเมียม"),
+    ]))
+    monkeypatch.setattr(market_sources, "EXTRA_SOURCES", [
+        MarketSource("other-market", other_url, table_rows(name=1, grade=3, price=0, unit=2)),
+    ])
+    _, hits = stand_in_server(delay=0.5)
+
+    async with app_client() as client:
+        started = time.perf_counter()
+        response = await client.get("/oranges")
+        elapsed = time.perf_counter() - started
+
+    assert response.status_code == 200
+    assert hits["count"] == other_hits["count"] == 1
+    assert elapsed < 0.9  # the slowest source, not the sum of both
+
+    prices = {(p["name"], p["grade"]): (p["price_min"], p["price_max"]) for p in response.json()}
+    assert prices == {
+        ("ส้มสายน้ำผึ้ง", "เกรด A"): (40.0, 58.0),  # listed by both markets
+        ("ส้มเขียวหวาน", "เกรด A"): (35.0, 50.0),
+        ("ส้มแมนดาริน", "เกรด A"): (45.0, 60.0),
+        ("ส้มแมนดาริน", "เกรด พรีเมียม"): (70.0, 80.0),
+    }
+
+
+async def test_slow_or_broken_source_is_skipped(stand_in_server, http_pool, monkeypatch):
+    slow_url, _ = stand_in_server(delay=2.0)
+    broken_url, _ = stand_in_server(status=500)
+    monkeypatch.setattr(market_sources, "EXTRA_SOURCES", [
+        MarketSource("slow", slow_url, timeout=0.3),
+        MarketSource("broken", broken_url),
+    ])
+    stand_in_server(html=price_page_html([("ส้มแมนดาริน", "เกรด B", "35-45", "กก.")]))
+
+    async with app_client() as client:
+        started = time.perf_counter()
+        response = await client.get("/oranges")
+        elapsed = time.perf_counter() - started
+
+    assert response.status_code == 200
+    assert elapsed < 1.0
+    assert [(p["name"], p["grade"]) for p in response.json()] == [("ส้มแมนดาริน", "เกรด B")]
+
+
+async def test_scrape_fails_only_when_every_source_fails(stand_in_server, http_pool,
+                                                         monkeypatch):
+    slow_url, _ = stand_in_server(delay=2.0)
+    monkeypatch.setattr(market_sources, "EXTRA_SOURCES", [
+        MarketSource("slow", slow_url, timeout=0.3),
+    ])
+    stand_in_server(status=500)
+
+    async with app_client() as client:
+        response = await client.get("/oranges")
+
+    assert response.status_code == 503
+    assert "slow: no answer within 0.3s" in response.json()["detail"]
+
+
+def test_extra_sources_from_environment():
+    sources = market_sources.parse_sources(" makro=https://example.com/a , b=http://x/y,")
+    assert [(s.name, s.url) for s in sources] == [
+        ("makro", "https://example.com/a"), ("b", "http://x/y")
+    ]
+    with pytest.raises(ValueError):
+        market_sources.parse_sources("https://example.com/no-name")
@@ -0,0 +1,88 @@
+"""
+Tests for the Prometheus /metrics endpoint
+"""
+
+from typing import Optional
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+import metrics
+from database import OrangeType, bump_catalog_version
+from main import app
+
+
+def sample(text: str, line_prefix: str, default: Optional[float] = None) -> float:
+    """Value of the first exposition line starting with line_prefix"""
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    if default is not None:
+        return default
+    raise AssertionError(f"{line_prefix} not in metrics output")
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("demo_seconds", "Demo", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, "/x")
+
+    lines = histogram.render()
+    assert 'demo_seconds_bucket{route="/x",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="/x",le="1.0"} 3' in lines
+    assert 'demo_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'demo_seconds_count{route="/x"} 4' in lines
+    assert 'demo_seconds_sum{route="/x"} 4.05' in lines
+
+
+def test_metrics_report_routes_queries_and_catalog_hits(db_engine):
+    metrics.instrument_engine(db_engine)
+    with Session(db_engine) as db:
+        db.add(OrangeType(orange_id="mandarin", name="Mandarin Orange", price_per_kg=55.0))
+        bump_catalog_version(db)
+        db.commit()
+    client = TestClient(app)
+
+    before = client.get("/metrics").text
+    route = 'http_requests_total{method="GET",route="/api/oranges/{orange_id}",status="200"}'
+    selects_before = sample(before, 'db_query_duration_seconds_count{statement="SELECT"}', 0)
+    for _ in range(3):
+        assert client.get("/api/oranges/mandarin").status_code == 200
+    assert client.get("/api/oranges/nope").status_code == 404
+    assert client.get("/no/such/path").status_code == 404
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+
+    # Labelled by route template, not by the raw path
+    assert sample(text, route) - sample(before, route, 0) == 3
+    assert 'route="/api/oranges/{orange_id}",status="404"' in text
+    assert 'route="unmatched",status="404"' in text
+    assert "/api/oranges/mandarin" not in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/oranges/{orange_id}",le="+Inf"}' in text
+    assert 'http_requests_in_flight{method="GET",route="/metrics"} 1' in text
+
+    assert sample(text, 'db_query_duration_seconds_count{statement="SELECT"}') > selects_before
+    assert sample(text, 'catalog_cache_requests_total{result="reload"}') >= 1
+    assert sample(text, 'catalog_cache_requests_total{result="hit"}') >= 3
+    assert 0 < sample(text, "catalog_cache_hit_ratio") < 1
+
+
+def test_metrics_record_scrape_timings_and_snapshot_hits(db_engine, stand_in_server):
+    stand_in_server()
+    client = TestClient(app)
+
+    before = client.get("/metrics").text
+    assert client.get("/oranges").status_code == 200
+    assert client.get("/oranges").status_code == 200
+    text = client.get("/metrics").text
+
+    fetches = 'scrape_fetch_duration_seconds_count{outcome="changed"}'
+    assert sample(text, fetches) - sample(before, fetches, 0) == 1
+    assert sample(text, "scrape_parse_duration_seconds_count") >= 1
+    assert sample(text, "scrape_response_bytes_total") > 0
+    assert sample(text, 'price_snapshot_requests_total{result="miss"}') >= 1
+    assert sample(text, 'price_snapshot_requests_total{result="fresh"}') >= 1
+    assert sample(text, 'scrape_events_total{event="parsed"}') >= 1
@@ -0,0 +1,64 @@
+"""
+Tests for price history and incremental rollups
+"""
+
+from datetime import date, datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import PriceHistory, PriceRollup
+from main import OrangePrice, app
+import price_history
+from price_history import record_price_history
+
+
+def price(low, high, name="ส้มแมนดาริน"):
+    return OrangePrice(name=name, grade="เกรด A", price_min=low, price_max=high, unit="กก.")
+
+
+@pytest.mark.parametrize("upsert", [True, False], ids=["on-conflict", "update-then-insert"])
+def test_rollups_are_built_at_ingest_and_served_by_period(db_engine, monkeypatch, upsert):
+    if not upsert:
+        monkeypatch.setattr(price_history, "_UPSERT_INSERTS", {})
+    scrapes = [
+        (datetime(2026, 3, 2, 9), [price(40, 50)]),   # Monday
+        (datetime(2026, 3, 2, 15), [price(50, 70)]),
+        (datetime(2026, 3, 2, 12), [price(30, 40)]),  # arrives late
+        (datetime(2026, 3, 4, 9), [price(60, 80)]),   # Wednesday, same week
+    ]
+    with Session(db_engine) as db:
+        for scraped_at, prices in scrapes:
+            record_price_history(db, prices, scraped_at)
+            db.commit()
+        assert db.query(func.count(PriceHistory.id)).scalar() == 4
+
+    client = TestClient(app)
+    days = client.get("/api/prices/history", params={"period": "day"}).json()
+    assert [(d["period_start"], d["open"], d["high"], d["low"], d["close"], d["average"],
+             d["samples"]) for d in days] == [
+        ("2026-03-02", 45.0, 70.0, 30.0, 60.0, 46.67, 3),
+        ("2026-03-04", 70.0, 80.0, 60.0, 70.0, 70.0, 1),
+    ]
+
+    weeks = client.get("/api/prices/history", params={
+        "period": "week", "date_from": "2026-03-04", "name": "ส้มแมนดาริน",
+    }).json()
+    assert len(weeks) == 1
+    assert weeks[0]["period_start"] == "2026-03-02"
+    assert (weeks[0]["open"], weeks[0]["close"], weeks[0]["samples"]) == (45.0, 70.0, 4)
+
+    assert client.get("/api/prices/history", params={"period": "hour"}).status_code == 400
+
+
+def test_one_scrape_with_the_same_grade_twice_folds_into_one_rollup(db_engine):
+    box = OrangePrice(name="ส้มแมนดาริน", grade="เกรด A", price_min=60, price_max=80, unit="ลัง")
+    with Session(db_engine) as db:
+        record_price_history(db, [price(40, 50), box], datetime(2026, 3, 2, 9))
+        record_price_history(db, [price(44, 46)], datetime(2026, 3, 2, 8))  # arrives late
+        db.commit()
+        rollup = db.get(PriceRollup, ("day", date(2026, 3, 2), "ส้มแมนดาริน", "เกรด A"))
+    assert (rollup.open, rollup.high, rollup.low, rollup.close) == (45.0, 80.0, 40.0, 70.0)
+    assert (rollup.price_sum, rollup.sample_count) == (160.0, 3)
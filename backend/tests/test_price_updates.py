@@ -0,0 +1,90 @@
+"""
+Tests for set-based bulk price updates (PUT /api/prices/bulk)
+"""
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from database import OrangeType, get_catalog_version
+from main import app
+
+
+def seed_skus(engine, count):
+    with Session(engine) as db:
+        db.execute(insert(OrangeType), [
+            {"orange_id": f"sku-{i}", "name": f"SKU {i}", "price_per_kg": 10.0}
+            for i in range(count)
+        ])
+        db.commit()
+
+
+def test_bulk_update_returns_diff_and_bumps_catalog(db_engine):
+    seed_skus(db_engine, 3)
+    client = TestClient(app)
+
+    response = client.put("/api/prices/bulk", json=[
+        {"orange_id": "sku-0", "price_per_kg": 12.5},
+        {"orange_id": "sku-1", "price_per_kg": 10.0},
+        {"orange_id": "nope", "price_per_kg": 99.0},
+    ])
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["updated_count"] == 1 and body["unchanged_count"] == 1
+    assert body["unknown"] == ["nope"]
+    assert body["updates"] == [
+        {"id": "sku-0", "name": "SKU 0", "old_price": 10.0, "new_price": 12.5}
+    ]
+    with Session(db_engine) as db:
+        prices = dict(db.query(OrangeType.orange_id, OrangeType.price_per_kg))
+        assert prices == {"sku-0": 12.5, "sku-1": 10.0, "sku-2": 10.0}
+        assert get_catalog_version(db) == 1
+
+
+def test_bulk_update_statement_count_does_not_grow_with_skus(db_engine):
+    seed_skus(db_engine, 3000)
+    client = TestClient(app)
+
+    def run(prices):
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db_engine, "before_cursor_execute", listener)
+        response = client.put("/api/prices/bulk", json=prices)
+        event.remove(db_engine, "before_cursor_execute", listener)
+        assert response.status_code == 200
+        return response.json(), statements
+
+    run({"sku-2": 10.5})  # creates the catalog_version row
+    small, small_statements = run({"sku-0": 11.0, "sku-1": 11.0})
+    large, large_statements = run({f"sku-{i}": 20.0 for i in range(3000)})
+
+    assert small["updated_count"] == 2 and large["updated_count"] == 3000
+    assert len(large_statements) == len(small_statements)
+    assert sum("UPDATE orange_types" in s for s in large_statements) == 1
+
+
+def test_bulk_update_accepts_csv_and_dry_run(db_engine):
+    seed_skus(db_engine, 2)
+    client = TestClient(app)
+    csv_body = "orange_id,price_per_kg\nsku-0,15\nsku-1,16.5\n"
+
+    preview = client.put("/api/prices/bulk?dry_run=true", content=csv_body,
+                         headers={"Content-Type": "text/csv"})
+    assert preview.status_code == 200
+    assert preview.json()["dry_run"] is True
+    assert preview.json()["updated_count"] == 2
+    with Session(db_engine) as db:
+        assert {p for (p,) in db.query(OrangeType.price_per_kg)} == {10.0}
+        assert get_catalog_version(db) == 0
+
+    bad = client.put("/api/prices/bulk", content="orange_id,price_per_kg\nsku-0,free\n",
+                     headers={"Content-Type": "text/csv"})
+    assert bad.status_code == 400
+    assert "line 2" in bad.json()["detail"]
+    negative = client.put("/api/prices/bulk", json={"sku-0": -1})
+    assert negative.status_code == 400
+    short_row = client.put("/api/prices/bulk", content="price_per_kg,orange_id\n45\n",
+                           headers={"Content-Type": "text/csv"})
+    assert short_row.status_code == 400
+    assert short_row.json()["detail"] == "line 2: missing orange_id"
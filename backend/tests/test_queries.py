@@ -0,0 +1,107 @@
+"""
+Regression tests: list endpoints must not issue one query per row
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database import OrangeMeasurement, OrangeType, PriceCalculation
+from catalog import catalog
+from main import app
+
+ORANGES = [
+    ("tangerine", "Tangerine", 45.0),
+    ("green-sweet", "Green Sweet Orange", 35.0),
+    ("mandarin", "Mandarin Orange", 55.0),
+]
+
+
+def seed(engine, rows: int, start: int = 0):
+    with Session(engine) as db:
+        if start == 0:
+            for orange_id, name, price in ORANGES:
+                db.add(OrangeType(orange_id=orange_id, name=name, price_per_kg=price,
+                                  color="Orange", grade="A"))
+                db.add(OrangeMeasurement(orange_id=orange_id, height_cm=7.5, radius_cm=3.8,
+                                         diameter_cm=7.6, weight_avg_g=120.0))
+            # A calculation whose orange type no longer exists
+            db.add(PriceCalculation(orange_type="unknown", weight_kg=1.0, price_per_kg=1.0,
+                                    total_price=1.0, date=date(2025, 1, 1)))
+        for i in range(start, start + rows):
+            orange_id, _, price = ORANGES[i % len(ORANGES)]
+            db.add(PriceCalculation(orange_type=orange_id, weight_kg=1.0 + i,
+                                    price_per_kg=price, total_price=price * (1.0 + i),
+                                    date=date(2026, 1, 1) + timedelta(days=i)))
+            db.add(OrangeMeasurement(orange_id=orange_id, height_cm=7.0, radius_cm=3.5,
+                                     diameter_cm=7.0, weight_avg_g=100.0))
+        db.commit()
+
+
+def count_queries(engine, client: TestClient, url: str):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    assert response.status_code == 200
+    return len(statements), response.json()
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("/api/oranges", 2),  # catalog version check + one joined load
+    ("/api/calculations?limit=1000", 1),
+    ("/api/measurements", 1),
+])
+def test_list_endpoints_issue_a_fixed_number_of_queries(db_engine, url, expected):
+    client = TestClient(app)
+
+    seed(db_engine, 1)
+    few, few_rows = count_queries(db_engine, client, url)
+
+    seed(db_engine, 50, start=1)
+    catalog.invalidate()
+    many, many_rows = count_queries(db_engine, client, url)
+
+    assert few == many == expected
+    assert len(many_rows) >= len(few_rows)
+
+
+def test_calculations_output_shape(db_engine):
+    seed(db_engine, 3)
+    _, data = count_queries(db_engine, TestClient(app), "/api/calculations?limit=10")
+
+    assert data[0] == {
+        "id": 4,
+        "orange_type": "mandarin",
+        "orange_name": "Mandarin Orange",
+        "weight_kg": 3.0,
+        "price_per_kg": 55.0,
+        "total_price": 165.0,
+        "date": "2026-01-03",
+    }
+    assert data[-1]["orange_name"] == "Unknown"
+    assert len(data) == 4
+
+
+def test_oranges_output_keeps_measurement_fields_optional(db_engine):
+    seed(db_engine, 0)
+    with Session(db_engine) as db:
+        db.add(OrangeType(orange_id="pomelo", name="Pomelo", price_per_kg=30.0))
+        db.commit()
+
+    response = TestClient(app).get("/api/oranges")
+
+    assert response.headers["content-type"] == "application/json"
+    by_id = {o["id"]: o for o in response.json()}
+    assert by_id["pomelo"] == {"id": "pomelo", "name": "Pomelo", "pricePerKg": 30.0,
+                               "color": None, "grade": None, "description": "คุณภาพ None"}
+    assert by_id["mandarin"]["weight_avg_g"] == 120.0
@@ -0,0 +1,219 @@
+"""
+Tests for the async talaadthai.com scraper
+"""
+
+import asyncio
+import time
+from datetime import datetime
+
+import httpx
+import pytest
+from sqlalchemy.orm import Session
+
+from database import OrangeType, PriceHistory, SessionLocal, WorkerLease
+import main
+import scraper
+from main import app
+
+pytestmark = pytest.mark.anyio
+
+
+def app_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://testserver"
+    )
+
+
+async def test_slow_scrape_does_not_block_other_endpoints(stand_in_server, http_pool):
+    stand_in_server(delay=1.0)
+
+    async with app_client() as client:
+        scrape = asyncio.create_task(client.get("/oranges"))
+        await asyncio.sleep(0.1)
+
+        started = time.perf_counter()
+        health = await client.get("/health")
+        elapsed = time.perf_counter() - started
+
+        assert health.status_code == 200
+        assert elapsed < 0.5
+        assert not scrape.done()
+
+        response = await scrape
+
+    assert response.status_code == 200
+    assert {item["name"] for item in response.json()} == {
+        "ส้มสายน้ำผึ้ง", "ส้มเขียวหวาน", "ส้มแมนดาริน"
+    }
+
+
+async def test_update_prices_awaits_async_scraper(stand_in_server, http_pool, db_engine):
+    stand_in_server()
+    with Session(db_engine) as db:
+        db.add_all([
+            OrangeType(orange_id="tangerine", name="Tangerine", price_per_kg=45.0),
+            OrangeType(orange_id="green-sweet", name="Green Sweet Orange", price_per_kg=35.0),
+            OrangeType(orange_id="mandarin", name="Mandarin Orange", price_per_kg=55.0),
+        ])
+        db.commit()
+
+    async with app_client() as client:
+        response = await client.post("/api/update-prices")
+
+    assert response.status_code == 200
+    prices = {u["id"]: u["new_price"] for u in response.json()["updates"]}
+    assert prices == {"tangerine": 47.5, "green-sweet": 42.5, "mandarin": 52.5}
+
+
+async def test_oranges_serves_snapshot_and_revalidates_when_stale(
+    stand_in_server, http_pool, monkeypatch
+):
+    _, hits = stand_in_server()
+
+    async with app_client() as client:
+        first = await client.get("/oranges")
+        second = await client.get("/oranges")
+        assert hits["count"] == 1
+        assert second.content == first.content == main.price_cache.snapshot.rendered
+        assert second.headers["Age"] == "0"
+        assert second.headers["X-Snapshot-Stale"] == "false"
+
+        # Past the TTL but inside the stale window: served at once, refreshed behind
+        monkeypatch.setattr(main.price_cache, "ttl", 0)
+        stale = await client.get("/oranges")
+        assert stale.headers["X-Snapshot-Stale"] == "true"
+        await main.price_cache._revalidate_task
+        assert hits["count"] == 2
+
+
+async def test_unchanged_upstream_skips_parse_and_db_update(stand_in_server, http_pool,
+                                                            db_engine):
+    _, hits = stand_in_server(etag='"v1"')
+    with Session(db_engine) as db:
+        db.add(OrangeType(orange_id="mandarin", name="Mandarin Orange", price_per_kg=55.0))
+        db.commit()
+    before = dict(scraper.SCRAPE_COUNTERS)
+
+    async with app_client() as client:
+        first = (await client.post("/api/update-prices")).json()
+        second = (await client.post("/api/update-prices")).json()
+        forced = (await client.post("/api/update-prices?force=true")).json()
+
+    assert first["skipped"] is False and first["updated_count"] == 1
+    assert second["skipped"] is True and second["updated_count"] == 0
+    assert second["scraped_data"] == first["scraped_data"]
+    assert forced["skipped"] is False
+    assert hits["not_modified"] == 2
+
+    delta = {k: scraper.SCRAPE_COUNTERS[k] - before[k] for k in before}
+    assert delta == {"requests": 3, "not_modified": 2, "unchanged_body": 0, "parsed": 1,
+                     "db_update_skipped": 1}
+
+
+async def test_update_prices_reapplies_after_another_writer(stand_in_server, http_pool,
+                                                            db_engine):
+    stand_in_server(etag='"v1"')
+    with Session(db_engine) as db:
+        db.add(OrangeType(orange_id="mandarin", name="Mandarin Orange", price_per_kg=55.0))
+        db.commit()
+
+    async with app_client() as client:
+        first = (await client.post("/api/update-prices")).json()
+        # Another worker (or update_prices.py) overwrites the scraped price
+        await client.put("/api/prices/bulk", json={"mandarin": 99.0})
+        second = (await client.post("/api/update-prices")).json()
+        third = (await client.post("/api/update-prices")).json()
+
+    assert first["skipped"] is False
+    assert second["skipped"] is False and second["updated_count"] == 1
+    assert third["skipped"] is True
+    with Session(db_engine) as db:
+        assert db.query(OrangeType.price_per_kg).filter_by(orange_id="mandarin").scalar() == 52.5
+
+
+async def test_startup_skips_schema_init_when_launcher_did_it(monkeypatch):
+    calls = []
+
+    async def noop():
+        pass
+
+    monkeypatch.setattr(main, "init_db", lambda: calls.append(1))
+    monkeypatch.setattr(main, "calc_writer", None)
+    monkeypatch.setattr(scraper, "start_http_client", noop)
+    monkeypatch.setattr(main.price_cache, "start", lambda: None)
+    monkeypatch.setenv("DB_INIT_ON_STARTUP", "0")
+    await main.startup_event()
+    assert calls == []
+
+    monkeypatch.setenv("DB_INIT_ON_STARTUP", "1")
+    await main.startup_event()
+    assert calls == [1]
+
+
+def history_rows() -> int:
+    with SessionLocal() as db:
+        return db.query(PriceHistory).count()
+
+
+async def test_only_the_lease_holder_scrapes_and_records_history(stand_in_server, http_pool,
+                                                                 monkeypatch):
+    _, hits = stand_in_server()
+    async with app_client() as client:
+        leader = await client.get("/oranges")
+        assert hits["count"] == 1 and main.refresh_leader["held"]
+        recorded = history_rows()
+
+        # Another worker while the lease is held: serves the stored snapshot
+        monkeypatch.setattr(main, "WORKER_ID", "other-host:2")
+        main.price_cache.clear()
+        follower = await client.get("/oranges")
+        assert hits["count"] == 1 and not main.refresh_leader["held"]
+        assert follower.content == leader.content
+        assert follower.headers["X-Snapshot-Source"] == "live"
+        assert follower.headers["X-Snapshot-Fetched-At"] == leader.headers["X-Snapshot-Fetched-At"]
+        assert history_rows() == recorded
+
+        # The leader stopped renewing: once its lease expires this worker takes over
+        with SessionLocal() as db:
+            db.query(WorkerLease).update({WorkerLease.expires_at: datetime(2000, 1, 1)})
+            db.commit()
+        main.price_cache.clear()
+        await client.get("/oranges")
+        assert hits["count"] == 2 and main.refresh_leader["held"]
+        assert history_rows() > recorded
+
+
+async def test_concurrent_requests_share_one_upstream_fetch(stand_in_server, http_pool,
+                                                            db_engine):
+    _, hits = stand_in_server(delay=0.3)
+    with Session(db_engine) as db:
+        db.add(OrangeType(orange_id="mandarin", name="Mandarin Orange", price_per_kg=55.0))
+        db.commit()
+    before = dict(main.price_cache.refresh_stats)
+
+    async with app_client() as client:
+        responses = await asyncio.gather(*[client.get("/oranges") for _ in range(50)])
+        assert hits["count"] == 1
+        assert {r.status_code for r in responses} == {200}
+        assert len({r.content for r in responses}) == 1
+
+        updates = await asyncio.gather(*[client.post("/api/update-prices") for _ in range(5)])
+        assert hits["count"] == 2
+        assert {r.status_code for r in updates} == {200}
+
+    started = main.price_cache.refresh_stats["started"] - before["started"]
+    joined = main.price_cache.refresh_stats["joined"] - before["joined"]
+    assert (started, joined) == (2, 53)
+
+
+async def test_concurrent_callers_share_an_upstream_error(stand_in_server, http_pool):
+    _, hits = stand_in_server(delay=0.2, status=500)
+
+    async with app_client() as client:
+        responses = await asyncio.gather(*[client.get("/oranges") for _ in range(10)])
+        assert hits["count"] == 1
+        assert {r.status_code for r in responses} == {503}
+
+        # The failed fetch is not reused: the next caller tries upstream again
+        await client.get("/oranges")
+        assert hits["count"] == 2
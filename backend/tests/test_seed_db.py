@@ -0,0 +1,64 @@
+"""
+Tests for the bulk seeder (seed_db.py)
+"""
+
+import random
+
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+import seed_db
+from database import OrangeMeasurement, PriceCalculation
+
+
+def test_synthetic_rows_are_deterministic_and_chronological():
+    first = [row for batch in seed_db.synthetic_calculations(1000, random.Random(7), days=10, batch_size=300)
+             for row in batch]
+    again = [row for batch in seed_db.synthetic_calculations(1000, random.Random(7), days=10, batch_size=300)
+             for row in batch]
+    other = [row for batch in seed_db.synthetic_calculations(1000, random.Random(8), days=10, batch_size=300)
+             for row in batch]
+
+    assert first == again
+    assert first != other
+    assert len(first) == 1000
+    dates = [row[4] for row in first]
+    assert dates == sorted(dates) and len(set(dates)) == 10
+    for orange_type, weight, price, total, _ in first:
+        assert total == round(weight * price, 2)
+
+
+def test_bulk_insert_loads_rows_and_restores_indexes(db_engine):
+    table = PriceCalculation.__table__
+    batches = seed_db.synthetic_calculations(5000, random.Random(1), batch_size=1000)
+
+    inserted = seed_db.bulk_insert(table, seed_db.CALCULATION_COLUMNS, batches, 5000,
+                                   "calculations", bind=db_engine)
+
+    assert inserted == 5000
+    with Session(db_engine) as db:
+        assert db.query(PriceCalculation).count() == 5000
+        assert db.query(PriceCalculation).order_by(PriceCalculation.id.desc()).first().date is not None
+    index_names = {index["name"] for index in inspect(db_engine).get_indexes(table.name)}
+    assert {"ix_price_calculations_date_id", "ix_price_calculations_orange_type_date"} <= index_names
+
+
+def test_csv_import_fills_defaults_and_reports_bad_lines(db_engine, tmp_path):
+    good = tmp_path / "sizes.csv"
+    good.write_text("orange_id,height_cm,diameter_cm,weight_avg_g\n"
+                    "mandarin,6.9,7.2,104\n"
+                    "tangerine,7.4,7.5,118\n", encoding="utf-8")
+    seed_db.bulk_insert(OrangeMeasurement.__table__, seed_db.MEASUREMENT_COLUMNS,
+                        seed_db.read_measurements_csv(str(good)), seed_db.count_csv_rows(str(good)),
+                        "measurements", bind=db_engine)
+    with Session(db_engine) as db:
+        radii = [m.radius_cm for m in db.query(OrangeMeasurement).order_by(OrangeMeasurement.id)]
+    assert radii == [3.6, 3.75]
+
+    bad = tmp_path / "history.csv"
+    bad.write_text("orange_type,weight_kg,price_per_kg,date\n"
+                   "mandarin,1.5,55,2025-03-01\n"
+                   "mandarin,abc,55,2025-03-02\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="history.csv:3"):
+        list(seed_db.read_calculations_csv(str(bad)))
@@ -0,0 +1,68 @@
+"""
+Tests for incrementally maintained calculation statistics
+"""
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database import CalculationStats, OrangeType, PriceCalculation
+from main import app
+from stats import rebuild_calculation_stats
+
+
+def summary(engine):
+    with Session(engine) as db:
+        return {
+            s.orange_type: (s.calculation_count, round(s.total_weight_kg, 2),
+                            round(s.total_revenue, 2))
+            for s in db.query(CalculationStats)
+        }
+
+
+def test_stats_follow_inserts_and_deletes_without_scanning_history(db_engine):
+    with Session(db_engine) as db:
+        db.add_all([
+            OrangeType(orange_id="tangerine", name="Tangerine", price_per_kg=45.0),
+            OrangeType(orange_id="mandarin", name="Mandarin Orange", price_per_kg=55.0),
+        ])
+        db.commit()
+    client = TestClient(app)
+
+    first = client.post("/api/calculate?orange_id=tangerine&weight=2").json()
+    client.post("/api/calculate/batch", json=[
+        {"orange_id": "mandarin", "weight": 1.0},
+        {"orange_id": "mandarin", "weight": 3.0},
+        {"orange_id": "tangerine", "weight": 1.0},
+    ])
+    client.delete(f"/api/calculations/{first['calculation_id']}")
+
+    assert summary(db_engine) == {"tangerine": (1, 1.0, 45.0), "mandarin": (2, 4.0, 220.0)}
+
+    statements = []
+    event.listen(db_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    assert client.get("/api/stats").json() == {
+        "total_orange_types": 2,
+        "total_calculations": 3,
+        "most_popular": "mandarin",
+        "most_popular_count": 2,
+    }
+    assert not any("price_calculations" in s for s in statements)
+
+
+def test_rebuild_repairs_the_summary(db_engine):
+    with Session(db_engine) as db:
+        db.add_all([
+            PriceCalculation(orange_type="mandarin", weight_kg=2.0, price_per_kg=10.0,
+                             total_price=20.0),
+            PriceCalculation(orange_type="mandarin", weight_kg=1.0, price_per_kg=10.0,
+                             total_price=10.0),
+            CalculationStats(orange_type="lemon", calculation_count=7,
+                             total_weight_kg=1.0, total_revenue=1.0),
+        ])
+        db.commit()
+        rebuild_calculation_stats(db)
+        db.commit()
+
+    assert summary(db_engine) == {"mandarin": (2, 3.0, 30.0)}
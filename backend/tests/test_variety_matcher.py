@@ -0,0 +1,67 @@
+"""
+Tests for the compiled, table-driven variety matcher
+"""
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from catalog import catalog
+from database import (
+    OrangeType, OrangeVariety, bump_catalog_version, get_catalog_version, seed_orange_varieties,
+)
+from main import parse_orange_prices
+from migrations import MIGRATIONS, run_migrations
+from variety_matcher import DEFAULT_VARIETIES, VarietyMatcher, default_matcher
+from conftest import price_page_html
+
+
+def test_match_returns_orange_id_and_grade_from_the_name():
+    assert default_matcher.match("ส้มสายน้ำผึ้ง เกรด A") == ("tangerine", "สายน้ำผึ้ง", "เกรด A")
+    assert default_matcher.match("ส้มเขียวหวาน").grade is None
+    assert default_matcher.match("มะม่วง") is None
+    assert default_matcher.match("") is None
+
+    matcher = VarietyMatcher({"Mandarin": "mandarin", "ส้ม": "other"})
+    assert matcher.match("MANDARIN grade B") == ("mandarin", "MANDARIN", "grade B")
+
+
+def test_varieties_table_drives_scraping(db_engine):
+    with Session(db_engine) as db:
+        db.add(OrangeType(orange_id="shogun", name="Shogun Orange", price_per_kg=80.0))
+        db.add(OrangeVariety(keyword="โชกุน", orange_id="shogun"))
+        bump_catalog_version(db)
+        db.commit()
+
+    prices = parse_orange_prices(price_page_html([
+        ("ส้มโชกุน", "", "90-110 ", "กก."),
+        ("ส้มแมนดาริน", "เกรด A", "45-60", "กก."),
+    ]))
+
+    # Only varieties in the table are tracked; the grade falls back to "ไม่ระบุ"
+    assert [(p.orange_id, p.grade, p.price_min) for p in prices] == [("shogun", "ไม่ระบุ", 90.0)]
+
+
+def test_varieties_are_seeded_only_for_existing_types_and_bump_the_catalog(db_engine):
+    # Enforce the foreign key the way PostgreSQL does
+    event.listen(db_engine, "connect",
+                 lambda conn, record: conn.execute("PRAGMA foreign_keys=ON"))
+    db_engine.dispose()
+    assert run_migrations(db_engine) == len(MIGRATIONS)
+    with Session(db_engine) as db:
+        assert db.query(OrangeVariety).count() == 0
+
+        db.add(OrangeType(orange_id="mandarin", name="Mandarin Orange", price_per_kg=55.0))
+        db.flush()
+        assert seed_orange_varieties(db, DEFAULT_VARIETIES) == 1
+        db.commit()
+        version = get_catalog_version(db)
+        assert catalog.matcher(db).varieties == {"แมนดาริน": "mandarin"}
+
+        # Nothing new, nothing bumped
+        assert seed_orange_varieties(db, DEFAULT_VARIETIES) == 0
+        db.add(OrangeType(orange_id="shogun", name="Shogun Orange", price_per_kg=80.0))
+        db.flush()
+        assert seed_orange_varieties(db, {"โชกุน": "shogun"}) == 1
+        db.commit()
+        assert get_catalog_version(db) == version + 1
+        assert catalog.matcher(db).match("ส้มโชกุน").orange_id == "shogun"
@@ -1,59 +1,94 @@
 """
 Update orange prices in database (Force update)
+Without arguments the built-in prices are applied; pass a CSV or JSON price list
+(same format as PUT /api/prices/bulk) to update many SKUs in one statement
+
+  python update_prices.py
+  python update_prices.py prices.csv --dry-run
 """
 
-from database import SessionLocal, OrangeType, init_db
+import argparse
+import os
+import sys
+
+from database import SessionLocal, init_db
+from price_updates import apply_bulk_prices, parse_price_list
+
+# Default prices from seed_db.py
+DEFAULT_PRICES = {
+    "tangerine": 45.0,      # ส้มสายน้ำผึ้ง
+    "green-sweet": 35.0,    # ส้มเขียวหวาน
+    "mandarin": 55.0        # ส้มแมนดาริน
+}
+
+
+def load_price_file(path: str) -> dict:
+    """Read a .csv or .json price list"""
+    fmt = "csv" if os.path.splitext(path)[1].lower() == ".csv" else "json"
+    with open(path, "rb") as f:
+        return parse_price_list(f.read(), fmt)
+
+
+def update_prices(prices=None, dry_run=False) -> bool:
+    """Apply prices ({orange_id: price_per_kg}) in one transaction"""
 
+    if prices is None:
+        prices = DEFAULT_PRICES
+    elif not prices:
+        print("⚠️  No prices in file, nothing to update")
+        return True
 
-def update_prices(force=True):
-    """Update prices to correct values"""
-    
     # Ensure database exists
     init_db()
-    
+
     db = SessionLocal()
-    
+
     try:
-        # New prices from seed_db.py
-        price_updates = {
-            "tangerine": 45.0,      # ส้มสายน้ำผึ้ง
-            "green-sweet": 35.0,    # ส้มเขียวหวาน  
-            "mandarin": 55.0        # ส้มแมนดาริน
-        }
-        
-        updated_count = 0
-        
-        for orange_id, new_price in price_updates.items():
-            orange = db.query(OrangeType).filter(
-                OrangeType.orange_id == orange_id
-            ).first()
-            
-            if orange:
-                old_price = orange.price_per_kg
-                if force or old_price != new_price:
-                    orange.price_per_kg = new_price
-                    updated_count += 1
-                    print(f"✅ Updated {orange.name}: {old_price} -> {new_price} บาท/กก.")
-                else:
-                    print(f"ℹ️  {orange.name}: Already at {new_price} บาท/กก.")
+        result = apply_bulk_prices(db, prices)
+
+        for change in result.matched:
+            if change.changed:
+                action = "🔍 Would update" if dry_run else "✅ Updated"
+                print(f"{action} {change.name}: {change.old_price} -> {change.new_price} บาท/กก.")
             else:
-                print(f"⚠️  Orange {orange_id} not found in database")
-        
-        if updated_count > 0:
+                print(f"ℹ️  {change.name}: Already at {change.new_price} บาท/กก.")
+        for orange_id in result.unknown:
+            print(f"⚠️  Orange {orange_id} not found in database")
+
+        if dry_run:
+            db.rollback()
+            print(f"\n🔍 Dry run: {len(result.changed)} prices would change")
+        elif result.changed:
             db.commit()
-            print(f"\n🎉 Successfully updated {updated_count} prices!")
+            print(f"\n🎉 Successfully updated {len(result.changed)} prices!")
         else:
+            db.rollback()
             print(f"\n✅ All prices are already correct!")
-        
+        return True
+
     except Exception as e:
         db.rollback()
         print(f"❌ Error: {e}")
         import traceback
         traceback.print_exc()
+        return False
     finally:
         db.close()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update orange prices in the database")
+    parser.add_argument("price_file", nargs="?", help="CSV (orange_id,price_per_kg) or JSON price list")
+    parser.add_argument("--dry-run", action="store_true", help="show the diff without writing")
+    args = parser.parse_args()
+
+    prices = None
+    if args.price_file:
+        try:
+            prices = load_price_file(args.price_file)
+        except (OSError, ValueError) as e:
+            print(f"❌ Cannot read {args.price_file}: {e}")
+            sys.exit(1)
+
     print("🔄 Updating orange prices...\n")
-    update_prices(force=True)
+    sys.exit(0 if update_prices(prices, dry_run=args.dry_run) else 1)
@@ -0,0 +1,64 @@
+"""
+Compiled matcher from scraped product names to orange varieties
+All keywords from the orange_varieties table are folded into one alternation
+regex, so each table row is scanned once for both the orange_id and (when
+present in the name, after the variety) the grade
+"""
+
+import re
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+# Used when the orange_varieties table is empty (keyword -> orange_id)
+DEFAULT_VARIETIES: Dict[str, str] = {
+    "สายน้ำผึ้ง": "tangerine",
+    "เขียวหวาน": "green-sweet",
+    "แมนดาริน": "mandarin",
+}
+
+# Grade written inside the product name, e.g. "ส้มแมนดาริน เกรด A"
+GRADE_PATTERN = r"(?:เกรด|grade)\s*[^\s()]+"
+
+
+class VarietyMatch(NamedTuple):
+    """Result of matching one product name"""
+    orange_id: str
+    keyword: str
+    grade: Optional[str]
+
+
+class VarietyMatcher:
+    """Single compiled regex over every variety keyword"""
+
+    def __init__(self, varieties: Dict[str, str]):
+        self.varieties = dict(varieties)
+        self._lookup = {k.lower(): v for k, v in self.varieties.items()}
+        # Longest keywords first so the most specific variety wins at a position
+        keywords = sorted(self.varieties, key=len, reverse=True)
+        alternation = "|".join(re.escape(k) for k in keywords) or r"(?!)"
+        self.pattern = re.compile(alternation, re.IGNORECASE)
+        self.grade_pattern = re.compile(GRADE_PATTERN, re.IGNORECASE)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, str]]) -> "VarietyMatcher":
+        """Build from (keyword, orange_id) rows, falling back to the defaults"""
+        varieties = dict(rows)
+        return cls(varieties or DEFAULT_VARIETIES)
+
+    def match(self, text: str) -> Optional[VarietyMatch]:
+        """Return the first variety mentioned in text, or None"""
+        if not text:
+            return None
+        found = self.pattern.search(text)
+        if not found:
+            return None
+        keyword = found.group()
+        # Grade search resumes where the variety ended, so the name is scanned once
+        grade = self.grade_pattern.search(text, found.end())
+        return VarietyMatch(
+            orange_id=self._lookup[keyword.lower()],
+            keyword=keyword,
+            grade=grade.group() if grade else None,
+        )
+
+
+default_matcher = VarietyMatcher(DEFAULT_VARIETIES)